@@ -1,10 +1,143 @@
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QLabel, QVBoxLayout, QPushButton, QWidget, QMessageBox, QTableWidget, QTableWidgetItem, QHBoxLayout
+    QApplication, QMainWindow, QLabel, QVBoxLayout, QPushButton, QWidget, QMessageBox, QTableView, QHBoxLayout,
+    QAbstractItemView, QHeaderView
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QPixmap
-import mysql.connector
 from student_signup import StudentSignup  # Import the StudentSignup class
+from utils.db_async import run_async
+from utils.paged_table_model import PagedTableModel
+from utils.storage import get_backend
+
+
+class ReviewQueueModel(PagedTableModel):
+    """Pending attendance reviews, oldest first, loaded a page at a time."""
+
+    def __init__(self, page_size=100, parent=None):
+        super().__init__(["Review ID", "Reg No", "Date", "Status"], self.fetch_reviews_page, page_size, parent)
+
+    def fetch_reviews_page(self, last_row, limit):
+        # The last loaded review_id is the keyset cursor for the next page
+        return get_backend().pending_reviews_page(last_row[0] if last_row else None, limit)
+
+
+class ReviewQueueWindow(QMainWindow):
+    """Review queue: select any number of requests and approve or reject them together.
+
+    The window is created once per dashboard and reused. Decided rows are
+    removed from the model in place instead of re-querying the queue.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Attendance Requests")
+        self.setGeometry(100, 100, 700, 500)
+        self.setStyleSheet("background-color: #ffffff;")
+
+        central_widget = QWidget()
+        layout = QVBoxLayout()
+
+        header_label = QLabel("Pending Attendance Requests")
+        header_label.setFont(QFont("Arial", 16))
+        header_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(header_label)
+
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #455a64; font-style: italic;")
+        layout.addWidget(self.status_label)
+
+        # Table of requests; pages are loaded while scrolling
+        self.model = ReviewQueueModel(parent=self)
+        self.model.loading_changed.connect(self.update_status)
+        self.model.load_failed.connect(self.show_database_error)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.selectionModel().selectionChanged.connect(lambda *_: self.update_buttons())
+        layout.addWidget(self.table)
+
+        # Bulk actions on the selected rows
+        button_layout = QHBoxLayout()
+
+        self.approve_button = QPushButton("Approve Selected")
+        self.approve_button.setStyleSheet("background-color: #43a047; color: white; padding: 8px;")
+        self.approve_button.clicked.connect(lambda: self.decide_selected("Present"))
+
+        self.reject_button = QPushButton("Reject Selected")
+        self.reject_button.setStyleSheet("background-color: #e53935; color: white; padding: 8px;")
+        self.reject_button.clicked.connect(lambda: self.decide_selected("Absent"))
+
+        refresh_button = QPushButton("Refresh")
+        refresh_button.setStyleSheet("background-color: #546e7a; color: white; padding: 8px;")
+        refresh_button.clicked.connect(self.refresh)
+
+        button_layout.addWidget(self.approve_button)
+        button_layout.addWidget(self.reject_button)
+        button_layout.addWidget(refresh_button)
+        layout.addLayout(button_layout)
+
+        central_widget.setLayout(layout)
+        self.setCentralWidget(central_widget)
+
+        self.saving = False
+        self.update_buttons()
+        self.refresh()
+
+    def refresh(self):
+        """Reload the queue from the first page."""
+        self.model.reset()
+
+    def selected_review_ids(self):
+        return [self.model.row(index.row())[0] for index in self.table.selectionModel().selectedRows()]
+
+    def update_buttons(self):
+        enabled = not self.saving and bool(self.table.selectionModel().selectedRows())
+        self.approve_button.setEnabled(enabled)
+        self.reject_button.setEnabled(enabled)
+
+    def update_status(self, loading=False):
+        if loading and self.model.rowCount() == 0:
+            self.status_label.setText("Loading requests...")
+        elif self.model.is_empty():
+            self.status_label.setText("No pending attendance requests.")
+        elif not loading:
+            more = "+" if self.model.canFetchMore() else ""
+            self.status_label.setText(f"{self.model.rowCount()}{more} pending. "
+                                      "Select rows (Ctrl/Shift-click) to approve or reject them together.")
+
+    def decide_selected(self, decision):
+        """Apply ``decision`` to every selected request in one transaction."""
+        review_ids = self.selected_review_ids()
+        if not review_ids:
+            return
+        self.saving = True
+        self.update_buttons()
+        self.status_label.setText(f"Saving {len(review_ids)} decisions...")
+        run_async(get_backend().decide_reviews, review_ids, decision,
+                  on_result=lambda decided: self.reviews_decided(set(review_ids), decision, decided),
+                  on_error=self.show_database_error, owner=self)
+
+    def reviews_decided(self, review_ids, decision, decided):
+        self.saving = False
+        self.table.clearSelection()
+        self.model.remove_rows(lambda row: row[0] in review_ids)
+        self.update_buttons()
+        self.update_status()
+        skipped = len(review_ids) - decided
+        message = f"Marked {decided} requests as {decision}."
+        if skipped:
+            message += f" {skipped} had already been reviewed elsewhere."
+        self.statusBar().showMessage(message, 5000)
+        # Top up the view if removing rows left it short
+        self.model.fetchMore()
+
+    def show_database_error(self, err):
+        self.saving = False
+        self.update_buttons()
+        self.update_status()
+        QMessageBox.critical(self, "Database Error", f"Error: {err}")
 
 
 class AdminDashboard(QMainWindow):
@@ -82,6 +215,9 @@ class AdminDashboard(QMainWindow):
         central_widget.setLayout(layout)
         self.setCentralWidget(central_widget)
 
+        # Review queue window, created on first use and reused afterwards
+        self.review_window = None
+
     def open_student_signup(self):
         """Open the Student Signup window."""
         try:
@@ -91,103 +227,14 @@ class AdminDashboard(QMainWindow):
             QMessageBox.critical(self, "Error", f"Failed to open Student Signup: {str(e)}")
 
     def view_attendance_requests(self):
-        """Fetch and display attendance requests from the database."""
-        try:
-            conn = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="attendance_system"
-            )
-            cursor = conn.cursor()
-
-            cursor.execute(
-                "SELECT review_id, reg_no, date, status FROM admin_review WHERE status = 'Pending'"
-            )
-            requests = cursor.fetchall()
-
-            if not requests:
-                QMessageBox.information(self, "No Requests", "No pending attendance requests.")
-                return
-
-            # Create a new window to display requests
-            request_window = QMainWindow(self)
-            request_window.setWindowTitle("Attendance Requests")
-            request_window.setGeometry(100, 100, 600, 400)
-            request_window.setStyleSheet("background-color: #ffffff;")
-
-            central_widget = QWidget()
-            layout = QVBoxLayout()
-
-            header_label = QLabel("Pending Attendance Requests")
-            header_label.setFont(QFont("Arial", 16))
-            header_label.setAlignment(Qt.AlignCenter)
-            layout.addWidget(header_label)
-
-            # Create a table to display requests
-            table = QTableWidget(len(requests), 5)  # Added extra column for actions
-            table.setHorizontalHeaderLabels(["Review ID", "Reg No", "Date", "Status", "Action"])
-
-            for row, (review_id, reg_no, date, status) in enumerate(requests):
-                table.setItem(row, 0, QTableWidgetItem(str(review_id)))
-                table.setItem(row, 1, QTableWidgetItem(reg_no))
-                table.setItem(row, 2, QTableWidgetItem(str(date)))
-                table.setItem(row, 3, QTableWidgetItem(status))
-
-                # Create action buttons for Approve and Reject
-                button_layout = QHBoxLayout()
-
-                approve_button = QPushButton("Approve")
-                approve_button.setStyleSheet("background-color: #43a047; color: white;")
-                approve_button.clicked.connect(lambda _, rid=review_id: self.update_request(rid, "Present"))
-
-                reject_button = QPushButton("Reject")
-                reject_button.setStyleSheet("background-color: #e53935; color: white;")
-                reject_button.clicked.connect(lambda _, rid=review_id: self.update_request(rid, "Absent"))
-
-                button_layout.addWidget(approve_button)
-                button_layout.addWidget(reject_button)
-
-                action_widget = QWidget()
-                action_widget.setLayout(button_layout)
-                table.setCellWidget(row, 4, action_widget)
-
-            layout.addWidget(table)
-            central_widget.setLayout(layout)
-            request_window.setCentralWidget(central_widget)
-            request_window.show()
-
-            cursor.close()
-            conn.close()
-
-        except mysql.connector.Error as err:
-            QMessageBox.critical(self, "Database Error", f"Error: {err}")
-
-    def update_request(self, review_id, decision):
-        """Update attendance request status in the database."""
-        try:
-            conn = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="attendance_system"
-            )
-            cursor = conn.cursor()
-
-            cursor.execute(
-                "UPDATE admin_review SET status = 'Reviewed', decision = %s WHERE review_id = %s",
-                (decision, review_id)
-            )
-            conn.commit()
-
-            QMessageBox.information(self, "Success", f"Attendance marked as {decision}.")
-            cursor.close()
-            conn.close()
-
-            self.view_attendance_requests()  # Refresh the requests view
-
-        except mysql.connector.Error as err:
-            QMessageBox.critical(self, "Database Error", f"Error: {err}")
+        """Open the review queue, or refresh and raise it if it is already open."""
+        if self.review_window is None:
+            self.review_window = ReviewQueueWindow(self)
+        else:
+            self.review_window.refresh()
+        self.review_window.show()
+        self.review_window.raise_()
+        self.review_window.activateWindow()
 
     def logout(self):
         """Handle logout process."""
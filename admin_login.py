@@ -3,9 +3,23 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt
-import mysql.connector
 import bcrypt
 from admin_dashboard import AdminDashboard  # Import your admin dashboard
+from utils.db_async import run_async
+from utils.storage import StorageError, get_backend
+
+
+# Look up the admin and verify the password; slow (database + bcrypt), so it runs off the GUI thread
+def authenticate_admin(email, password):
+    """Return ((admin_id, admin_name), None) on success, or (None, error message)."""
+    result = get_backend().get_admin_by_email(email)
+    if not result:
+        return None, "Invalid email. Please try again."
+    admin_id, admin_name, stored_password = result
+    if not bcrypt.checkpw(password.encode("utf-8"), stored_password.encode("utf-8")):
+        return None, "Invalid password. Please try again."
+    return (admin_id, admin_name), None
+
 
 class Admin_loginScreen(QMainWindow):
     def __init__(self):
@@ -37,7 +51,7 @@ class Admin_loginScreen(QMainWindow):
         layout.addWidget(self.password_entry)
 
         # Login Button
-        login_button = QPushButton("Login")
+        self.login_button = login_button = QPushButton("Login")
         login_button.setFont(QFont("Arial", 14, QFont.Bold))
         login_button.setStyleSheet("""
             QPushButton {
@@ -82,50 +96,41 @@ class Admin_loginScreen(QMainWindow):
             QMessageBox.critical(self, "Error", "Both username and password are required!")
             return
 
-        try:
-            # Connect to the MySQL database
-            conn = mysql.connector.connect(
-                host="localhost",  # Default XAMPP MySQL host
-                user="root",       # MySQL username
-                password="",       # MySQL password (empty in XAMPP)
-                database="attendance_system"  # The database you created
-            )
-            cursor = conn.cursor()
+        # Check the credentials in the background; the window stays responsive meanwhile
+        self.set_loading(True)
+        run_async(authenticate_admin, username, password,
+                  on_result=self.on_login_checked, on_error=self.on_login_failed, owner=self)
 
-            # Query to check for the admin's credentials
-            cursor.execute("""SELECT admin_id, admin_name, password FROM admins WHERE email = %s""", (username,))
-            result = cursor.fetchone()
+    def set_loading(self, loading):
+        self.login_button.setEnabled(not loading)
+        self.login_button.setText("Logging in..." if loading else "Login")
 
-            if result:
-                admin_id, admin_name, stored_password = result
-
-                # Check if the entered password matches the stored password
-                if bcrypt.checkpw(password.encode("utf-8"), stored_password.encode("utf-8")):
-                    QMessageBox.information(self, "Login Successful", f"Welcome, {admin_name}!")
-
-                    # Open the admin dashboard and pass the admin data
-                    self.dashboard = AdminDashboard(admin_id, admin_name)
-                    self.dashboard.show()
+    def on_login_checked(self, outcome):
+        self.set_loading(False)
+        admin, error = outcome
+        if error:
+            QMessageBox.critical(self, "Error", error)
+            return
 
-                    # Optionally reset fields after successful login:
-                    self.username_entry.clear()
-                    self.password_entry.clear()
+        admin_id, admin_name = admin
+        QMessageBox.information(self, "Login Successful", f"Welcome, {admin_name}!")
 
-                    self.hide()  # Hide the login window
+        # Open the admin dashboard and pass the admin data
+        self.dashboard = AdminDashboard(admin_id, admin_name)
+        self.dashboard.show()
 
-                else:
-                    QMessageBox.critical(self, "Error", "Invalid password. Please try again.")
-            else:
-                QMessageBox.critical(self, "Error", "Invalid email. Please try again.")
+        # Optionally reset fields after successful login:
+        self.username_entry.clear()
+        self.password_entry.clear()
 
-            # Close the database connection
-            cursor.close()
-            conn.close()
+        self.hide()  # Hide the login window
 
-        except mysql.connector.Error as err:
+    def on_login_failed(self, err):
+        self.set_loading(False)
+        if isinstance(err, StorageError):
             QMessageBox.critical(self, "Database Error", f"Error: {err}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"An unexpected error occurred: {str(e)}")
+        else:
+            QMessageBox.critical(self, "Error", f"An unexpected error occurred: {str(err)}")
 
 
 # Run the application
@@ -1,8 +1,16 @@
-import mysql.connector
-from mysql.connector import Error
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QFormLayout, QHBoxLayout, QMessageBox
 from PyQt5.QtCore import Qt
 import bcrypt
+from utils.db_async import run_async
+from utils.storage import get_backend
+
+
+# Hash the password and insert the admin; slow (bcrypt + database), so it runs off the GUI thread
+def create_admin_account(name, email, password):
+    """Return False if an account with this email already exists."""
+    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    return get_backend().create_admin(name, email, hashed_password)
+
 
 class Admin_signupScreen(QWidget):
     def __init__(self):
@@ -54,7 +62,7 @@ class Admin_signupScreen(QWidget):
         buttons_layout = QHBoxLayout()
 
         # Sign Up Button
-        signup_button = QPushButton("Sign Up")
+        self.signup_button = signup_button = QPushButton("Sign Up")
         signup_button.setStyleSheet("background-color: #4caf50; color: white; padding: 10px; border-radius: 5px;")
         signup_button.clicked.connect(self.signup)
         buttons_layout.addWidget(signup_button)
@@ -86,50 +94,32 @@ class Admin_signupScreen(QWidget):
             QMessageBox.warning(self, "Password Error", "Passwords do not match!")
             return
 
-        # Hash the password
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-
-        try:
-            # Establish database connection
-            conn = mysql.connector.connect(
-                host="localhost",  # Database host
-                user="root",       # Database user
-                password="",       # Database password
-                database="attendance_system"  # Database name
-            )
-
-            cursor = conn.cursor()
-
-            # Check if the email already exists
-            cursor.execute("SELECT * FROM admins WHERE email = %s", (email,))
-            existing_user = cursor.fetchone()
-
-            if existing_user:
-                QMessageBox.warning(self, "Email Exists", "An account with this email already exists.")
-                return
-
-            # Query to insert new user into the database
-            query = """INSERT INTO admins (admin_name, email, password)
-                       VALUES (%s, %s, %s)"""
-            data = (name, email, hashed_password)
-
-            cursor.execute(query, data)
-            conn.commit()
-
-            QMessageBox.information(self, "Success", "Signup successful! You can now log in.")
-            
-            # Clear input fields after successful signup
-            self.name_input.clear()
-            self.email_input.clear()
-            self.password_input.clear()
-            self.confirm_password_input.clear()
-
-        except mysql.connector.Error as err:
-            QMessageBox.critical(self, "Database Error", f"Error: {err}")
-        finally:
-            if conn.is_connected():
-                cursor.close()
-                conn.close()
+        # Hash and insert in the background; the window stays responsive meanwhile
+        self.set_loading(True)
+        run_async(create_admin_account, name, email, password,
+                  on_result=self.on_signup_done, on_error=self.on_signup_failed, owner=self)
+
+    def set_loading(self, loading):
+        self.signup_button.setEnabled(not loading)
+        self.signup_button.setText("Signing Up..." if loading else "Sign Up")
+
+    def on_signup_done(self, created):
+        self.set_loading(False)
+        if not created:
+            QMessageBox.warning(self, "Email Exists", "An account with this email already exists.")
+            return
+
+        QMessageBox.information(self, "Success", "Signup successful! You can now log in.")
+
+        # Clear input fields after successful signup
+        self.name_input.clear()
+        self.email_input.clear()
+        self.password_input.clear()
+        self.confirm_password_input.clear()
+
+    def on_signup_failed(self, err):
+        self.set_loading(False)
+        QMessageBox.critical(self, "Database Error", f"Error: {err}")
 
     def back_to_home(self):
         """Handles going back to the home page."""
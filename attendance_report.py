@@ -0,0 +1,55 @@
+"""Attendance percentages and monthly reports from the summary tables.
+
+The summary tables are kept up to date by database triggers. --rebuild
+recomputes them from the raw attendance rows. Use it after bulk imports
+that bypassed the triggers, or as a periodic consistency job.
+
+    python attendance_report.py --student 21BCE1234
+    python attendance_report.py --class 10A --month 2025-09
+    python attendance_report.py --rebuild
+"""
+import argparse
+import time
+
+from utils.storage import StorageError, get_backend
+
+
+def print_rows(rows):
+    for row in rows:
+        percentage = "-" if row["percentage"] is None else f"{row['percentage']}%"
+        print(f"  {row['month']:%Y-%m}: {row['present']} present, {row['absent']} absent, "
+              f"{row['total']} total ({percentage})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--student", help="report for this reg_no")
+    parser.add_argument("--months", type=int, default=12, help="months shown in a student report")
+    parser.add_argument("--class", dest="class_name", help="report for this class")
+    parser.add_argument("--month", help="only this month of a class report (YYYY-MM)")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the summaries from the attendance table")
+    args = parser.parse_args()
+
+    backend = get_backend()
+    try:
+        if args.rebuild:
+            started = time.perf_counter()
+            backend.rebuild_attendance_summary()
+            print(f"Rebuilt the attendance summaries in {time.perf_counter() - started:.2f}s")
+
+        if args.student:
+            summary = backend.attendance_summary(args.student)
+            print(f"{args.student}: {summary['present']} present, {summary['absent']} absent, "
+                  f"{summary['total']} total ({summary['percentage']}%)")
+            print_rows(backend.monthly_attendance(args.student, args.months))
+
+        if args.class_name:
+            month = f"{args.month}-01" if args.month else None
+            print(f"Class {args.class_name}:")
+            print_rows(backend.class_attendance(args.class_name, month))
+    except StorageError as e:
+        print(f"Database error: {e}")
+
+
+if __name__ == "__main__":
+    main()
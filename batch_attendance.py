@@ -0,0 +1,176 @@
+"""Offline batch attendance from recorded videos and image folders.
+
+Runs the same detection and matching as the attendance screen, without
+a camera or a window. Videos are split into chunks of frames, and image
+folders into chunks of files. The chunks are decoded and recognized in
+parallel worker processes. The tool writes a summary of who was seen,
+where and when, and can mark those students present.
+
+    python batch_attendance.py faces/ --json seen.json
+    python batch_attendance.py cctv_0915.mp4 --stride 10 --csv seen.csv --mark --date 2025-09-15
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import cv2
+
+from utils.recognition import init_shared_matcher, prepare_shared_matcher, recognize_frame
+from utils.storage import StorageError, get_backend
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mkv", ".mov", ".m4v", ".webm"}
+
+
+def plan_chunks(inputs, chunk_frames, chunk_images):
+    """Split every input into independent work items for the process pool."""
+    chunks = []
+    for path in inputs:
+        if os.path.isdir(path):
+            images = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+            )
+            chunks.extend(("images", images[i:i + chunk_images]) for i in range(0, len(images), chunk_images))
+        elif os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS:
+            chunks.append(("images", [path]))
+        elif os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+            cap = cv2.VideoCapture(path)
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+            if total <= 0:
+                print(f"Skipping {path}: could not read its frame count.")
+                continue
+            chunks.extend(("video", (path, start, min(start + chunk_frames, total)))
+                          for start in range(0, total, chunk_frames))
+        else:
+            print(f"Skipping {path}: not a video, image or directory.")
+    return chunks
+
+
+def process_images(paths):
+    """Recognize faces in a list of image files; returns (sightings, frames)."""
+    sightings = []
+    for path in paths:
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            continue
+        seen_at = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds")
+        for reg_no, score in recognize_frame(gray, with_scores=True):
+            if reg_no is not None:
+                sightings.append({"reg_no": str(reg_no), "source": path, "frame": 0, "time": seen_at,
+                                  "score": score})
+    return sightings, len(paths)
+
+
+def process_video(path, start, end, stride):
+    """Recognize faces in frames [start, end) of a video; returns (sightings, frames)."""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    sightings = []
+    frames = 0
+    for frame_no in range(start, end):
+        # grab() skips frames without the cost of converting them
+        if not cap.grab():
+            break
+        if frame_no % stride:
+            continue
+        ret, frame = cap.retrieve()
+        if not ret:
+            continue
+        frames += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        for reg_no, score in recognize_frame(gray, with_scores=True):
+            if reg_no is not None:
+                sightings.append({"reg_no": str(reg_no), "source": path, "frame": frame_no,
+                                  "time": round(frame_no / fps, 2), "score": score})
+    cap.release()
+    return sightings, frames
+
+
+def process_chunk(kind, payload, stride):
+    if kind == "images":
+        return process_images(payload)
+    path, start, end = payload
+    return process_video(path, start, end, stride)
+
+
+def summarize(sightings):
+    """Collapse sightings into one record per student, ordered by reg_no."""
+    people = {}
+    for sighting in sorted(sightings, key=lambda s: (s["source"], s["frame"])):
+        person = people.setdefault(sighting["reg_no"], {
+            "reg_no": sighting["reg_no"], "sightings": 0, "best_score": 0.0,
+            "first_source": sighting["source"], "first_time": sighting["time"],
+        })
+        person["sightings"] += 1
+        person["best_score"] = round(max(person["best_score"], sighting["score"]), 3)
+        person["last_source"] = sighting["source"]
+        person["last_time"] = sighting["time"]
+    return [people[reg_no] for reg_no in sorted(people)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="video files, image files or image directories")
+    parser.add_argument("--stride", type=int, default=5, help="process every Nth video frame")
+    parser.add_argument("--chunk-frames", type=int, default=500, help="video frames per work item")
+    parser.add_argument("--chunk-images", type=int, default=64, help="images per work item")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--json", help="write the summary as JSON to this file")
+    parser.add_argument("--csv", help="write the summary as CSV to this file")
+    parser.add_argument("--mark", action="store_true", help="mark everyone seen as present")
+    parser.add_argument("--date", help="attendance date for --mark (YYYY-MM-DD, default today)")
+    args = parser.parse_args()
+
+    if not prepare_shared_matcher():
+        return
+
+    chunks = plan_chunks(args.inputs, args.chunk_frames, args.chunk_images)
+    sightings = []
+    frames = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_shared_matcher) as pool:
+        futures = [pool.submit(process_chunk, kind, payload, max(1, args.stride)) for kind, payload in chunks]
+        for done, future in enumerate(as_completed(futures), start=1):
+            chunk_sightings, chunk_frames = future.result()
+            sightings.extend(chunk_sightings)
+            frames += chunk_frames
+            print(f"\r{done}/{len(chunks)} chunks, {frames} frames", end="", flush=True)
+    elapsed = time.perf_counter() - started
+    print(f"\nProcessed {frames} frames in {elapsed:.1f}s ({frames / max(elapsed, 1e-9):.1f} frames/s)")
+
+    people = summarize(sightings)
+    for person in people:
+        print(f"{person['reg_no']}: {person['sightings']} sightings (best score {person['best_score']:.2f}), "
+              f"first at {person['first_source']} "
+              f"({person['first_time']}), last at {person['last_source']} ({person['last_time']})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"frames": frames, "seconds": round(elapsed, 2), "people": people}, f, indent=2)
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["reg_no", "sightings", "best_score", "first_source",
+                                                   "first_time", "last_source", "last_time"])
+            writer.writeheader()
+            writer.writerows(people)
+
+    if args.mark and people:
+        reg_nos = [person["reg_no"] for person in people]
+        try:
+            newly_marked = get_backend().mark_present(reg_nos, args.date)
+        except StorageError as e:
+            print(f"Could not mark attendance. Check the database connection. ({e})")
+        else:
+            print(f"Marked {len(newly_marked)} students present "
+                  f"({len(reg_nos) - len(newly_marked)} already marked).")
+
+
+if __name__ == "__main__":
+    main()
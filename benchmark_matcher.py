@@ -0,0 +1,101 @@
+"""Benchmark the approximate IVF matcher against exact brute-force search.
+
+Reports recall@1 (how often IVF returns the same top match as brute
+force) and per-query latency for a range of nprobe values.
+
+    python benchmark_matcher.py --size 100000 --dim 128 --nprobe 1 4 8 16
+    python benchmark_matcher.py --store templates   # use the enrolled templates
+"""
+import argparse
+import time
+
+import numpy as np
+
+import config
+from utils.face_matcher import BruteForceMatcher, IVFMatcher
+
+
+def synthetic_gallery(size, dim, seed):
+    """Clustered vectors that roughly mimic face embeddings of many identities."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(max(1, size // 50), dim)).astype(np.float32)
+    gallery = centres[rng.integers(len(centres), size=size)]
+    gallery += 0.5 * rng.normal(size=(size, dim)).astype(np.float32)
+    return [f"ID{i:06d}" for i in range(size)], gallery
+
+
+def make_queries(gallery, count, noise, seed):
+    """Noisy copies of random gallery rows, like a fresh capture of an enrolled face."""
+    rng = np.random.default_rng(seed + 1)
+    rows = rng.integers(len(gallery), size=count)
+    scale = noise * float(np.std(gallery))
+    return gallery[rows] + scale * rng.normal(size=(count, gallery.shape[1])).astype(np.float32)
+
+
+def time_queries(matcher, queries):
+    """Return (top-1 keys, per-query latencies in ms)."""
+    results = []
+    latencies = []
+    for probe in queries:
+        start = time.perf_counter()
+        matches = matcher.search(probe, k=1)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        results.append(matches[0][0] if matches else None)
+    return results, np.asarray(latencies)
+
+
+def report(name, latencies, build_seconds, recall=None):
+    recall_text = "   exact" if recall is None else f"{recall:8.4f}"
+    print(
+        f"{name:<18} recall@1={recall_text}  build={build_seconds:7.2f}s  "
+        f"mean={latencies.mean():7.3f}ms  p50={np.percentile(latencies, 50):7.3f}ms  "
+        f"p95={np.percentile(latencies, 95):7.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000, help="number of synthetic identities")
+    parser.add_argument("--dim", type=int, default=128, help="vector size of synthetic identities")
+    parser.add_argument("--store", help="benchmark the vectors of this embedding store instead")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.1, help="query noise relative to the gallery std")
+    parser.add_argument("--nlist", type=int, default=config.IVF_NLIST)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.store:
+        from utils.embedding_store import EmbeddingStore
+        from utils.face_gallery import FACE_DIM
+
+        keys, gallery = EmbeddingStore(args.store, FACE_DIM).load()
+        gallery = np.asarray(gallery)
+    else:
+        keys, gallery = synthetic_gallery(args.size, args.dim, args.seed)
+    if not keys:
+        print("Nothing to benchmark: the gallery is empty.")
+        return
+    queries = make_queries(gallery, args.queries, args.noise, args.seed)
+    print(f"Gallery: {len(keys)} x {gallery.shape[1]}, {len(queries)} queries")
+
+    exact = BruteForceMatcher()
+    start = time.perf_counter()
+    exact.build(keys, gallery)
+    build_seconds = time.perf_counter() - start
+    truth, latencies = time_queries(exact, queries)
+    report("brute_force", latencies, build_seconds)
+
+    ivf = IVFMatcher(nlist=args.nlist, seed=args.seed)
+    start = time.perf_counter()
+    ivf.build(keys, gallery)
+    build_seconds = time.perf_counter() - start
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        found, latencies = time_queries(ivf, queries)
+        recall = np.mean([a == b for a, b in zip(found, truth)])
+        report(f"ivf nprobe={nprobe}", latencies, build_seconds, recall)
+
+
+if __name__ == "__main__":
+    main()
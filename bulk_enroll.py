@@ -0,0 +1,303 @@
+"""Enroll a whole batch of users from a CSV file and a directory of face images.
+
+The CSV has one row per user with the users columns (reg_no, first_name,
+last_name, email, password, and optionally class, gender, dob,
+parent_contact, member_type). An optional ``image`` column names the face
+image; otherwise <reg_no>.jpg/.jpeg/.png is looked up in the faces
+directory. Faces are detected, aligned, cropped and encoded, and
+passwords are hashed, in parallel worker processes; only the normalized
+face crop is stored (see utils.face_normalizer), and only for users that
+were actually inserted. Users are inserted in batched transactions, and
+each finished batch is appended to a checkpoint file, so an interrupted
+run resumes where it stopped. The reg_nos of a batch are noted in
+<checkpoint>.pending before it is committed; users of that note found in
+the database on resume were inserted by the interrupted run, and only
+get their face image and vectors stored.
+
+    python bulk_enroll.py students.csv faces/ --report failures.csv
+"""
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import bcrypt
+import cv2
+import numpy as np
+
+import config
+from utils.face_detector import get_detector
+from utils.face_encodings import get_encoding_gallery
+from utils.face_gallery import get_gallery
+from utils.face_normalizer import face_image_path, normalize_face, save_face
+from utils.storage import StorageError, get_backend
+
+REQUIRED_COLUMNS = ["reg_no", "first_name", "last_name", "email", "password"]
+USER_COLUMNS = REQUIRED_COLUMNS + ["class", "gender", "dob", "parent_contact", "member_type"]
+IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png"]
+
+
+def find_image(record, faces_dir):
+    """Path of the face image of a CSV record, or None if there is none."""
+    if record.get("image"):
+        path = os.path.join(faces_dir, record["image"])
+        return path if os.path.exists(path) else None
+    for extension in IMAGE_EXTENSIONS:
+        path = os.path.join(faces_dir, record["reg_no"] + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def init_worker():
+    cv2.setNumThreads(1)  # parallelism comes from the process pool
+
+
+def prepare_user(record, image_path, output_dir):
+    """Detect and normalize one user's face and hash the password (runs in a worker process).
+
+    Returns (user row, NormalizedFace, None) or (None, None, reason). Nothing
+    is written here: the face image is saved by BatchWriter once the user
+    row is inserted, so a duplicate or a rejected row never replaces the
+    face image of an enrolled user.
+    """
+    image = cv2.imread(image_path)
+    if image is None:
+        return None, None, "image could not be read"
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    boxes = get_detector().detect(gray)
+    if not boxes:
+        return None, None, "no face detected"
+    if len(boxes) > 1:
+        return None, None, f"{len(boxes)} faces detected"
+
+    face = normalize_face(image, boxes[0])
+    if face.encoding is None:
+        return None, None, "face could not be encoded"
+
+    user = {column: record.get(column) or None for column in USER_COLUMNS}
+    user["member_type"] = user["member_type"] or "Student"
+    user["password"] = bcrypt.hashpw(record["password"].encode("utf-8"), bcrypt.gensalt())
+    user["face_path"] = face_image_path(record["reg_no"], output_dir)
+    return user, face, None
+
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def append_checkpoint(path, reg_nos):
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(f"{reg_no}\n" for reg_no in reg_nos)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_pending(path, reg_nos):
+    """Replace the note of users being inserted; an empty note removes the file."""
+    if not reg_nos:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(f"{reg_no}\n" for reg_no in sorted(reg_nos))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_unfinished(checkpoint_path, done, existing):
+    """Reg_nos an interrupted run inserted but did not finish: noted as pending, in the database, not checkpointed."""
+    return (read_checkpoint(checkpoint_path + ".pending") - done) & set(existing)
+
+
+class BatchWriter:
+    """Checks prepared users for duplicate faces, inserts them in batches and saves their faces.
+
+    ``existing`` holds the reg_nos already in the users table and
+    ``unfinished`` those of them inserted by an interrupted run, which are
+    not inserted again but still get their face image and vectors.
+    """
+
+    def __init__(self, checkpoint_path, batch_size, tolerance, output_dir, existing=(), unfinished=()):
+        self.checkpoint_path = checkpoint_path
+        self.pending_path = checkpoint_path + ".pending"
+        self.existing = set(existing)
+        self.unfinished = set(unfinished)
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.tolerance = tolerance
+        self.backend = get_backend()
+        self.encodings = get_encoding_gallery()
+        self.templates = get_gallery()
+        self.pending = []
+        self.enrolled = 0
+        self.failures = []  # (reg_no, image, reason)
+
+    def add(self, image_path, user, face):
+        if user["reg_no"] in self.unfinished:
+            # Checked for duplicates by the interrupted run, and its own vectors may already be stored
+            self._queue(user, image_path, face)
+            return
+        if user["reg_no"] in self.existing:
+            self.fail(user["reg_no"], image_path, "reg_no is already enrolled")
+            return
+
+        # Duplicates of enrolled users, then of users earlier in this batch
+        duplicate = self.encodings.find_duplicate(face.encoding, self.tolerance)
+        if duplicate is None:
+            for other, _, other_face in self.pending:
+                distance = float(np.linalg.norm(other_face.encoding - face.encoding))
+                if distance <= self.tolerance:
+                    duplicate = (other["reg_no"], distance)
+                    break
+        if duplicate is not None:
+            self.fail(user["reg_no"], image_path, f"duplicate of {duplicate[0]} (distance {duplicate[1]:.2f})")
+            return
+        self._queue(user, image_path, face)
+
+    def _queue(self, user, image_path, face):
+        self.pending.append((user, image_path, face))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def fail(self, reg_no, image_path, reason):
+        self.failures.append((reg_no, image_path, reason))
+
+    def flush(self):
+        """Insert the pending users in one transaction; on error, retry them one by one to isolate the bad rows."""
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        resumed = [item for item in batch if item[0]["reg_no"] in self.unfinished]
+        new = [item for item in batch if item[0]["reg_no"] not in self.unfinished]
+
+        # Noted before the commit: after a crash, the noted users found in the database are
+        # the ones this batch inserted, and the next run finishes them instead of failing them as duplicates
+        write_pending(self.pending_path, self.unfinished | {user["reg_no"] for user, _, _ in new})
+        inserted = []
+        if new:
+            try:
+                self.backend.create_users([user for user, _, _ in new])
+                inserted = new
+            except StorageError:
+                for item in new:
+                    try:
+                        self.backend.create_user(item[0])
+                        inserted.append(item)
+                    except StorageError as e:
+                        self.fail(item[0]["reg_no"], item[1], f"database: {e}")
+        self.existing.update(user["reg_no"] for user, _, _ in inserted)
+
+        # Faces and vectors are stored only after the rows are committed, so a rejected
+        # row never replaces the face of an enrolled user
+        finished = resumed + inserted
+        for user, image_path, face in finished:
+            original = cv2.imread(image_path) if config.KEEP_ORIGINAL_CAPTURES else None
+            try:
+                save_face(user["reg_no"], face, original, self.output_dir)
+            except OSError as e:
+                self.fail(user["reg_no"], image_path, f"enrolled, but the face image was not saved: {e}")
+        self.templates.add_many([(user["reg_no"], face.template) for user, _, face in finished])
+        self.encodings.add_many([(user["reg_no"], face.encoding) for user, _, face in finished])
+        append_checkpoint(self.checkpoint_path, [user["reg_no"] for user, _, _ in finished])
+        self.unfinished.difference_update(user["reg_no"] for user, _, _ in resumed)
+        write_pending(self.pending_path, self.unfinished)
+        self.enrolled += len(finished)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", help="CSV file with one user per row")
+    parser.add_argument("faces_dir", help="directory with the face images")
+    parser.add_argument("--output-dir", default=config.FACES_PATH, help="where the normalized face images are stored")
+    parser.add_argument("--checkpoint", help="resume file (default: <csv>.checkpoint)")
+    parser.add_argument("--report", help="write the failed images with their reason to this CSV file")
+    parser.add_argument("--batch-size", type=int, default=200, help="users inserted per transaction")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--tolerance", type=float, default=config.DUPLICATE_FACE_TOLERANCE,
+                        help="encoding distance below which a face counts as a duplicate")
+    args = parser.parse_args()
+
+    if os.path.abspath(args.faces_dir) == os.path.abspath(args.output_dir):
+        # The crops would overwrite the source images they are cut from
+        print("The faces directory must not be the output directory.")
+        return
+
+    checkpoint_path = args.checkpoint or args.csv + ".checkpoint"
+    done = read_checkpoint(checkpoint_path)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    with open(args.csv, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing_columns = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing_columns:
+            print(f"The CSV is missing the columns: {', '.join(missing_columns)}")
+            return
+        records = [record for record in reader if record["reg_no"] not in done]
+    if done:
+        print(f"Resuming: {len(done)} users already enrolled according to {checkpoint_path}.")
+
+    try:
+        existing = {reg_no for reg_no, _ in get_backend().list_user_faces()}
+    except StorageError as e:
+        print(f"Could not read the enrolled users: {e}")
+        return
+    unfinished = read_unfinished(checkpoint_path, done, existing)
+    if unfinished:
+        print(f"Finishing {len(unfinished)} users whose enrollment was interrupted after they were inserted.")
+
+    if not get_encoding_gallery().ensure_loaded() or not get_gallery().ensure_loaded():
+        print("Could not load the enrolled faces. Check the database connection.")
+        return
+
+    writer = BatchWriter(checkpoint_path, args.batch_size, args.tolerance, args.output_dir, existing, unfinished)
+    started = time.perf_counter()
+    processed = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as pool:
+        futures = {}
+        for record in records:
+            image_path = find_image(record, args.faces_dir)
+            if image_path is None:
+                writer.fail(record["reg_no"], "", "no image found")
+                continue
+            futures[pool.submit(prepare_user, record, image_path, args.output_dir)] = (record, image_path)
+
+        for future in as_completed(futures):
+            record, image_path = futures[future]
+            processed += 1
+            try:
+                user, face, reason = future.result()
+            except Exception as e:
+                user, reason = None, f"error: {e}"
+            if user is None:
+                writer.fail(record["reg_no"], image_path, reason)
+            else:
+                writer.add(image_path, user, face)
+            if processed % 50 == 0 or processed == len(futures):
+                rate = processed / max(time.perf_counter() - started, 1e-9)
+                print(f"\r{processed}/{len(futures)} images, {writer.enrolled} enrolled, "
+                      f"{len(writer.failures)} failed ({rate:.1f} images/s)", end="", flush=True)
+        writer.flush()
+    elapsed = time.perf_counter() - started
+
+    print(f"\nEnrolled {writer.enrolled} users from {processed} images in {elapsed:.1f}s "
+          f"({processed / max(elapsed, 1e-9):.1f} images/s, {writer.enrolled / max(elapsed, 1e-9):.1f} users/s).")
+    if writer.failures:
+        print(f"{len(writer.failures)} failed:")
+        for reg_no, image_path, reason in writer.failures:
+            print(f"  {reg_no} ({image_path or 'no image'}): {reason}")
+    if args.report:
+        with open(args.report, "w", newline="", encoding="utf-8") as f:
+            report = csv.writer(f)
+            report.writerow(["reg_no", "image", "reason"])
+            report.writerows(writer.failures)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 # Configuration file for database connection and other settings
 
+# Storage backend: "mysql" (the server below) or "sqlite" (an embedded file, no server needed)
+DB_BACKEND = "mysql"
+SQLITE_PATH = "assets/attendance.db"
+
 DB_HOST = 'localhost'
 DB_USER = 'root'
 DB_PASSWORD = ''
@@ -7,3 +11,68 @@ DB_NAME = 'attendance_system'
 
 # Path where faces are stored
 FACES_PATH = "assets/faces"
+KEEP_ORIGINAL_CAPTURES = False  # also keep the full captured frame under FACES_PATH/originals
+
+# Size (width, height) of the grayscale face templates used for matching
+FACE_SIZE = (179, 179)
+
+# Directory holding the persistent face template/embedding stores
+EMBEDDINGS_PATH = "assets/embeddings"
+EMBEDDINGS_MAX_DEAD_FRACTION = 0.2  # compact a store when more of its rows than this are deleted
+
+# Face matcher: "brute_force" (exact) or "ivf" (approximate, for very large galleries)
+MATCHER = "brute_force"
+IVF_NLIST = 256   # number of k-means cells
+IVF_NPROBE = 8    # cells scanned per query; raise for recall, lower for latency
+
+# Consecutive frames a face must be tracked before it is sent for recognition
+STABLE_FRAMES = 5
+
+# Run the full face detector every N frames and follow faces by template matching in between
+DETECT_EVERY_N_FRAMES = 5
+TRACKING_MIN_CONFIDENCE = 0.6  # re-detect early when a tracked face matches worse than this
+
+# Match distances are L2 distances between templates of raw grey levels (0-255): a probe that
+# differs from a template by r grey levels RMS per pixel lies r * TEMPLATE_SCALE from it
+TEMPLATE_SCALE = (FACE_SIZE[0] * FACE_SIZE[1]) ** 0.5  # 179 for 179x179 templates
+
+# Largest gallery distance accepted as a match when the gallery has no calibrated threshold
+# to go by: 20 grey levels RMS (about 3580)
+MATCH_THRESHOLD = 20 * TEMPLATE_SCALE
+
+# Per-user thresholds, calibrated from the enrollment samples: IDENTITY_SPREAD_SCALE times the
+# largest distance of a sample from their centroid, plus a floor for the sensor noise and pixel of
+# misalignment a burst of consecutive frames does not show, kept within IDENTITY_THRESHOLD_RANGE
+# times MATCH_THRESHOLD. Users enrolled from a single capture get the gallery's median threshold.
+IDENTITY_SPREAD_SCALE = 1.5
+MATCH_NOISE_FLOOR = 6 * TEMPLATE_SCALE
+IDENTITY_THRESHOLD_RANGE = (0.5, 1.5)
+
+# A match is rejected as ambiguous unless its distance relative to its threshold is below
+# this fraction of the runner-up's
+MATCH_RATIO = 0.8
+
+# Steepness of the match confidence around the threshold (0.5 exactly at the threshold)
+MATCH_SCORE_SLOPE = 10.0
+
+# Centroid distances within this fraction of the threshold are re-checked against the
+# user's individual enrollment samples, for up to this many candidate users
+CLOSE_CALL_MARGIN = 0.25
+CLOSE_CALL_CANDIDATES = 3
+
+# Burst capture at signup: frames scored, and the best of them kept as the user's templates
+BURST_FRAMES = 30
+BURST_SAMPLES = 5
+
+# Largest face_recognition encoding distance at which a new enrollment counts as a duplicate
+DUPLICATE_FACE_TOLERANCE = 0.6
+
+# Shared MySQL connection pool
+DB_POOL_SIZE = 5           # maximum open connections per process
+DB_POOL_TIMEOUT = 5        # seconds to wait for a free connection
+DB_POOL_PING_AFTER = 30    # ping connections that have been idle longer than this (seconds)
+
+# Local write-behind journal for attendance events (flushed to the storage backend in batches)
+JOURNAL_PATH = "assets/attendance_journal.db"
+JOURNAL_BATCH_SIZE = 50        # flush as soon as this many events are waiting
+JOURNAL_FLUSH_INTERVAL = 2.0   # otherwise flush every this many seconds
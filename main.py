@@ -5,6 +5,7 @@ from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 import sys
 from mark_attendance import MarkAttendanceScreen  # Import the MarkAttendanceScreen class
+from utils.storage import StorageError, get_backend
 
 
 class HoverButton(QPushButton):
@@ -238,6 +239,12 @@ class FaceRecognitionApp(QMainWindow):
 
 
 if __name__ == "__main__":
+    # Create or migrate the schema up front so a broken database is reported at startup
+    try:
+        get_backend().ensure_prepared()
+    except StorageError as e:
+        print(f"Error preparing the database: {e}")
+
     app = QApplication(sys.argv)
     window = FaceRecognitionApp()
     window.show()
@@ -1,10 +1,118 @@
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QMessageBox, QVBoxLayout, QPushButton
-import mysql.connector
+import queue
+from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QMessageBox, QVBoxLayout, QPushButton, QLabel
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
 import cv2
-import numpy as np
-import os
-import time
+import config
+from utils.attendance_writer import get_attendance_writer
+from utils.face_detector import get_detector
+from utils.face_gallery import get_gallery
+from utils.face_tracker import FaceTracker
+from utils.recognition import crop_faces, match_faces
+from utils.db_async import run_async
+from utils.storage import StorageError, get_backend
+
+
+class CaptureThread(QThread):
+    """Producer: reads camera frames, detects and tracks faces, queues stable ones for recognition."""
+
+    frame_ready = pyqtSignal(QImage)
+    camera_error = pyqtSignal(str)
+
+    def __init__(self, tracker, face_queue, camera_index=0, parent=None):
+        super().__init__(parent)
+        self.tracker = tracker
+        self.face_queue = face_queue
+        self.camera_index = camera_index
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        cap = cv2.VideoCapture(self.camera_index)
+        if not cap.isOpened():
+            self.camera_error.emit("Camera not accessible!")
+            return
+
+        detector = get_detector()
+        try:
+            while self.running:
+                ret, frame = cap.read()
+                if not ret:
+                    self.camera_error.emit("Could not read from the camera.")
+                    break
+
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                tracks = self.tracker.track(gray, detector)
+
+                # Every stable, unrecognized face of this frame goes to the worker as one batch
+                ready = [track for track in tracks if self.tracker.ready_for_recognition(track)]
+                if ready:
+                    for track in ready:
+                        track.pending = True
+                    batch = ([track.track_id for track in ready], crop_faces(gray, [track.box for track in ready]))
+                    try:
+                        self.face_queue.put_nowait(batch)
+                    except queue.Full:
+                        for track in ready:
+                            track.pending = False  # The worker is busy; offer them again next frame
+
+                for track in tracks:
+                    x, y, w, h = track.box
+                    color = (0, 255, 0) if track.reg_no else (0, 200, 255)
+                    cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+                    if track.reg_no:
+                        cv2.putText(frame, str(track.reg_no), (x, y - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                height, width, _ = rgb.shape
+                self.frame_ready.emit(QImage(rgb.data, width, height, 3 * width, QImage.Format_RGB888).copy())
+        finally:
+            cap.release()
+
+
+class RecognitionWorker(QThread):
+    """Consumer: matches queued face batches against the gallery and marks attendance off the GUI thread."""
+
+    # (newly marked reg_nos, reg_nos already marked today)
+    batch_processed = pyqtSignal(list, list)
+    database_error = pyqtSignal(str)
+
+    def __init__(self, gallery, tracker, face_queue, parent=None):
+        super().__init__(parent)
+        self.gallery = gallery
+        self.tracker = tracker
+        self.face_queue = face_queue
+        self.writer = get_attendance_writer()
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        while self.running:
+            try:
+                track_ids, templates = self.face_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+
+            reg_nos = match_faces(self.gallery, templates)
+            for track_id, reg_no in zip(track_ids, reg_nos):
+                self.tracker.label(track_id, reg_no)
+
+            recognized = list(dict.fromkeys(str(reg_no) for reg_no in reg_nos if reg_no is not None))
+            if not recognized:
+                continue
+
+            # Journaled locally and written to MySQL in the background
+            try:
+                new = self.writer.record(recognized)
+            except StorageError as err:
+                self.database_error.emit(f"Could not record attendance: {err}")
+                continue
+            self.batch_processed.emit(new, [reg_no for reg_no in recognized if reg_no not in new])
 
 
 class MarkAttendanceScreen(QMainWindow):
@@ -12,8 +120,9 @@ class MarkAttendanceScreen(QMainWindow):
         super().__init__()
 
         self.staff_id = staff_id
+        self.recognized_count = 0
         self.setWindowTitle("Mark Attendance Screen")
-        self.setGeometry(100, 100, 500, 500)
+        self.setGeometry(100, 100, 700, 650)
         self.setStyleSheet("background-color: #2c3e50;")  # Dark background color
 
         # Main widget and layout
@@ -28,170 +137,118 @@ class MarkAttendanceScreen(QMainWindow):
         self.title_label.setEnabled(False)
         main_layout.addWidget(self.title_label)
 
+        # Live camera view
+        self.video_label = QLabel("Loading registered faces...", self)
+        self.video_label.setAlignment(Qt.AlignCenter)
+        self.video_label.setMinimumSize(640, 480)
+        self.video_label.setStyleSheet("color: white;")
+        main_layout.addWidget(self.video_label)
+
+        # Status line for recognition results
+        self.status_label = QLabel("Look at the camera.", self)
+        self.status_label.setAlignment(Qt.AlignCenter)
+        self.status_label.setStyleSheet("font-size: 16px; color: white;")
+        main_layout.addWidget(self.status_label)
+
+        # Stop button (replaces the old 'q' key of the OpenCV window)
+        self.stop_button = QPushButton("Stop", self)
+        self.stop_button.setStyleSheet("font-size: 16px; color: white; background-color: #c0392b; padding: 8px;")
+        self.stop_button.clicked.connect(self.stop_capture)
+        self.stop_button.setEnabled(False)
+        main_layout.addWidget(self.stop_button)
+
+        # Load the stored face templates in the background, before any frame is processed
+        self.capture_thread = None
+        self.closed = False
+        self.gallery = get_gallery()
+        run_async(self.gallery.ensure_loaded, on_result=self.on_gallery_loaded, owner=self)
+
+    def on_gallery_loaded(self, loaded):
+        if self.closed:
+            return
+        if not loaded:
+            QMessageBox.critical(self, "Database Error", "Could not load the stored faces.")
+
         # Start capturing face directly
+        self.video_label.setText("Starting camera...")
         self.capture_face()
 
     def capture_face(self):
-        """Capture and compare the face with the stored data."""
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            QMessageBox.critical(self, "Error", "Camera not accessible!")
+        """Start the capture and recognition threads; results arrive through Qt signals."""
+        self.tracker = FaceTracker(
+            stable_frames=config.STABLE_FRAMES,
+            detect_interval=config.DETECT_EVERY_N_FRAMES,
+            min_confidence=config.TRACKING_MIN_CONFIDENCE,
+        )
+        face_queue = queue.Queue(maxsize=8)
+
+        self.capture_thread = CaptureThread(self.tracker, face_queue, parent=self)
+        self.capture_thread.frame_ready.connect(self.show_frame)
+        self.capture_thread.camera_error.connect(self.on_camera_error)
+
+        self.recognition_worker = RecognitionWorker(self.gallery, self.tracker, face_queue, parent=self)
+        self.recognition_worker.batch_processed.connect(self.on_batch_processed)
+        self.recognition_worker.database_error.connect(
+            lambda message: QMessageBox.critical(self, "Database Error", message)
+        )
+
+        self.recognition_worker.start()
+        self.capture_thread.start()
+        self.stop_button.setEnabled(True)
+
+    def show_frame(self, image):
+        self.video_label.setPixmap(
+            QPixmap.fromImage(image).scaled(self.video_label.size(), Qt.KeepAspectRatio)
+        )
+
+    def on_batch_processed(self, marked, already):
+        """Show a non-modal summary of everyone checked in from one frame."""
+        self.recognized_count += len(marked) + len(already)
+        lines = []
+        if marked:
+            lines.append("Attendance marked as Present: " + ", ".join(marked))
+        if already:
+            lines.append("Already marked today: " + ", ".join(already))
+        self.status_label.setText("\n".join(lines))
+
+    def on_camera_error(self, message):
+        QMessageBox.critical(self, "Error", message)
+        self.stop_capture()
+
+    def stop_threads(self):
+        """Stop both threads and wait for them to finish."""
+        if self.capture_thread is None:
             return
+        for thread in (self.capture_thread, self.recognition_worker):
+            thread.stop()
+        for thread in (self.capture_thread, self.recognition_worker):
+            thread.wait()
+
+    def stop_capture(self):
+        """Stop capturing; if nobody was recognized, send the attendance for admin review."""
+        if self.capture_thread is None or not self.capture_thread.running:
+            return
+        self.stop_threads()
+        self.stop_button.setEnabled(False)
 
-        face_recognized = False
-
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-            faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-
-            if len(faces) > 0:
-                for (x, y, w, h) in faces:
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                    face_region = gray[y:y + h, x:x + w]
-                    face_resized = cv2.resize(face_region, (179, 179))
-
-                    # Pause for 3 seconds to ensure stability
-                    time.sleep(3)
-
-                    if self.compare_face(face_resized):
-                        QMessageBox.information(self, "Attendance", "Face recognized! Attendance marked successfully.")
-                        face_recognized = True
-                        break
-
-            if face_recognized:
-                break
-
-            cv2.imshow("Capturing Face", frame)
-
-            # Break the loop if user presses 'q' key
-            if cv2.waitKey(1) & 0xFF == ord("q"):
-                break
-
-        cap.release()
-        cv2.destroyAllWindows()
-
-        if not face_recognized:
+        if self.recognized_count == 0:
             QMessageBox.warning(self, "Face Not Detected", "Face not detected! Attendance sent to admin for review.")
             self.send_to_admin_review()
 
-    def compare_face(self, captured_face):
-        """Compare the captured face with stored face data in the database."""
-        try:
-            conn = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="attendance_system"
-            )
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT reg_no, face_path FROM users")
-            users = cursor.fetchall()
-
-            for user in users:
-                reg_no, stored_face_path = user
-                if stored_face_path and os.path.exists(stored_face_path):
-                    stored_face = cv2.imread(stored_face_path, cv2.IMREAD_GRAYSCALE)
-                    stored_face_resized = cv2.resize(stored_face, (179, 179))
-
-                    distance = np.linalg.norm(captured_face - stored_face_resized)
-
-                    if distance < 100:  # Adjust this threshold
-                        if self.check_attendance(reg_no):
-                            QMessageBox.information(self, "Attendance", "Attendance already marked for today!")
-                            return False
-                        self.mark_attendance(reg_no, is_present=True)
-                        return True
-
-            cursor.close()
-            conn.close()
-
-            return False
-
-        except mysql.connector.Error as err:
-            QMessageBox.critical(self, "Database Error", f"Error: {err}")
-            return False
-
-    def check_attendance(self, reg_no):
-        """Check if attendance is already marked for the student today."""
-        try:
-            conn = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="attendance_system"
-            )
-            cursor = conn.cursor()
-
-            cursor.execute(
-                "SELECT * FROM attendance WHERE reg_no = %s AND date = CURDATE()",
-                (reg_no,)
-            )
-            if cursor.fetchone():
-                cursor.close()
-                conn.close()
-                return True
-
-            cursor.close()
-            conn.close()
-            return False
-
-        except mysql.connector.Error as err:
-            QMessageBox.critical(self, "Database Error", f"Error: {err}")
-            return False
-
-    def mark_attendance(self, reg_no, is_present):
-        """Mark attendance in the database."""
-        try:
-            conn = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="attendance_system"
-            )
-            cursor = conn.cursor()
-
-            if is_present:
-                cursor.execute(
-                    "INSERT INTO attendance (reg_no, date, status) VALUES (%s, CURDATE(), 'Present')",
-                    (reg_no,)
-                )
-                QMessageBox.information(self, "Attendance", "Attendance marked as Present!")
-            conn.commit()
-            cursor.close()
-            conn.close()
-
-        except mysql.connector.Error as err:
-            QMessageBox.critical(self, "Database Error", f"Error: {err}")
+    def closeEvent(self, event):
+        self.closed = True
+        self.stop_threads()
+        super().closeEvent(event)
 
     def send_to_admin_review(self):
-        """Send the student ID to admin for review."""
-        try:
-            conn = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="attendance_system"
-            )
-            cursor = conn.cursor()
-
-            cursor.execute(
-                "INSERT INTO admin_review (staff_id, date, status, reviewed) VALUES (%s, CURDATE(), 'Pending', 0)",
-                (self.staff_id,)
-            )
-            conn.commit()
-            cursor.close()
-            conn.close()
-
-            QMessageBox.information(self, "Admin Review", "Your attendance has been sent for admin review.")
-
-        except mysql.connector.Error as err:
-            QMessageBox.critical(self, "Database Error", f"Error: {err}")
+        """Send the student ID to admin for review (in the background)."""
+        self.status_label.setText("Sending attendance for admin review...")
+        run_async(
+            get_backend().add_review, self.staff_id,
+            on_result=lambda _: self.status_label.setText("Your attendance has been sent for admin review."),
+            on_error=lambda err: QMessageBox.critical(self, "Database Error", f"Error: {err}"),
+            owner=self,
+        )
 
 
 if __name__ == "__main__":
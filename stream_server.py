@@ -0,0 +1,196 @@
+"""Headless recognition server for several classroom cameras.
+
+Each source gets a reader thread, and frames are fanned out to a pool of
+worker processes. Every worker memory-maps the same template store, so
+the gallery is shared read-only through the OS page cache. Recognized
+students go through the write-behind attendance journal, and per-stream FPS and latency
+are reported periodically.
+
+    python stream_server.py 0 1 rtsp://10.0.0.12/stream --workers 4
+    python stream_server.py recording.mp4 --dry-run
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from utils.attendance_writer import get_attendance_writer
+from utils.recognition import init_shared_matcher, prepare_shared_matcher, recognize_frame
+from utils.storage import StorageError
+
+
+def parse_source(source):
+    """Device indices are given as plain numbers; anything else is a URL or a file path."""
+    return int(source) if source.isdigit() else source
+
+
+class StreamStats:
+    """Frame counters and recent capture-to-result latencies of one stream."""
+
+    def __init__(self):
+        self.frames = 0
+        self.dropped = 0
+        self.faces = 0
+        self.latencies = deque(maxlen=1000)
+        self.window_frames = 0
+        self.window_start = time.perf_counter()
+
+    def record(self, latency, faces):
+        self.frames += 1
+        self.window_frames += 1
+        self.faces += faces
+        self.latencies.append(latency)
+
+    def take_fps(self):
+        """Frames per second since the previous call."""
+        now = time.perf_counter()
+        fps = self.window_frames / max(now - self.window_start, 1e-9)
+        self.window_frames = 0
+        self.window_start = now
+        return fps
+
+
+class StreamReader(threading.Thread):
+    """Reads one source and submits its frames to the process pool.
+
+    At most ``max_in_flight`` frames per stream are being processed at any
+    time. Live sources drop frames beyond that to keep latency low, while
+    video files wait so that no frame is skipped.
+    """
+
+    def __init__(self, stream_id, source, pool, results, stats, max_in_flight=2, stride=1):
+        super().__init__(daemon=True)
+        self.stream_id = stream_id
+        self.source = source
+        self.pool = pool
+        self.results = results
+        self.stats = stats
+        self.stride = max(1, stride)
+        self.live = not (isinstance(source, str) and os.path.isfile(source))
+        self.max_in_flight = max_in_flight
+        self.slots = threading.Semaphore(max_in_flight)
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            print(f"[{self.stream_id}] Could not open source {self.source!r}")
+            return
+        frame_no = 0
+        try:
+            while self.running:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame_no += 1
+                if frame_no % self.stride:
+                    continue
+                if not self.slots.acquire(blocking=not self.live):
+                    self.stats.dropped += 1
+                    continue
+
+                captured_at = time.perf_counter()
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                future = self.pool.submit(recognize_frame, gray)
+                future.add_done_callback(lambda f, t=captured_at: self._done(f, t))
+        finally:
+            cap.release()
+        # Wait for the frames still in flight before reporting the stream as finished
+        for _ in range(self.max_in_flight):
+            self.slots.acquire()
+
+    def _done(self, future, captured_at):
+        try:
+            reg_nos = future.result()
+            self.results.put((self.stream_id, time.perf_counter() - captured_at, reg_nos))
+        except Exception as e:
+            print(f"[{self.stream_id}] Recognition failed: {e}")
+        finally:
+            # Released only after the result is queued, so a finished stream has no results in flight
+            self.slots.release()
+
+
+def print_report(streams):
+    for stream_id, (reader, stats) in streams.items():
+        latencies = np.asarray(stats.latencies) * 1000.0 if stats.latencies else np.zeros(1)
+        print(
+            f"[{stream_id}] fps={stats.take_fps():6.1f}  frames={stats.frames}  dropped={stats.dropped}  "
+            f"faces={stats.faces}  latency mean={latencies.mean():7.1f}ms  p95={np.percentile(latencies, 95):7.1f}ms"
+            + ("" if reader.is_alive() else "  (finished)")
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="camera indices, RTSP/HTTP URLs or video files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="recognition processes")
+    parser.add_argument("--in-flight", type=int, default=2, help="frames per stream processed concurrently")
+    parser.add_argument("--stride", type=int, default=1, help="process every Nth frame of each stream")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="seconds between stats reports")
+    parser.add_argument("--dry-run", action="store_true", help="recognize only, do not mark attendance")
+    args = parser.parse_args()
+
+    if not prepare_shared_matcher():
+        return
+
+    results = queue.Queue()
+    seen = set()
+    writer = None if args.dry_run else get_attendance_writer()
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_shared_matcher) as pool:
+        streams = {}
+        for i, source in enumerate(args.sources):
+            stats = StreamStats()
+            reader = StreamReader(f"stream{i}", parse_source(source), pool, results, stats,
+                                  max_in_flight=args.in_flight, stride=args.stride)
+            streams[reader.stream_id] = (reader, stats)
+            reader.start()
+
+        next_report = time.perf_counter() + args.report_interval
+        try:
+            while True:
+                try:
+                    stream_id, latency, reg_nos = results.get(timeout=0.2)
+                    streams[stream_id][1].record(latency, len(reg_nos))
+                    recognized = [str(reg_no) for reg_no in reg_nos if reg_no is not None]
+                    seen.update(recognized)
+                    if writer and recognized:
+                        try:
+                            newly_marked = writer.record(recognized)
+                        except StorageError as e:
+                            print(f"[{stream_id}] Could not record attendance: {e}")
+                            newly_marked = []
+                        if newly_marked:
+                            print(f"[{stream_id}] Marked present: {', '.join(newly_marked)}")
+                except queue.Empty:
+                    pass
+
+                now = time.perf_counter()
+                if now >= next_report:
+                    print_report(streams)
+                    next_report = now + args.report_interval
+
+                if not any(reader.is_alive() for reader, _ in streams.values()) and results.empty():
+                    break
+        except KeyboardInterrupt:
+            print("Stopping...")
+            for reader, _ in streams.values():
+                reader.stop()
+
+    if writer and not writer.flush():
+        print(f"{writer.pending()} attendance events are still journaled and will be sent on the next start.")
+    print_report(streams)
+    print(f"Recognized {len(seen)} students: {', '.join(sorted(seen)) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,32 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton, QTabWidget, QFormLayout,
-    QGroupBox, QTableWidget, QTableWidgetItem, QMessageBox, QHBoxLayout
+    QGroupBox, QTableView, QHeaderView, QMessageBox, QHBoxLayout
 )
 from PyQt5.QtGui import QFont, QPixmap
 from PyQt5.QtCore import Qt
-import mysql.connector
+from utils.db_async import run_async
+from utils.paged_table_model import PagedTableModel
+from utils.storage import get_backend
+
+
+class AttendanceTableModel(PagedTableModel):
+    """A student's attendance, newest first, loaded a page at a time."""
+
+    def __init__(self, reg_no, page_size=100, parent=None):
+        super().__init__(["Date", "Status", "Remarks"], self.fetch_attendance_page, page_size, parent)
+        self.reg_no = reg_no
+
+    def fetch_attendance_page(self, last_row, limit):
+        # The last loaded date is the keyset cursor for the next page
+        before = last_row['date'] if last_row else None
+        return get_backend().get_attendance_page(self.reg_no, before, limit)
+
+    def display(self, record, column):
+        if column == 0:
+            return record['date'].strftime('%Y-%m-%d')
+        if column == 1:
+            return record['status']
+        return record['remarks'] or "No remarks"
 
 
 class StudentDashboard(QWidget):
@@ -101,12 +123,27 @@ class StudentDashboard(QWidget):
         attendance_tab = QWidget()
         layout = QVBoxLayout(attendance_tab)
 
-        # Attendance Table
-        self.attendance_table = QTableWidget()
-        self.attendance_table.setColumnCount(3)
-        self.attendance_table.setHorizontalHeaderLabels(["Date", "Status", "Remarks"])
+        # Overall attendance, read from the summary table (one row, however long the history)
+        self.attendance_summary = QLabel()
+        self.attendance_summary.setStyleSheet("color: #1b5e20; font-weight: bold;")
+        self.attendance_summary.setFont(QFont("Arial", 13))
+        layout.addWidget(self.attendance_summary)
+
+        # Loading / status line above the table
+        self.attendance_status = QLabel()
+        self.attendance_status.setStyleSheet("color: #455a64; font-style: italic;")
+        layout.addWidget(self.attendance_status)
+
+        # Attendance Table (model/view; rows are loaded page by page while scrolling)
+        self.attendance_model = AttendanceTableModel(self.user['reg_no'], parent=self)
+        self.attendance_model.loading_changed.connect(self.update_attendance_status)
+        self.attendance_model.load_failed.connect(self.attendance_load_failed)
+        self.attendance_table = QTableView()
+        self.attendance_table.setModel(self.attendance_model)
+        self.attendance_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.attendance_table.verticalHeader().setDefaultSectionSize(28)
         self.attendance_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #ffffff;
                 border: 1px solid #66bb6a;
             }
@@ -137,37 +174,33 @@ class StudentDashboard(QWidget):
         return settings_tab
 
     def load_attendance_data(self):
-        """Load attendance data into the table."""
-        connection = self.connect_database()
-        if not connection:
+        """(Re)load the attendance table; pages are fetched in the background as the user scrolls."""
+        self.attendance_model.reset()
+        run_async(get_backend().attendance_summary, self.user['reg_no'],
+                  on_result=self.show_attendance_summary, on_error=lambda _: self.attendance_summary.hide(), owner=self)
+
+    def show_attendance_summary(self, summary):
+        if not summary['total']:
+            self.attendance_summary.hide()
             return
-
-        try:
-            cursor = connection.cursor(dictionary=True)
-            query = "SELECT date, status, remarks FROM attendance WHERE reg_no = %s ORDER BY date DESC"
-            cursor.execute(query, (self.user['reg_no'],))
-            records = cursor.fetchall()
-
-            self.attendance_table.setRowCount(len(records))
-
-            for i, record in enumerate(records):
-                self.attendance_table.setItem(i, 0, QTableWidgetItem(record['date'].strftime('%Y-%m-%d')))
-                self.attendance_table.setItem(i, 1, QTableWidgetItem(record['status']))
-                self.attendance_table.setItem(i, 2, QTableWidgetItem(record['remarks'] or "No remarks"))
-        except mysql.connector.Error as e:
-            QMessageBox.critical(self, "Database Error", f"Could not fetch attendance data: {e}")
-        finally:
-            connection.close()
-
-    def connect_database(self):
-        """Connect to the MySQL database."""
-        try:
-            return mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="attendance_system"
-            )
-        except mysql.connector.Error as err:
-            QMessageBox.critical(self, "Database Error", f"Error: {err}")
-            return None
+        self.attendance_summary.setText(
+            f"Overall attendance: {summary['percentage']}% "
+            f"({summary['present']} present of {summary['total']} days, {summary['absent']} absent)"
+        )
+        self.attendance_summary.show()
+
+    def update_attendance_status(self, loading):
+        """Show a loading or empty-state line above the table."""
+        if loading and self.attendance_model.rowCount() == 0:
+            self.attendance_status.setText("Loading attendance...")
+            self.attendance_status.show()
+        elif self.attendance_model.is_empty():
+            self.attendance_status.setText("No attendance recorded yet.")
+            self.attendance_status.show()
+        elif not loading:
+            self.attendance_status.hide()
+
+    def attendance_load_failed(self, error):
+        self.attendance_status.setText("Could not load attendance.")
+        self.attendance_status.show()
+        QMessageBox.critical(self, "Database Error", f"Could not fetch attendance data: {error}")
@@ -1,8 +1,20 @@
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
 from PyQt5.QtCore import Qt
 from student_dashboard import StudentDashboard
-import mysql.connector
 import bcrypt
+from utils.db_async import run_async
+from utils.storage import StorageError, get_backend
+
+
+# Look up the student and verify the password; slow (database + bcrypt), so it runs off the GUI thread
+def authenticate_student(email, password):
+    """Return (user, None) on success, or (None, error message)."""
+    user = get_backend().get_user_by_email(email)
+    if not user:
+        return None, "Email not found."
+    if not bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
+        return None, "Incorrect password."
+    return user, None
 
 
 class Student_loginScreen(QWidget):
@@ -97,20 +109,6 @@ class Student_loginScreen(QWidget):
         # Connect the login button to its action
         self.login_button.clicked.connect(self.login)
 
-    def connect_database(self):
-        """Connect to the MySQL database."""
-        try:
-            connection = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="attendance_system"
-            )
-            return connection
-        except mysql.connector.Error as err:
-            QMessageBox.critical(self, "Database Error", f"Error connecting to database: {err}")
-            return None
-
     def login(self):
         """Validate credentials."""
         email = self.email_input.text().strip()
@@ -120,31 +118,31 @@ class Student_loginScreen(QWidget):
             QMessageBox.warning(self, "Login Failed", "Please fill in both email and password fields.")
             return
 
-        connection = self.connect_database()
-        if not connection:
+        # Check the credentials in the background; the window stays responsive meanwhile
+        self.set_loading(True)
+        run_async(authenticate_student, email, password,
+                  on_result=self.on_login_checked, on_error=self.on_login_failed, owner=self)
+
+    def set_loading(self, loading):
+        self.login_button.setEnabled(not loading)
+        self.login_button.setText("Logging in..." if loading else "Login")
+
+    def on_login_checked(self, outcome):
+        self.set_loading(False)
+        user, error = outcome
+        if error:
+            QMessageBox.warning(self, "Login Failed", error)
             return
+        self.dashboard_window = StudentDashboard(user)
+        self.dashboard_window.show()
+        self.close()
 
-        try:
-            cursor = connection.cursor(dictionary=True)
-            query = "SELECT * FROM users WHERE email = %s"
-            cursor.execute(query, (email,))
-            user = cursor.fetchone()
-
-            if user:
-                # Check password using bcrypt
-                if bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
-                    self.dashboard_window = StudentDashboard(user)
-                    self.dashboard_window.show()
-                    self.close()
-                else:
-                    QMessageBox.warning(self, "Login Failed", "Incorrect password.")
-            else:
-                QMessageBox.warning(self, "Login Failed", "Email not found.")
-        except mysql.connector.Error as err:
+    def on_login_failed(self, err):
+        self.set_loading(False)
+        if isinstance(err, StorageError):
             QMessageBox.critical(self, "Database Error", f"An error occurred: {err}")
-        finally:
-            connection.close()
-
+        else:
+            QMessageBox.critical(self, "Error", f"An unexpected error occurred: {err}")
 
 if __name__ == "__main__":
     app = QApplication([])
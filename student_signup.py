@@ -1,14 +1,19 @@
 import os
 import cv2
-import face_recognition
 import bcrypt
-import mysql.connector
+import numpy as np
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLineEdit, QPushButton, QLabel, QMessageBox,
     QComboBox, QDateEdit, QScrollArea, QHBoxLayout
 )
 from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QFont, QPixmap
+import config
+from utils.db_async import run_async
+from utils.face_encodings import get_encoding_gallery
+from utils.face_gallery import get_gallery
+from utils.face_normalizer import BurstSelector, face_image_path, save_face
+from utils.storage import StorageError, get_backend
 
 
 class StudentSignup(QWidget):
@@ -81,6 +86,10 @@ class StudentSignup(QWidget):
         layout = QVBoxLayout(self)
         layout.addWidget(scroll_area)
 
+        # Loading the encodings may backfill them from the legacy face images, which takes a
+        # while on the first run; start it now so the duplicate check later finds it done
+        run_async(get_encoding_gallery().ensure_loaded, owner=self)
+
     def create_input_field(self, placeholder, layout, is_password=False):
         field = QLineEdit()
         field.setPlaceholderText(placeholder)
@@ -114,26 +123,33 @@ class StudentSignup(QWidget):
             QMessageBox.warning(self, "Input Error", "Registration number is required.")
             return
 
-        face_dir = "D:/face/assets/faces"
-        os.makedirs(face_dir, exist_ok=True)
-        face_path = os.path.join(face_dir, f"{reg_no}.jpg")
-
         cap = cv2.VideoCapture(0)
-        QMessageBox.information(self, "Capture", "Press 's' to capture your face or 'q' to quit.")
+        QMessageBox.information(self, "Capture", "Look at the camera and press 's' to capture your face or 'q' to quit.")
 
-        while True:
+        # Burst capture: score the next BURST_FRAMES frames and keep the best BURST_SAMPLES
+        selector = BurstSelector(config.BURST_SAMPLES)
+        burst_frames = None
+        while burst_frames is None or burst_frames < config.BURST_FRAMES:
             ret, frame = cap.read()
             if not ret:
+                cap.release()
+                cv2.destroyAllWindows()
                 QMessageBox.critical(self, "Error", "Could not access the camera.")
                 return
 
-            cv2.imshow("Capture Face", frame)
+            if burst_frames is not None:
+                selector.offer(frame)
+                burst_frames += 1
+                preview = frame.copy()
+                cv2.putText(preview, f"Capturing {burst_frames}/{config.BURST_FRAMES}", (10, 30),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                cv2.imshow("Capture Face", preview)
+            else:
+                cv2.imshow("Capture Face", frame)
             key = cv2.waitKey(1) & 0xFF
 
-            if key == ord('s'):
-                cv2.imwrite(face_path, frame)
-                QMessageBox.information(self, "Success", "Face captured successfully!")
-                break
+            if key == ord('s') and burst_frames is None:
+                burst_frames = 0
             elif key == ord('q'):
                 cap.release()
                 cv2.destroyAllWindows()
@@ -142,53 +158,40 @@ class StudentSignup(QWidget):
         cap.release()
         cv2.destroyAllWindows()
 
-        if self.is_duplicate_face(face_path):
-            QMessageBox.warning(self, "Duplicate Error", "This face is already registered.")
-            os.remove(face_path)
+        # Detect, align and crop the kept faces; only these crops' vectors and the best crop are stored
+        faces = selector.normalized()
+        if not faces:
+            QMessageBox.warning(self, "Image Error", "No face found in the captured images. Please try again.")
+            return
+        QMessageBox.information(self, "Success", f"Face captured successfully ({len(faces)} samples)!")
+        encoding = np.mean([face.encoding for face in faces], axis=0)
+
+        # The duplicate check waits for the encodings to load, so keep it off the GUI thread
+        self.signup_button.setEnabled(False)
+        best_frame = selector.best_frame()
+        run_async(self.find_duplicate_face, encoding,
+                  on_result=lambda duplicate: self.on_duplicate_checked(duplicate, faces, encoding, best_frame),
+                  on_error=self.on_duplicate_check_failed, owner=self)
+
+    def on_duplicate_checked(self, duplicate, faces, encoding, original):
+        self.signup_button.setEnabled(True)
+        if duplicate:
+            reg_no, distance = duplicate
+            QMessageBox.warning(self, "Duplicate Error",
+                                f"This face is already registered (matches {reg_no}, distance {distance:.2f}).")
             return
 
-        self.register_user(face_path)
+        self.register_user(faces, encoding, original)
 
-    def is_duplicate_face(self, new_face_path):
-        try:
-            conn = mysql.connector.connect(
-                host="localhost", user="root", password="", database="attendance_system"
-            )
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT face_path FROM users")
-            face_paths = cursor.fetchall()
-
-            for (path,) in face_paths:
-                if path and os.path.exists(path):
-                    known_image = cv2.imread(path)
-
-                    # Ensure the image is in RGB format
-                    if known_image is None or known_image.ndim != 8:
-                        continue
-                    known_image_rgb = cv2.cvtColor(known_image, cv2.COLOR_BGR2RGB)
-
-                    new_image = cv2.imread(new_face_path)
-                    if new_image is None or new_image.ndim != 8:
-                        QMessageBox.warning(self, "Image Error", "Captured face image is invalid. Please try again.")
-                        return False
-                    # Convert the new image to RGB as well
-                    new_image_rgb = cv2.cvtColor(new_image, cv2.COLOR_BGR2RGB)
-
-                    # Extract face encodings
-                    known_encodings = face_recognition.face_encodings(known_image_rgb)
-                    new_encodings = face_recognition.face_encodings(new_image_rgb)
-
-                    if known_encodings and new_encodings:
-                        results = face_recognition.compare_faces([known_encodings[0]], new_encodings[0])
-                        if results[0]:
-                            return True
-            return False
-        finally:
-            cursor.close()
-            conn.close()
-
-    def register_user(self, face_path):
+    def on_duplicate_check_failed(self, error):
+        self.signup_button.setEnabled(True)
+        QMessageBox.critical(self, "Database Error", f"Could not check for duplicate faces: {error}")
+
+    def find_duplicate_face(self, encoding):
+        """Return (reg_no, distance) of an already enrolled face matching ``encoding``, or None."""
+        return get_encoding_gallery().find_duplicate(encoding)
+
+    def register_user(self, faces, encoding, original=None):
         first_name = self.first_name_input.text().strip()
         last_name = self.last_name_input.text().strip()
         reg_no = self.reg_no_input.text().strip()
@@ -207,29 +210,28 @@ class StudentSignup(QWidget):
         hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
 
         try:
-            conn = mysql.connector.connect(
-                host="localhost", user="root", password="", database="attendance_system"
-            )
-            cursor = conn.cursor()
-
-            query = """INSERT INTO users 
-                       (first_name, last_name, reg_no, email, password, class, gender, dob, parent_contact, member_type, face_path)
-                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""
-            data = (
-                first_name, last_name, reg_no, email, hashed_password,
-                student_class, gender, dob, parent_contact, member_type, face_path
-            )
-            cursor.execute(query, data)
-            conn.commit()
+            get_backend().create_user({
+                "first_name": first_name, "last_name": last_name, "reg_no": reg_no, "email": email,
+                "password": hashed_password, "class": student_class, "gender": gender, "dob": dob,
+                "parent_contact": parent_contact, "member_type": member_type,
+                "face_path": face_image_path(reg_no),
+            })
+
+            # Saved only once the row is inserted, so a taken reg_no never overwrites that user's face
+            try:
+                save_face(reg_no, faces[0], original)
+            except OSError as e:
+                QMessageBox.warning(self, "Warning", f"Registered, but the face image could not be saved: {e}")
+
+            # Store the vectors so the galleries never have to decode the JPEG
+            get_gallery().add_samples(reg_no, [face.template for face in faces])
+            get_encoding_gallery().add(reg_no, encoding)
 
             QMessageBox.information(self, "Success", "User registered successfully!")
             self.redirect_to_login()
 
-        except mysql.connector.Error as e:
+        except StorageError as e:
             QMessageBox.critical(self, "Database Error", f"Error: {e}")
-        finally:
-            cursor.close()
-            conn.close()
 
     def redirect_to_login(self):
         QMessageBox.information(self, "Redirect", "Redirecting to login page...")
@@ -0,0 +1,51 @@
+from datetime import date
+
+from utils.attendance_cache import MarkedTodayCache
+from utils.storage import StorageError
+
+
+class FakeBackend:
+    def __init__(self, marked=(), fail=False):
+        self.marked = set(marked)
+        self.fail = fail
+        self.queries = 0
+
+    def marked_on(self, day=None):
+        self.queries += 1
+        if self.fail:
+            raise StorageError("database is down")
+        return set(self.marked)
+
+
+def test_lookups_answer_from_own_marks_until_warm():
+    backend = FakeBackend(marked={"A"})
+    cache = MarkedTodayCache(backend)
+    cache.add(["B"])
+    assert "A" not in cache and "B" in cache
+    assert backend.queries == 0
+
+    assert cache.warm()
+    assert cache.unmarked(["A", "B", "C", "C"]) == ["C"]
+    assert cache.warm() and backend.queries == 1
+
+
+def test_marks_of_another_day_are_ignored():
+    cache = MarkedTodayCache(FakeBackend())
+    cache.add(["A"], day=date(2000, 1, 1))
+    cache.add(["B"], day=date.today())
+    assert "A" not in cache and "B" in cache
+
+
+def test_failed_warm_up_waits_before_retrying():
+    backend = FakeBackend(marked={"A"}, fail=True)
+    cache = MarkedTodayCache(backend, retry_after=3600)
+    assert not cache.warm()
+    backend.fail = False
+    assert not cache.warm()
+    assert backend.queries == 1
+
+    cache = MarkedTodayCache(backend, retry_after=0)
+    backend.fail = True
+    assert not cache.warm()
+    backend.fail = False
+    assert cache.warm() and "A" in cache
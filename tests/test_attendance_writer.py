@@ -0,0 +1,83 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from utils import attendance_writer
+from utils.attendance_writer import AttendanceWriter
+from utils.storage import SQLiteBackend, StorageError
+
+DAY = date(2024, 3, 4)
+
+
+class FlakyBackend(SQLiteBackend):
+    """A SQLite backend that can be taken offline."""
+
+    offline = False
+
+    def upsert_attendance(self, rows):
+        if self.offline:
+            raise StorageError("server has gone away")
+        super().upsert_attendance(rows)
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    backend = FlakyBackend(str(tmp_path / "attendance.db"))
+    monkeypatch.setattr(attendance_writer, "get_backend", lambda: backend)
+    return backend
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "journal.db")
+
+
+def test_events_left_by_a_crash_are_replayed_on_the_next_start(backend, journal_path):
+    crashed = AttendanceWriter(journal_path, batch_size=10, flush_interval=60)
+    assert crashed.record(["A", "B", "A"], day=DAY) == ["A", "B"]
+    crashed._journal.close()  # the process dies before the flusher ran
+
+    writer = AttendanceWriter(journal_path, batch_size=1, flush_interval=60)
+    assert writer.pending() == 2
+    assert writer.flush()
+    assert writer.pending() == 0
+    assert backend.marked_on(DAY) == {"A", "B"}
+
+
+def test_events_stay_journaled_while_the_backend_is_down(backend, journal_path):
+    writer = AttendanceWriter(journal_path, batch_size=10, flush_interval=60)
+    writer.record(["A"], day=DAY)
+    backend.offline = True
+    assert not writer.flush()
+    assert writer.pending() == 1
+
+    backend.offline = False
+    assert writer.flush()
+    assert writer.pending() == 0 and backend.marked_on(DAY) == {"A"}
+
+
+def test_replaying_events_twice_writes_each_mark_once(backend, journal_path):
+    writer = AttendanceWriter(journal_path, batch_size=10, flush_interval=60)
+    writer.record(["A"], day=DAY)
+    rows = writer._journal.execute("SELECT reg_no, day, status FROM events").fetchall()
+    backend.upsert_attendance(rows)  # sent, but the crash came before the journal was trimmed
+    assert writer.flush()
+    assert backend.get_attendance("A") == [{"date": DAY, "status": "Present", "remarks": None}]
+
+
+def test_today_is_journaled_once_per_student(backend, journal_path):
+    writer = AttendanceWriter(journal_path, batch_size=10, flush_interval=60)
+    assert writer.record(["A", "B"]) == ["A", "B"]
+    assert writer.record(["B", "C"]) == ["C"]
+    assert writer.pending() == 3
+
+
+def test_a_broken_journal_raises_storage_error(backend, journal_path):
+    writer = AttendanceWriter(journal_path, batch_size=10, flush_interval=60)
+    connection = sqlite3.connect(journal_path)
+    connection.execute("DROP TABLE events")
+    connection.commit()
+    connection.close()
+    with pytest.raises(StorageError):
+        writer.record(["A"], day=DAY)
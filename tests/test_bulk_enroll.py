@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("bcrypt")
+pytest.importorskip("cv2")
+pytest.importorskip("face_recognition")
+
+import bulk_enroll  # noqa: E402
+from bulk_enroll import BatchWriter, read_checkpoint, read_unfinished  # noqa: E402
+from utils.face_normalizer import NormalizedFace, face_image_path  # noqa: E402
+from utils.storage import SQLiteBackend  # noqa: E402
+
+
+class FakeGallery:
+    def __init__(self):
+        self.vectors = {}
+
+    def add_many(self, items):
+        self.vectors.update(items)
+
+    def find_duplicate(self, encoding, tolerance=None):
+        return None
+
+
+def user(reg_no, output_dir):
+    return {
+        "reg_no": reg_no, "first_name": reg_no, "last_name": "", "email": f"{reg_no}@example.com",
+        "password": b"hash", "class": "MCA", "gender": None, "dob": None, "parent_contact": None,
+        "member_type": "Student", "face_path": face_image_path(reg_no, output_dir),
+    }
+
+
+def face(seed):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 256, (8, 8, 3), dtype=np.uint8)
+    return NormalizedFace(image, rng.random(4, dtype=np.float32), rng.random(4, dtype=np.float32))
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    backend = SQLiteBackend(str(tmp_path / "attendance.db"))
+    monkeypatch.setattr(bulk_enroll, "get_backend", lambda: backend)
+    monkeypatch.setattr(bulk_enroll, "get_gallery", FakeGallery)
+    monkeypatch.setattr(bulk_enroll, "get_encoding_gallery", FakeGallery)
+    return backend
+
+
+def test_users_inserted_before_a_crash_are_finished_on_resume(backend, tmp_path, monkeypatch):
+    output_dir = str(tmp_path / "faces")
+    checkpoint = str(tmp_path / "students.csv.checkpoint")
+    faces = {reg_no: face(n) for n, reg_no in enumerate(["A", "B"])}
+
+    def crash(*args, **kwargs):
+        raise KeyboardInterrupt  # the process dies right after the commit
+
+    save_face = bulk_enroll.save_face
+    monkeypatch.setattr(bulk_enroll, "save_face", crash)
+    crashed = BatchWriter(checkpoint, batch_size=10, tolerance=0.5, output_dir=output_dir)
+    for reg_no in faces:
+        crashed.add("", user(reg_no, output_dir), faces[reg_no])
+    with pytest.raises(KeyboardInterrupt):
+        crashed.flush()
+    monkeypatch.setattr(bulk_enroll, "save_face", save_face)
+
+    done = read_checkpoint(checkpoint)
+    existing = {reg_no for reg_no, _ in backend.list_user_faces()}
+    assert done == set() and existing == {"A", "B"}
+    unfinished = read_unfinished(checkpoint, done, existing)
+    assert unfinished == {"A", "B"}
+
+    writer = BatchWriter(checkpoint, 10, 0.5, output_dir, existing, unfinished)
+    for reg_no in faces:
+        writer.add("", user(reg_no, output_dir), faces[reg_no])
+    writer.add("", user("C", output_dir), face(2))
+    writer.flush()
+
+    assert writer.failures == []
+    assert writer.enrolled == 3
+    assert read_checkpoint(checkpoint) == {"A", "B", "C"}
+    assert not os.path.exists(checkpoint + ".pending")
+    assert all(os.path.exists(face_image_path(reg_no, output_dir)) for reg_no in "ABC")
+    assert set(writer.templates.vectors) == {"A", "B", "C"}
+
+
+def test_a_reg_no_enrolled_elsewhere_is_not_taken_over(backend, tmp_path):
+    output_dir = str(tmp_path / "faces")
+    checkpoint = str(tmp_path / "students.csv.checkpoint")
+    backend.create_user(user("A", output_dir))
+
+    existing = {reg_no for reg_no, _ in backend.list_user_faces()}
+    assert read_unfinished(checkpoint, set(), existing) == set()
+    writer = BatchWriter(checkpoint, 10, 0.5, output_dir, existing)
+    writer.add("", user("A", output_dir), face(0))
+    writer.flush()
+
+    assert [(reg_no, reason) for reg_no, _, reason in writer.failures] == [("A", "reg_no is already enrolled")]
+    assert not os.path.exists(face_image_path("A", output_dir))
+    assert read_checkpoint(checkpoint) == set()
@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+
+from mysql.connector import Error  # noqa: E402
+from mysql.connector.errors import PoolError  # noqa: E402
+
+from utils import db_connection  # noqa: E402
+from utils.db_connection import ConnectionPool  # noqa: E402
+
+
+class FakeConnection:
+    def __init__(self):
+        self.in_transaction = False
+        self.connected = True
+        self.ping_fails = False
+        self.reconnects = 0
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        if self.ping_fails:
+            raise Error("MySQL server has gone away")
+
+    def reconnect(self, attempts=1, delay=0):
+        self.reconnects += 1
+        self.ping_fails = False
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def is_connected(self):
+        return self.connected
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Every connection the pool opens, in order; no server is contacted."""
+    opened = []
+
+    def connect(**kwargs):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(db_connection.mysql.connector, "connect", connect)
+    return opened
+
+
+def test_connections_are_opened_lazily_and_reused(connections):
+    pool = ConnectionPool(size=2, timeout=1, ping_after=60)
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    assert len(connections) == 1
+    assert pool.stats()["in_use"] == 1
+
+
+def test_acquire_times_out_when_every_connection_is_busy(connections):
+    pool = ConnectionPool(size=1, timeout=0.05, ping_after=60)
+    pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolError):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.05
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_a_waiting_caller_gets_the_released_connection(connections):
+    pool = ConnectionPool(size=1, timeout=5, ping_after=60)
+    connection = pool.acquire()
+    threading.Timer(0.05, pool.release, args=(connection,)).start()
+    assert pool.acquire() is connection
+    assert pool.stats()["waits"] == 1
+
+
+def test_idle_connections_are_pinged_and_reconnected(connections):
+    pool = ConnectionPool(size=1, timeout=1, ping_after=0)
+    connection = pool.acquire()
+    pool.release(connection)
+    connection.ping_fails = True
+    time.sleep(0.01)
+    assert pool.acquire() is connection
+    assert connection.reconnects == 1
+    stats = pool.stats()
+    assert stats["health_checks"] == 1 and stats["reconnects"] == 1
+
+
+def test_release_rolls_back_and_drops_broken_connections(connections):
+    pool = ConnectionPool(size=1, timeout=0.05, ping_after=60)
+    connection = pool.acquire()
+    connection.in_transaction = True
+    pool.release(connection)
+    assert connection.rollbacks == 1
+
+    connection = pool.acquire()
+    connection.connected = False
+    pool.release(connection)
+    assert pool.acquire() is not connection  # the slot was freed for a new connection
+    assert len(connections) == 2
+
+
+def test_a_failed_connect_frees_its_slot(monkeypatch):
+    def connect(**kwargs):
+        raise Error("Can't connect to MySQL server")
+
+    monkeypatch.setattr(db_connection.mysql.connector, "connect", connect)
+    pool = ConnectionPool(size=1, timeout=0.05, ping_after=60)
+    for _ in range(2):
+        with pytest.raises(Error) as raised:
+            pool.acquire()
+        assert not isinstance(raised.value, PoolError)
+    assert pool.stats()["open"] == 0
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from utils.embedding_store import EmbeddingStore
+
+DIM = 4
+
+
+def vector(value):
+    return np.full(DIM, value, dtype=np.float32)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EmbeddingStore("templates", DIM, directory=str(tmp_path))
+
+
+def test_vectors_survive_a_reopen(store, tmp_path):
+    store.add_many([("A", vector(1)), ("B", vector(2))])
+    keys, vectors = EmbeddingStore("templates", DIM, directory=str(tmp_path)).load()
+    assert keys == ["A", "B"]
+    assert isinstance(vectors, np.memmap)
+    np.testing.assert_array_equal(vectors, [vector(1), vector(2)])
+
+
+def test_replacing_and_removing_only_tombstone_rows(store):
+    store.add_many([("A", vector(1)), ("B", vector(2)), ("C", vector(3))])
+    store.add("A", vector(4))
+    store.remove("B")
+
+    assert len(store) == 2 and "B" not in store
+    keys, vectors = store.load()
+    assert keys == ["C", "A"]
+    np.testing.assert_array_equal(vectors, [vector(3), vector(4)])
+
+    row_keys, rows = store.load_rows()
+    assert row_keys == [None, None, "C", "A"]
+    assert rows.shape == (4, DIM)
+    assert store.dead_fraction() == 0.5
+
+
+def test_compact_drops_dead_rows(store, tmp_path):
+    store.add_many([("A", vector(1)), ("B", vector(2)), ("C", vector(3))])
+    store.remove("A")
+    store.compact()
+
+    assert store.dead_fraction() == 0.0
+    row_keys, rows = store.load_rows()
+    assert row_keys == ["B", "C"]
+    np.testing.assert_array_equal(rows, [vector(2), vector(3)])
+    assert (tmp_path / "templates.f32").stat().st_size == 2 * DIM * 4
+
+
+def test_two_instances_do_not_lose_each_others_rows(store, tmp_path):
+    other = EmbeddingStore("templates", DIM, directory=str(tmp_path))
+    store.add("A", vector(1))
+    other.add("B", vector(2))
+    store.add("C", vector(3))
+    other.remove("A")
+
+    for instance in (store, other):
+        keys, vectors = instance.load()
+        assert keys == ["B", "C"]
+        np.testing.assert_array_equal(vectors, [vector(2), vector(3)])
+
+    store.compact()
+    assert other.load_rows()[0] == ["B", "C"]
+
+
+def test_wrong_vector_size_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.add("A", np.zeros(DIM + 1, dtype=np.float32))
+    assert len(store) == 0
+
+
+def test_index_of_another_dimension_is_ignored(store, tmp_path):
+    store.add("A", vector(1))
+    assert EmbeddingStore("templates", DIM + 1, directory=str(tmp_path)).keys() == []
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from utils.face_matcher import BruteForceMatcher, IVFMatcher
+
+MATCHERS = [BruteForceMatcher, lambda: IVFMatcher(nlist=4, nprobe=4)]
+
+
+@pytest.fixture
+def gallery():
+    rng = np.random.default_rng(1)
+    centres = rng.normal(0, 50, size=(8, 16))
+    vectors = (centres[rng.integers(0, 8, 400)] + rng.normal(0, 1, size=(400, 16))).astype(np.float32)
+    return [f"user{i}" for i in range(len(vectors))], vectors
+
+
+def assert_exact(results, keys, vectors, probes, k, atol=0.01):
+    """Every result holds the k nearest rows (up to float32 ties) with their distances."""
+    rows = {key: i for i, key in enumerate(keys)}
+    for probe, result in zip(probes, results):
+        distances = np.linalg.norm(vectors.astype(np.float64) - probe, axis=1)
+        found = [distances[rows[key]] for key, _ in result]
+        np.testing.assert_allclose(found, np.sort(distances)[:k], atol=atol)
+        np.testing.assert_allclose([distance for _, distance in result], found, atol=atol)
+
+
+def test_brute_force_batch_search_is_exact(gallery):
+    keys, vectors = gallery
+    matcher = BruteForceMatcher()
+    matcher.build(keys, vectors)
+    probes = vectors[:10] + 0.5
+    assert_exact(matcher.search_many(probes, 3), keys, vectors, probes, 3)
+    single, batched = matcher.search(probes[0], 3), matcher.search_many(probes[:1], 3)[0]
+    assert [key for key, _ in single] == [key for key, _ in batched]
+    np.testing.assert_allclose([d for _, d in single], [d for _, d in batched], atol=0.01)
+
+
+@pytest.mark.parametrize("make_matcher", MATCHERS)
+def test_add_and_remove_update_the_results(gallery, make_matcher):
+    keys, vectors = gallery
+    matcher = make_matcher()
+    matcher.build(keys, vectors)
+    matcher.remove(keys[0])
+    assert keys[0] not in matcher and len(matcher) == len(keys) - 1
+    assert matcher.search(vectors[0])[0][0] != keys[0]
+
+    matcher.add("new", vectors[0] + 0.01)
+    assert matcher.search(vectors[0])[0][0] == "new"
+
+
+def test_empty_matcher_returns_no_matches():
+    matcher = BruteForceMatcher()
+    assert matcher.search(np.zeros(4)) == []
+    assert matcher.search_many(np.zeros((2, 4))) == [[], []]
+
+
+@pytest.mark.parametrize("make_matcher", MATCHERS)
+def test_deleted_rows_of_a_store_are_never_returned(gallery, make_matcher):
+    keys, vectors = gallery
+    keys = [None if i % 3 == 0 else key for i, key in enumerate(keys)]
+    matcher = make_matcher()
+    matcher.build(keys, vectors, center=False)
+
+    assert np.shares_memory(matcher.vectors, vectors)
+    assert len(matcher) == sum(key is not None for key in keys)
+    live = [i for i, key in enumerate(keys) if key is not None]
+    results = matcher.search_many(vectors[:6], 5)
+    assert all(key is not None for result in results for key, _ in result)
+    # Uncentred rows have large norms, so float32 cancellation costs more precision
+    assert_exact(results, [keys[i] for i in live], vectors[live], vectors[:6], 5, atol=0.2)
+
+
+def test_ivf_scanning_every_cell_is_exact(gallery):
+    keys, vectors = gallery
+    matcher = IVFMatcher(nlist=8, nprobe=8)
+    matcher.build(keys, vectors)
+    assert len(matcher.centroids) == 8
+    probes = vectors[:10] + 0.5
+    assert_exact(matcher.search_many(probes, 3), keys, vectors, probes, 3)
+
+
+def test_ivf_trains_on_a_sample_without_copying_the_gallery(gallery):
+    keys, vectors = gallery
+    matcher = IVFMatcher(nlist=2, nprobe=2, max_training_points=100)
+    matcher.build(keys, vectors, center=False)
+    assert np.shares_memory(matcher.vectors, vectors)
+    assert sorted(row for cell in matcher.lists for row in cell) == list(range(len(keys)))
+
+
+def test_ivf_reuses_a_trained_clustering(gallery):
+    keys, vectors = gallery
+    first = IVFMatcher(nlist=8, nprobe=2)
+    first.build(keys, vectors, center=False)
+
+    second = IVFMatcher(nlist=8, nprobe=2, seed=99)
+    second.build(keys, vectors, center=False, trained=first.trained_state())
+    np.testing.assert_array_equal(second.centroids, first.centroids)
+    np.testing.assert_array_equal(second.assignments, first.assignments)
+    assert second.search_many(vectors[:10], 3) == first.search_many(vectors[:10], 3)
+
+    # A clustering of other rows is not reused
+    third = IVFMatcher(nlist=8, nprobe=2, seed=99)
+    third.build(keys[:-1], vectors[:-1], center=False, trained=first.trained_state())
+    assert not np.array_equal(third.centroids, first.centroids)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from utils.face_tracker import FaceTracker, iou  # noqa: E402
+
+
+class FakeDetector:
+    """Returns the given boxes and counts how often it was run."""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.calls = 0
+
+    def detect(self, gray):
+        self.calls += 1
+        return list(self.boxes)
+
+
+def frame(shift=(0, 0)):
+    """A textured grayscale frame, optionally moved by (dx, dy) pixels."""
+    image = np.random.default_rng(0).integers(0, 256, size=(240, 320), dtype=np.uint8)
+    return np.roll(image, shift=(shift[1], shift[0]), axis=(0, 1))
+
+
+def test_iou():
+    assert iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert iou((0, 0, 10, 10), (20, 20, 10, 10)) == 0.0
+    assert iou((0, 0, 10, 10), (5, 0, 10, 10)) == pytest.approx(50 / 150)
+
+
+def test_detector_runs_only_every_n_frames_while_tracking_is_confident():
+    detector = FakeDetector([(100, 80, 60, 60)])
+    tracker = FaceTracker(stable_frames=3, detect_interval=4)
+    for _ in range(8):
+        tracks = tracker.track(frame(), detector)
+    assert detector.calls == 3  # frame 1 (no tracks yet), then every 4th frame: 4 and 8
+    assert len(tracks) == 1 and tracks[0].hits == 8
+
+
+def test_following_moves_the_box_with_the_face():
+    detector = FakeDetector([(100, 80, 60, 60)])
+    tracker = FaceTracker(detect_interval=10)
+    tracker.track(frame(), detector)
+    (track,) = tracker.track(frame(shift=(7, -4)), detector)
+    assert detector.calls == 1
+    assert track.box == (107, 76, 60, 60)
+    assert track.confidence > 0.99
+
+
+def test_lost_confidence_forces_a_detection():
+    detector = FakeDetector([(100, 80, 60, 60)])
+    tracker = FaceTracker(detect_interval=10, min_confidence=0.6)
+    tracker.track(frame(), detector)
+    unrelated = np.random.default_rng(1).integers(0, 256, size=(240, 320), dtype=np.uint8)
+    tracker.track(unrelated, detector)
+    assert detector.calls == 2
+
+
+def test_tracks_become_ready_once_and_are_dropped_after_misses():
+    detector = FakeDetector([(100, 80, 60, 60)])
+    tracker = FaceTracker(stable_frames=3, max_misses=2)
+    for _ in range(3):
+        (track,) = tracker.track(frame(), detector)
+    assert tracker.ready_for_recognition(track)
+
+    track.pending = True
+    assert not tracker.ready_for_recognition(track)
+    tracker.label(track.track_id, None)  # not recognized: has to be stable again
+    assert track.hits == 0 and not track.pending
+    tracker.label(track.track_id, "A")
+    assert not tracker.ready_for_recognition(track)
+
+    detector.boxes = []
+    for _ in range(3):
+        assert tracker.track(frame(), detector) == []
+    assert tracker.tracks == {}
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+import config  # noqa: E402
+from utils import face_gallery  # noqa: E402
+from utils.face_gallery import FaceGallery  # noqa: E402
+from utils.recognition import decide_match, match_faces  # noqa: E402
+
+SIZE = config.FACE_SIZE[::-1]  # (rows, columns)
+
+
+def smooth(rng, std):
+    """Smooth random image with the given grey level spread, like the broad shapes of a face."""
+    image = cv2.GaussianBlur(rng.normal(size=SIZE).astype(np.float32), (0, 0), 6)
+    return image * (std / image.std())
+
+
+def capture(face, rng):
+    """One capture of a face: a lighting change, up to a pixel of misalignment and sensor noise."""
+    shifted = np.roll(face, shift=tuple(rng.integers(-1, 2, size=2)), axis=(0, 1))
+    image = shifted + smooth(rng, 4) + rng.normal(scale=3, size=SIZE)
+    return np.clip(image, 0, 255).astype(np.float32).ravel()
+
+
+@pytest.fixture
+def faces():
+    """Face images of 12 identities that share a common mean face."""
+    rng = np.random.default_rng(0)
+    mean_face = 128 + smooth(rng, 30)
+    return [mean_face + smooth(rng, 20) for _ in range(12)]
+
+
+@pytest.fixture
+def gallery(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "EMBEDDINGS_PATH", str(tmp_path))
+    for store in ("_template_store", "_sample_store", "_spread_store"):
+        monkeypatch.setattr(face_gallery, store, None)
+    return FaceGallery()
+
+
+def enroll(gallery, faces, rng, samples=5):
+    for n, face in enumerate(faces):
+        gallery.add_samples(f"S{n}", [capture(face, rng) for _ in range(samples)])
+    gallery.load_stores()
+
+
+def test_thresholds_are_calibrated_in_template_units(gallery, faces):
+    rng = np.random.default_rng(1)
+    enroll(gallery, faces[:10], rng)
+    low, high = config.IDENTITY_THRESHOLD_RANGE
+    thresholds = [gallery.threshold(f"S{n}", config.MATCH_THRESHOLD) for n in range(10)]
+    assert all(config.MATCH_THRESHOLD * low <= t <= config.MATCH_THRESHOLD * high for t in thresholds)
+    # A few grey levels of noise per pixel must fit well under every threshold
+    assert min(thresholds) > 5 * config.TEMPLATE_SCALE
+
+    # Users enrolled from one capture get the median of the calibrated thresholds
+    gallery.add("single", capture(faces[10], rng))
+    assert gallery.threshold("single", config.MATCH_THRESHOLD) == pytest.approx(np.median(thresholds))
+
+
+def test_a_gallery_without_calibrated_users_uses_the_base_threshold(gallery, faces):
+    gallery.add("single", capture(faces[0], np.random.default_rng(1)))
+    gallery.load_stores()
+    assert gallery.threshold("single", config.MATCH_THRESHOLD) == config.MATCH_THRESHOLD
+
+
+def test_noisy_probes_match_their_users_and_strangers_do_not(gallery, faces):
+    rng = np.random.default_rng(1)
+    enroll(gallery, faces[:10], rng)
+
+    probes = np.stack([capture(face, rng) for face in faces])
+    results = match_faces(gallery, probes, with_scores=True)
+    assert [reg_no for reg_no, _ in results[:10]] == [f"S{n}" for n in range(10)]
+    assert all(score > 0.5 for _, score in results[:10])
+    assert results[10:] == [(None, 0.0), (None, 0.0)]  # faces[10:] are not enrolled
+
+
+def test_a_probe_between_two_similar_users_is_ambiguous(gallery, faces):
+    rng = np.random.default_rng(1)
+    twin = faces[0] + smooth(rng, 3)
+    enroll(gallery, [faces[0], twin], rng)
+
+    probe = capture((faces[0] + twin) / 2, rng)
+    matches = gallery.search(probe, k=2)
+    assert {reg_no for reg_no, _ in matches} == {"S0", "S1"}
+    assert decide_match(gallery, probe, matches, config.MATCH_THRESHOLD) == (None, 0.0)
+    assert decide_match(gallery, probe, matches[:1], config.MATCH_THRESHOLD)[0] == matches[0][0]
+
+
+def test_a_close_call_is_settled_by_the_enrollment_samples(gallery, faces):
+    rng = np.random.default_rng(1)
+    enroll(gallery, faces[:2], rng)
+    limit = gallery.threshold("S0", config.MATCH_THRESHOLD)
+
+    # The centroid alone would leave this probe just outside the threshold
+    probe = gallery._samples[gallery._sample_rows["S0"][0]]
+    reg_no, score = decide_match(gallery, probe, [("S0", limit * 1.1)], config.MATCH_THRESHOLD)
+    assert reg_no == "S0" and score > 0.9
@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+
+from mysql.connector import Error  # noqa: E402
+
+from utils import schema  # noqa: E402
+
+
+class FakeDatabase:
+    """Answers the queries the migrations make and records every statement."""
+
+    def __init__(self, indexes=(), duplicates=()):
+        self.indexes = set(indexes)
+        self.duplicates = list(duplicates)
+        self.applied = set()
+        self.statements = []
+        self.fail_on = None
+
+    @contextmanager
+    def cursor(self, dictionary=False, commit=False):
+        yield FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.result = []
+
+    def execute(self, statement, params=()):
+        database = self.database
+        if database.fail_on and database.fail_on in statement:
+            raise Error("simulated failure")
+        database.statements.append((statement, params))
+        self.result = []
+        if statement.startswith("SELECT version FROM schema_migrations"):
+            self.result = [(version,) for version in sorted(database.applied)]
+        elif statement.startswith("INSERT INTO schema_migrations"):
+            database.applied.add(params[0])
+        elif "information_schema.statistics" in statement:
+            self.result = [(1,)] if params[1] in database.indexes else []
+        elif "HAVING COUNT(*) > 1" in statement:
+            self.result = database.duplicates
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(schema, "db_cursor", database.cursor)
+    return database
+
+
+def executed(database, prefix):
+    return [statement for statement, _ in database.statements if statement.startswith(prefix)]
+
+
+def test_every_migration_is_applied_once_in_order(database):
+    assert schema.apply_migrations()
+    versions = [params[0] for statement, params in database.statements
+                if statement.startswith("INSERT INTO schema_migrations")]
+    assert versions == [version for version, _, _ in schema.MIGRATIONS]
+
+    count = len(database.statements)
+    assert schema.apply_migrations()
+    assert len(executed(database, "INSERT INTO schema_migrations")) == len(versions)
+    assert len(database.statements) == count + 2  # only the bookkeeping queries
+
+
+def test_unique_day_migration_removes_duplicates_and_adds_missing_indexes(database):
+    database.duplicates = [("A", "2024-03-04", 3)]
+    database.indexes = {"idx_attendance_date"}
+    schema._attendance_unique_day(FakeCursor(database))
+
+    deletes = [(statement, params) for statement, params in database.statements if statement.startswith("DELETE")]
+    assert deletes == [(deletes[0][0], ("A", "2024-03-04", 2))]
+    assert "ORDER BY status = 'Present'" in deletes[0][0]  # a Present row is the one kept
+    altered = " ".join(executed(database, "ALTER TABLE"))
+    assert "uq_attendance_reg_no_date" in altered and "idx_attendance_date" not in altered
+
+
+def test_a_failed_migration_is_not_recorded(database):
+    database.fail_on = "UNIQUE KEY uq_attendance_reg_no_date"
+    assert not schema.apply_migrations()
+    assert database.applied == set()
+
+    database.fail_on = None
+    assert schema.apply_migrations()
+    assert database.applied == {version for version, _, _ in schema.MIGRATIONS}
@@ -0,0 +1,188 @@
+import sqlite3
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+from utils.storage import MySQLBackend, SQLiteBackend, StorageError
+
+DAY = date(2024, 3, 4)
+SUMMARY_TABLES = ["attendance_summary_student", "attendance_summary_student_month", "attendance_summary_class_month"]
+
+
+def user(reg_no, student_class="MCA", member_type="Student"):
+    return {"reg_no": reg_no, "first_name": reg_no, "last_name": "Test", "email": f"{reg_no}@example.com",
+            "password": b"hash", "class": student_class, "member_type": member_type, "face_path": None}
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "attendance.db"))
+    backend.create_users([user("A"), user("B"), user("C", "BCA"), user("F", "BCA", member_type="Faculty")])
+    return backend
+
+
+def execute(backend, statement, params=()):
+    """Run a statement the backend has no method for (editing users, say) on its own connection."""
+    connection = sqlite3.connect(backend.path)
+    try:
+        rows = connection.execute(statement, params).fetchall()
+        connection.commit()
+        return rows
+    finally:
+        connection.close()
+
+
+def summaries(backend):
+    return {table: sorted(execute(backend, f"SELECT * FROM {table}")) for table in SUMMARY_TABLES}
+
+
+def test_mark_present_is_idempotent(backend):
+    assert backend.mark_present(["A", "B"], DAY) == ["A", "B"]
+    assert backend.mark_present(["A", "B", "C"], DAY) == ["C"]
+    assert backend.marked_on(DAY) == {"A", "B", "C"}
+    assert backend.is_marked("A", DAY) and not backend.is_marked("F", DAY)
+    assert backend.get_attendance("A") == [{"date": DAY, "status": "Present", "remarks": None}]
+
+
+def test_fresh_file_is_prepared_by_the_first_query(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "fresh.db"))
+    assert backend.get_attendance("A") == []
+    assert backend.attendance_summary("A") == {"present": 0, "absent": 0, "total": 0, "percentage": None}
+
+
+def test_duplicate_user_raises_storage_error(backend):
+    with pytest.raises(StorageError):
+        backend.create_user(user("A"))
+
+
+def test_create_admin_rejects_a_registered_email(backend):
+    assert backend.create_admin("Admin", "admin@example.com", b"hash")
+    assert not backend.create_admin("Other", "admin@example.com", b"hash")
+    assert backend.get_admin_by_email("admin@example.com")[1] == "Admin"
+
+
+def test_mysql_create_admin_relies_on_the_unique_key(monkeypatch):
+    mysql_connector = pytest.importorskip("mysql.connector")
+    from mysql.connector import errorcode
+    from utils import db_connection
+
+    emails, statements = set(), []
+
+    class Cursor:
+        def execute(self, statement, params=()):
+            statements.append(statement)
+            if params[1] in emails:
+                raise mysql_connector.IntegrityError("Duplicate entry", errno=errorcode.ER_DUP_ENTRY)
+            emails.add(params[1])
+
+    @contextmanager
+    def db_cursor(dictionary=False, commit=False):
+        yield Cursor()
+
+    monkeypatch.setattr(db_connection, "db_cursor", db_cursor)
+    backend = MySQLBackend()
+    backend._prepared = True
+    assert backend.create_admin("Admin", "admin@example.com", b"hash")
+    assert not backend.create_admin("Other", "admin@example.com", b"hash")
+    assert all(statement.startswith("INSERT") for statement in statements)
+
+
+def test_upsert_keeps_the_existing_row_and_mark_many_overwrites_it(backend):
+    backend.mark_present(["A"], DAY)
+    backend.upsert_attendance([("A", DAY, "Absent"), ("B", DAY, "Absent")])
+    assert backend.get_marked(["A", "B", "C"], DAY) == {"A", "B"}
+    assert backend.get_attendance("A")[0]["status"] == "Present"
+
+    backend.mark_many(DAY, [("A", "Absent"), ("C", "Present")])
+    assert backend.get_attendance("A")[0]["status"] == "Absent"
+    assert backend.get_attendance("C")[0]["status"] == "Present"
+
+
+def test_close_day_marks_only_the_missing_users_absent(backend):
+    backend.mark_present(["A"], DAY)
+    assert backend.close_day(DAY, member_type="Student") == 2
+    assert backend.get_marked(["A", "B", "C", "F"], DAY) == {"A", "B", "C"}
+    assert backend.close_day(DAY) == 1
+    assert backend.close_day(DAY) == 0
+    assert backend.get_attendance("A")[0]["status"] == "Present"
+    assert backend.get_attendance("F")[0]["status"] == "Absent"
+
+
+def test_attendance_pages_cover_the_history_once(backend):
+    days = [date(2024, 3, d) for d in range(1, 8)]
+    for day in days:
+        backend.mark_present(["A", "B"], day)
+
+    pages, before = [], None
+    while True:
+        page = backend.get_attendance_page("A", before=before, limit=3)
+        if not page:
+            break
+        pages.append(page)
+        before = page[-1]["date"]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [row["date"] for page in pages for row in page] == sorted(days, reverse=True)
+
+
+def test_review_pages_skip_decided_reviews(backend):
+    for staff_id in range(5):
+        backend.add_review(str(staff_id))
+    first = backend.pending_reviews_page(limit=2)
+    assert backend.decide_reviews([review_id for review_id, _, _, _ in first], "Approved") == 2
+    assert backend.decide_reviews([first[0][0]], "Rejected") == 0  # already decided
+
+    rest = backend.pending_reviews_page(after_review_id=first[-1][0], limit=2)
+    rest += backend.pending_reviews_page(after_review_id=rest[-1][0], limit=2)
+    assert [row[0] for row in rest] == [row[0] for row in backend.pending_reviews()]
+    assert len(rest) == 3
+
+
+def test_triggers_keep_the_summaries_equal_to_a_rebuild(backend):
+    backend.mark_present(["A", "B"], DAY)
+    backend.mark_present(["A", "C"], date(2024, 4, 1))
+    backend.close_day(DAY)
+    backend.update_attendance("B", DAY, "Absent")
+    backend.mark_many(date(2024, 4, 1), [("C", "Absent")])
+    backend.delete_attendance("F", DAY)
+
+    maintained = summaries(backend)
+    backend.rebuild_attendance_summary()
+    assert maintained == summaries(backend)
+
+    assert backend.attendance_summary("A") == {"present": 2, "absent": 0, "total": 2, "percentage": 100.0}
+    assert [row["month"] for row in backend.monthly_attendance("A")] == [date(2024, 4, 1), date(2024, 3, 1)]
+    march = backend.class_attendance("MCA", month=DAY)
+    assert march == [{"month": date(2024, 3, 1), "present": 1, "absent": 1, "total": 2, "percentage": 50.0}]
+
+
+def test_class_counts_follow_class_changes_and_deleted_users(backend):
+    backend.mark_present(["A"], DAY)
+    execute(backend, "UPDATE users SET class = 'BCA' WHERE reg_no = 'A'")
+    assert backend.class_attendance("MCA") == []
+    assert backend.class_attendance("BCA", month=DAY)[0]["present"] == 1
+
+    backend.delete_attendance("A", DAY)
+    assert backend.class_attendance("BCA") == []
+
+    backend.mark_present(["A", "B"], DAY)
+    execute(backend, "DELETE FROM users WHERE reg_no = 'B'")
+    execute(backend, "UPDATE users SET reg_no = 'A2', face_path = 'x.jpg' WHERE reg_no = 'A'")
+    backend.create_user(user("B", "MTech"))
+    maintained = summaries(backend)
+    backend.rebuild_attendance_summary()
+    assert maintained == summaries(backend)
+    assert backend.class_attendance("MTech", month=DAY)[0]["total"] == 1
+    assert backend.class_attendance("", month=DAY)[0]["total"] == 1  # A's row, no user under that reg_no now
+
+
+def test_summaries_are_recomputed_once_the_user_triggers_are_added(backend):
+    backend.mark_present(["A"], DAY)
+    # A database prepared before the users triggers existed, with a stale class count
+    execute(backend, "DROP TRIGGER trg_users_summary_update")
+    execute(backend, "UPDATE users SET class = 'BCA' WHERE reg_no = 'A'")
+    assert backend.class_attendance("BCA") == []
+
+    upgraded = SQLiteBackend(backend.path)
+    assert upgraded.class_attendance("BCA", month=DAY)[0]["present"] == 1
+    assert upgraded.class_attendance("MCA") == []
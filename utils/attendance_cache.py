@@ -0,0 +1,87 @@
+import threading
+import time
+from datetime import date
+
+from utils.storage import StorageError, get_backend
+
+
+class MarkedTodayCache:
+    """In-process set of the students already marked today.
+
+    ``warm()`` loads the day's marks with a single query, then ``add()``
+    keeps the set up to date on every successful mark, so a student
+    standing in front of the camera costs a set lookup, not a database
+    round trip. Lookups never query the database themselves: until the
+    set is warm they answer from what this process has marked itself,
+    which is safe because marking is idempotent. The set is reset as soon
+    as the date changes. ``warm()`` is meant for a background thread (the
+    attendance writer's flusher); after a failure it only tries again
+    once ``retry_after`` seconds have passed.
+    """
+
+    def __init__(self, backend=None, retry_after=30):
+        self.backend = backend
+        self.retry_after = retry_after
+        self._day = None
+        self._marked = set()
+        self._warmed = False
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def _roll_locked(self):
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._marked = set()
+            self._warmed = False
+            self._retry_at = 0.0
+
+    def warm(self):
+        """Load today's marks if they are not loaded yet. Returns True once the set is warm.
+
+        The query runs without holding the lock, so lookups are never
+        blocked by the database.
+        """
+        with self._lock:
+            self._roll_locked()
+            if self._warmed:
+                return True
+            if time.monotonic() < self._retry_at:
+                return False
+            day = self._day
+        try:
+            marked = (self.backend or get_backend()).marked_on(day)
+        except StorageError as e:
+            print(f"Error loading today's attendance: {e}")
+            with self._lock:
+                self._retry_at = time.monotonic() + self.retry_after
+            return False
+        with self._lock:
+            if self._day == day:
+                self._marked |= marked
+                self._warmed = True
+            return self._warmed
+
+    def today(self):
+        """Return today's date, rolling the cache over first if the day has changed."""
+        with self._lock:
+            self._roll_locked()
+            return self._day
+
+    def __contains__(self, reg_no):
+        with self._lock:
+            self._roll_locked()
+            return reg_no in self._marked
+
+    def unmarked(self, reg_nos):
+        """Return the reg_nos (deduplicated, in order) not yet marked today."""
+        with self._lock:
+            self._roll_locked()
+            return [reg_no for reg_no in dict.fromkeys(reg_nos) if reg_no not in self._marked]
+
+    def add(self, reg_nos, day=None):
+        """Record reg_nos as marked; marks for another day than today are ignored."""
+        with self._lock:
+            self._roll_locked()
+            if day is None or str(day) == self._day.isoformat():
+                self._marked.update(reg_nos)
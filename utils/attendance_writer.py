@@ -0,0 +1,150 @@
+import atexit
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import config
+from utils.attendance_cache import MarkedTodayCache
+from utils.storage import StorageError, get_backend
+
+
+class AttendanceWriter:
+    """Write-behind buffer between recognition and the storage backend.
+
+    ``record()`` only appends the events to a local SQLite journal (WAL
+    mode, fsync on commit) and returns. A background thread sends them to
+    the backend with one ``executemany`` upsert per batch. It flushes when
+    ``batch_size`` events are waiting or every ``flush_interval`` seconds,
+    and deletes events from the journal only after the backend has
+    committed them. Events still in the journal after a crash or an outage are
+    replayed on the next start. The replay is safe because the upsert is
+    idempotent.
+    """
+
+    def __init__(self, journal_path=None, batch_size=None, flush_interval=None):
+        self.journal_path = journal_path or config.JOURNAL_PATH
+        self.batch_size = batch_size or config.JOURNAL_BATCH_SIZE
+        self.flush_interval = flush_interval or config.JOURNAL_FLUSH_INTERVAL
+        self.marked_today = MarkedTodayCache()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        self._journal = sqlite3.connect(self.journal_path, check_same_thread=False)
+        self._journal.execute("PRAGMA journal_mode=WAL")
+        self._journal.execute("PRAGMA synchronous=FULL")
+        self._journal.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, reg_no TEXT NOT NULL, day TEXT NOT NULL, "
+            "status TEXT NOT NULL, recorded_at TEXT NOT NULL)"
+        )
+        self._journal.commit()
+
+    def start(self):
+        """Start the background flusher; anything left in the journal is replayed first."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+            self._thread.start()
+            self._wake.set()
+
+    def stop(self):
+        """Stop the flusher after a last attempt to send everything."""
+        if self._stopping:
+            return
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._journal.close()
+
+    def record(self, reg_nos, status="Present", day=None):
+        """Journal attendance for reg_nos and return those not already marked on that day.
+
+        Today's marks are checked against ``marked_today`` without touching
+        the database; the flusher thread loads them in the background. For
+        other days every reg_no is journaled, and the idempotent upsert
+        drops the ones that already exist. Raises StorageError if the
+        journal cannot be written.
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            today = self.marked_today.today().isoformat()
+            day = str(day or today)
+            if day == today:
+                new = self.marked_today.unmarked(reg_nos)
+            else:
+                new = list(dict.fromkeys(reg_nos))
+            try:
+                if new:
+                    self._journal.executemany(
+                        "INSERT INTO events (reg_no, day, status, recorded_at) VALUES (?, ?, ?, ?)",
+                        [(reg_no, day, status, now) for reg_no in new],
+                    )
+                    self._journal.commit()
+                    self.marked_today.add(new, day)
+                backlog = self._pending_locked()
+            except sqlite3.Error as e:
+                if self._journal.in_transaction:
+                    self._journal.rollback()
+                raise StorageError(f"Could not journal attendance: {e}") from e
+        if backlog >= self.batch_size:
+            self._wake.set()
+        return new
+
+    def pending(self):
+        """Number of journaled events not yet written to the backend."""
+        with self._lock:
+            return self._pending_locked()
+
+    def _pending_locked(self):
+        return self._journal.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def flush(self):
+        """Send journaled events to the backend in batches. Returns False if it is unreachable."""
+        while True:
+            with self._lock:
+                batch = self._journal.execute(
+                    "SELECT id, reg_no, day, status FROM events ORDER BY id LIMIT ?", (self.batch_size,)
+                ).fetchall()
+            if not batch:
+                return True
+            try:
+                get_backend().upsert_attendance([(reg_no, day, status) for _, reg_no, day, status in batch])
+            except StorageError as e:
+                print(f"Error writing attendance batch: {e}")
+                return False
+            with self._lock:
+                self._journal.execute("DELETE FROM events WHERE id <= ?", (batch[-1][0],))
+                self._journal.commit()
+
+    def _run(self):
+        while True:
+            # Today's marks are loaded here, never on the recording (recognition) thread;
+            # warm() is a no-op once loaded and rate-limits its own retries
+            self.marked_today.warm()
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            if self._stopping:
+                return
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+# Helper function to get the process-wide attendance writer, started on first use
+def get_attendance_writer():
+    """Return the shared AttendanceWriter; it is flushed and stopped at interpreter exit."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AttendanceWriter()
+            _writer.start()
+            atexit.register(_writer.stop)
+        return _writer
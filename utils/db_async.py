@@ -0,0 +1,64 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, pyqtSignal
+
+import config
+
+
+class _Bridge(QObject):
+    """Lives in the GUI thread; signals emitted from worker threads are queued onto it."""
+
+    done = pyqtSignal(object, object, object)  # (owner, callback, value)
+
+    def __init__(self):
+        super().__init__()
+        self.done.connect(self._deliver)
+
+    def _deliver(self, owner, callback, value):
+        # The screen may have been closed while the query was running
+        if owner is not None and sip.isdeleted(owner):
+            return
+        callback(value)
+
+
+_executor = None
+_bridge = None
+_init_lock = threading.Lock()
+
+
+def _setup():
+    global _executor, _bridge
+    with _init_lock:
+        if _executor is None:
+            # More threads than pooled connections would only queue inside the pool
+            _executor = ThreadPoolExecutor(max_workers=config.DB_POOL_SIZE, thread_name_prefix="db")
+            _bridge = _Bridge()
+    return _executor, _bridge
+
+
+# Run a (usually database) call in the background and get the result back on the GUI thread
+def run_async(fn, *args, on_result=None, on_error=None, owner=None, **kwargs):
+    """Run ``fn(*args, **kwargs)`` on the database thread pool and return its Future.
+
+    ``on_result(value)`` or ``on_error(exception)`` is then called on the
+    GUI thread through a queued signal, so it may touch widgets. If
+    ``owner`` (a QObject) has been deleted by then, neither is called.
+    Must be called from the GUI thread the first time.
+    """
+    executor, bridge = _setup()
+    future = executor.submit(fn, *args, **kwargs)
+
+    def finished(future):
+        error = future.exception()
+        if error is None:
+            if on_result is not None:
+                bridge.done.emit(owner, on_result, future.result())
+        elif on_error is not None:
+            bridge.done.emit(owner, on_error, error)
+        else:
+            print(f"Background database call failed: {error}")
+
+    future.add_done_callback(finished)
+    return future
@@ -1,22 +1,195 @@
+import threading
+import time
+from contextlib import contextmanager
+
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.constants import ClientFlag
+from mysql.connector.errors import PoolError
 from datetime import date
 
+import config
+from utils.storage import StorageError, get_backend
+
+
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections shared by the whole process.
+
+    Connections are opened lazily, up to ``size``. When every connection is
+    busy, ``acquire`` waits up to ``timeout`` seconds and then raises a
+    PoolError. A connection that has been idle for more than
+    ``ping_after`` seconds is pinged (and reconnected if needed) before it
+    is handed out, so stale connections never reach the caller.
+    """
+
+    def __init__(self, size, timeout, ping_after, **connect_args):
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.connect_args = connect_args
+        self._idle = []  # (connection, returned_at), most recently used last
+        self._created = 0
+        self._cond = threading.Condition()
+        self._stats = {"checkouts": 0, "waits": 0, "timeouts": 0, "health_checks": 0,
+                       "reconnects": 0, "peak_in_use": 0}
+
+    def acquire(self):
+        """Check out a raw connection, opening a new one if the pool is not full yet."""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            waited = False
+            while not self._idle and self._created >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolError("No database connection available in the pool.")
+                waited = True
+                self._cond.wait(remaining)
+            self._stats["waits"] += waited
+            self._stats["checkouts"] += 1
+
+            if self._idle:
+                connection, returned_at = self._idle.pop()
+            else:
+                connection, returned_at = None, None
+                self._created += 1
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._created - len(self._idle))
+
+        try:
+            if connection is None:
+                return mysql.connector.connect(**self.connect_args)
+            if time.monotonic() - returned_at > self.ping_after:
+                self._count("health_checks")
+                try:
+                    connection.ping(reconnect=False)
+                except Error:
+                    self._count("reconnects")
+                    connection.reconnect(attempts=2, delay=0)
+            return connection
+        except Error:
+            self._discard()
+            raise
+
+    def release(self, connection):
+        """Return a connection to the pool, rolling back anything left uncommitted."""
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+            healthy = connection.is_connected()
+        except Error:
+            healthy = False
+        if not healthy:
+            self._discard()
+            return
+        with self._cond:
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def _count(self, name):
+        with self._cond:
+            self._stats[name] += 1
+
+    def _discard(self):
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    def stats(self):
+        """Return a snapshot of the pool usage counters."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(size=self.size, open=self._created, idle=len(self._idle),
+                         in_use=self._created - len(self._idle))
+            return stats
+
+
+class PooledConnection:
+    """A borrowed connection; ``close()`` hands it back to the pool instead of closing it."""
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection)
+
+    def is_connected(self):
+        return self._connection is not None and self._connection.is_connected()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Helper function to get the process-wide connection pool, configured from config.py
+def get_pool():
+    """Return the shared ConnectionPool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                size=config.DB_POOL_SIZE,
+                timeout=config.DB_POOL_TIMEOUT,
+                ping_after=config.DB_POOL_PING_AFTER,
+                host=config.DB_HOST,
+                user=config.DB_USER,
+                password=config.DB_PASSWORD,
+                database=config.DB_NAME,
+                # Report changed rows, not matched rows, so upserts can tell inserts from no-ops
+                client_flags=[-ClientFlag.FOUND_ROWS],
+            )
+        return _pool
+
+
 # Helper function to get a MySQL database connection
 def get_connection():
-    """Helper function to get a MySQL database connection."""
+    """Borrow a pooled MySQL connection; closing it returns it to the pool."""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",  # MySQL host (typically localhost for XAMPP/WAMP)
-            user="root",       # MySQL username (default for XAMPP/WAMP)
-            password="",       # MySQL password (empty by default for XAMPP)
-            database="attendance_system"  # Replace with your actual database name
-        )
-        return connection
+        pool = get_pool()
+        return PooledConnection(pool, pool.acquire())
     except Error as e:
         print(f"Error connecting to database: {e}")
         return None
 
+
+# Context manager wrapping a pooled connection and cursor
+@contextmanager
+def db_cursor(dictionary=False, commit=False):
+    """Yield a cursor on a pooled connection.
+
+    With ``commit=True`` the transaction is committed when the block
+    finishes; on any exception it is rolled back. The cursor and
+    connection are always released. Database errors propagate to the
+    caller as mysql.connector.Error.
+    """
+    pool = get_pool()
+    connection = PooledConnection(pool, pool.acquire())
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=dictionary)
+        yield cursor
+        if commit:
+            connection.commit()
+    except Exception:
+        try:
+            connection.rollback()
+        except Error:
+            pass
+        raise
+    finally:
+        close_connection(connection, cursor)
+
+
+# Helper function to report how the connection pool is being used
+def get_pool_stats():
+    """Return pool usage statistics (open, idle and in-use connections, checkouts, waits...)."""
+    return get_pool().stats()
+
 # Helper function to close the database connection and cursor
 def close_connection(connection, cursor):
     """Helper function to close the database connection and cursor."""
@@ -28,80 +201,41 @@ def close_connection(connection, cursor):
     except Error as e:
         print(f"Error closing connection: {e}")
 
-# Fetch attendance records for a given student by student_id
-def get_attendance(student_id):
-    """Fetch attendance records for a given student."""
-    connection = None
-    cursor = None
+# The attendance helpers below run on the configured storage backend (utils/storage.py).
+# The attendance table is keyed by reg_no; the old student_id/student_name columns do not exist.
+
+# Fetch attendance records for a given student by reg_no
+def get_attendance(reg_no):
+    """Fetch attendance records for a given student, newest first."""
     try:
-        connection = get_connection()
-        if connection:
-            cursor = connection.cursor()
-            query = "SELECT * FROM attendance WHERE student_id = %s"
-            cursor.execute(query, (student_id,))
-            records = cursor.fetchall()  # Fetch all records
-            return records
-        else:
-            return None
-    except Error as e:
+        return get_backend().get_attendance(reg_no)
+    except StorageError as e:
         print(f"Error fetching attendance: {e}")
         return None
-    finally:
-        close_connection(connection, cursor)
 
-# Insert a new attendance record for a student
-def insert_attendance(student_id, student_name, date, status):
-    """Insert an attendance record for a student."""
-    connection = None
-    cursor = None
-    try:
-        connection = get_connection()
-        if connection:
-            cursor = connection.cursor()
-            query = "INSERT INTO attendance (student_id, student_name, date, status) VALUES (%s, %s, %s, %s)"
-            cursor.execute(query, (student_id, student_name, date, status))
-            connection.commit()
-            print(f"Attendance for {student_name} on {date} marked as {status}.")
-    except Error as e:
-        print(f"Error inserting attendance: {e}")
-    finally:
-        close_connection(connection, cursor)
+# Insert a new attendance record for a student (kept for compatibility; prefer mark_many)
+def insert_attendance(reg_no, student_name, date, status):
+    """Insert or update the attendance record of a student on ``date``."""
+    if mark_many(date, [(reg_no, status)]):
+        print(f"Attendance for {student_name} on {date} marked as {status}.")
 
 # Update attendance record for a student on a given date
-def update_attendance(student_id, date, new_status):
+def update_attendance(reg_no, date, new_status):
     """Update attendance record for a student on a given date."""
-    connection = None
-    cursor = None
     try:
-        connection = get_connection()
-        if connection:
-            cursor = connection.cursor()
-            query = "UPDATE attendance SET status = %s WHERE student_id = %s AND date = %s"
-            cursor.execute(query, (new_status, student_id, date))
-            connection.commit()
-            print(f"Attendance for student ID {student_id} on {date} updated to {new_status}.")
-    except Error as e:
+        get_backend().update_attendance(reg_no, date, new_status)
+        print(f"Attendance for {reg_no} on {date} updated to {new_status}.")
+    except StorageError as e:
         print(f"Error updating attendance: {e}")
-    finally:
-        close_connection(connection, cursor)
 
 # Delete attendance record for a student on a given date
-def delete_attendance(student_id, date):
+def delete_attendance(reg_no, date):
     """Delete an attendance record for a student on a given date."""
-    connection = None
-    cursor = None
     try:
-        connection = get_connection()
-        if connection:
-            cursor = connection.cursor()
-            query = "DELETE FROM attendance WHERE student_id = %s AND date = %s"
-            cursor.execute(query, (student_id, date))
-            connection.commit()
-            print(f"Attendance record for student ID {student_id} on {date} deleted.")
-    except Error as e:
+        get_backend().delete_attendance(reg_no, date)
+        print(f"Attendance record for {reg_no} on {date} deleted.")
+    except StorageError as e:
         print(f"Error deleting attendance: {e}")
-    finally:
-        close_connection(connection, cursor)
 
 # Get today's date in YYYY-MM-DD format
 def get_today():
@@ -109,14 +243,54 @@ def get_today():
     return date.today().strftime("%Y-%m-%d")
 
 # Insert or update attendance for the current day
-def mark_attendance_for_today(student_id, student_name, status):
-    """Mark attendance for today. If already present, update the status."""
-    today = get_today()
-    # Check if attendance already exists for today
-    existing_record = get_attendance(student_id)
-    
-    # If attendance exists, update the status, else insert a new record
-    if existing_record:
-        update_attendance(student_id, today, status)
-    else:
-        insert_attendance(student_id, student_name, today, status)
+def mark_attendance_for_today(reg_no, student_name, status):
+    """Mark attendance for today. If already present, update the status.
+
+    A single upsert on the (reg_no, date) key: no history fetch, one connection.
+    """
+    insert_attendance(reg_no, student_name, get_today(), status)
+
+# Check whether one student already has attendance for a day
+def is_marked(reg_no, day=None):
+    """Return True if reg_no has a row for today (or ``day``), False if not, None on error."""
+    try:
+        return get_backend().is_marked(reg_no, day)
+    except StorageError as e:
+        print(f"Error checking attendance: {e}")
+        return None
+
+# Find which of the given students already have attendance for a day
+def get_marked(reg_nos, day=None):
+    """Return the set of reg_nos already marked for today (or ``day``), or None on error."""
+    try:
+        return get_backend().get_marked(reg_nos, day)
+    except StorageError as e:
+        print(f"Error checking attendance: {e}")
+        return None
+
+# Mark a whole class at once
+def mark_many(day, marks):
+    """Set the status of every (reg_no, status) in ``marks`` on ``day`` with one executemany.
+
+    Existing rows are updated, missing ones inserted, all in one
+    transaction. Returns True once committed.
+    """
+    try:
+        get_backend().mark_many(day, marks)
+        return True
+    except StorageError as e:
+        print(f"Error marking attendance: {e}")
+        return False
+
+# Record absentees at the end of a day
+def close_day(day=None, member_type=None):
+    """Mark everyone (optionally only ``member_type``) without a row on ``day`` absent.
+
+    One INSERT ... SELECT in a single transaction. Returns the number of
+    absentees recorded, or None on error.
+    """
+    try:
+        return get_backend().close_day(day, member_type)
+    except StorageError as e:
+        print(f"Error closing the day: {e}")
+        return None
@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import config
+
+# Bump whenever the on-disk layout changes
+STORE_VERSION = 1
+
+
+class EmbeddingStore:
+    """Persistent, memory-mapped store of fixed-size float32 vectors keyed by reg_no.
+
+    Each store is two files in ``directory``: ``<name>.f32`` holds the raw
+    rows back to back and ``<name>.json`` is the versioned index mapping
+    every row to its key. Adding a vector appends one row and rewrites the
+    small index; removing one only tombstones its row until ``compact()``.
+    Loading memory-maps the rows, so no image has to be decoded.
+
+    Several processes may use one store (the attendance screen next to
+    bulk_enroll.py, say): every change holds an exclusive lock on
+    ``<name>.lock`` and re-reads the index first, and reads hold a
+    shared lock, so no process works from a stale copy of the index.
+    """
+
+    def __init__(self, name, dim, directory=None):
+        self.name = name
+        self.dim = dim
+        self.directory = directory or config.EMBEDDINGS_PATH
+        self.data_path = os.path.join(self.directory, f"{name}.f32")
+        self.index_path = os.path.join(self.directory, f"{name}.json")
+        self.lock_path = os.path.join(self.directory, f"{name}.lock")
+        self._lock = threading.RLock()
+        self._rows = []
+        self._index_stamp = None
+        self._lock_depth = 0  # flock is per open file, so nested sections must not lock again
+        self._refresh_index()
+
+    @contextmanager
+    def _locked(self, exclusive=True):
+        """Hold the thread lock and the inter-process file lock, with the index freshly read."""
+        with self._lock:
+            if self._lock_depth:
+                yield
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.lock_path, "a+b") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                self._lock_depth += 1
+                try:
+                    self._refresh_index()
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                    else:
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _refresh_index(self):
+        """Re-read the index if another process (or instance) has replaced it since we last read it."""
+        try:
+            stat = os.stat(self.index_path)
+            stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self._index_stamp:
+            self._rows = self._read_index()
+            self._index_stamp = stamp
+
+    def _read_index(self):
+        """Return the per-row key list from the index file (None = deleted)."""
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != STORE_VERSION or index.get("dim") != self.dim:
+            print(f"Ignoring incompatible embedding store {self.index_path}.")
+            return []
+        return index["rows"]
+
+    def _write_index(self):
+        """Atomically replace the index file."""
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": STORE_VERSION, "dim": self.dim, "rows": self._rows}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        stat = os.stat(self.index_path)
+        self._index_stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def __len__(self):
+        with self._locked(exclusive=False):
+            return sum(1 for key in self._rows if key is not None)
+
+    def __contains__(self, key):
+        with self._locked(exclusive=False):
+            return key in self._rows
+
+    def keys(self):
+        """Return the keys of all live rows, in insertion order."""
+        with self._locked(exclusive=False):
+            return [key for key in self._rows if key is not None]
+
+    def _map_locked(self):
+        rows = list(self._rows)
+        if not rows or not os.path.exists(self.data_path):
+            return [], np.empty((0, self.dim), dtype=np.float32)
+        return rows, np.memmap(self.data_path, dtype=np.float32, mode="r", shape=(len(rows), self.dim))
+
+    def load(self):
+        """Return (keys, vectors) for all live rows; vectors is read-only and memory-mapped."""
+        with self._locked(exclusive=False):
+            rows, vectors = self._map_locked()
+        live = [i for i, key in enumerate(rows) if key is not None]
+        if len(live) == len(rows):
+            return rows, vectors
+        return [rows[i] for i in live], vectors[live]
+
+    def load_rows(self):
+        """Return (row keys, vectors) including deleted rows (key None), so row numbers stay stable."""
+        with self._locked(exclusive=False):
+            return self._map_locked()
+
+    def add(self, key, vector):
+        """Store (or replace) the vector for ``key``."""
+        self.add_many([(key, vector)])
+
+    def add_many(self, items):
+        """Store several (key, vector) pairs with a single append and index write."""
+        items = list(items)
+        if not items:
+            return
+        block = np.stack([np.asarray(v, dtype=np.float32).ravel() for _, v in items])
+        if block.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of size {self.dim}, got {block.shape[1]}")
+
+        with self._locked():
+            new_keys = {key for key, _ in items}
+            self._rows = [None if key in new_keys else key for key in self._rows]
+
+            expected_size = len(self._rows) * self.dim * 4
+            with open(self.data_path, "ab") as f:
+                # Drop rows written by an append whose index update never landed
+                if f.tell() != expected_size:
+                    f.truncate(expected_size)
+                    f.seek(0, os.SEEK_END)
+                f.write(block.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._rows.extend(key for key, _ in items)
+            self._write_index()
+
+    def remove(self, key):
+        """Forget the vector stored for ``key``."""
+        self.remove_many([key])
+
+    def remove_many(self, keys):
+        """Forget the vectors of several keys with a single index write."""
+        keys = set(keys)
+        with self._locked():
+            if not keys.intersection(self._rows):
+                return
+            self._rows = [None if k in keys else k for k in self._rows]
+            self._write_index()
+
+    def dead_fraction(self):
+        """Share of the rows in the data file that are deleted."""
+        with self._locked(exclusive=False):
+            return sum(1 for key in self._rows if key is None) / len(self._rows) if self._rows else 0.0
+
+    def compact(self):
+        """Rewrite the data file without deleted rows.
+
+        Processes that have the old file memory-mapped keep reading it; the
+        new one is only seen by the next ``load()``.
+        """
+        with self._locked():
+            rows, vectors = self._map_locked()
+            live = [i for i, key in enumerate(rows) if key is not None]
+            if len(live) == len(rows):
+                return
+            tmp_path = self.data_path + ".tmp"
+            np.ascontiguousarray(vectors[live], dtype=np.float32).tofile(tmp_path)
+            os.replace(tmp_path, self.data_path)
+            self._rows = [rows[i] for i in live]
+            self._write_index()
@@ -0,0 +1,92 @@
+import math
+import threading
+
+import cv2
+
+# Haar cascade file for each detector name, relative to cv2.data.haarcascades
+DETECTOR_MODELS = {
+    "frontalface": "haarcascade_frontalface_default.xml",
+    "eye": "haarcascade_eye.xml",
+}
+
+# Largest head tilt (degrees) corrected by alignment; steeper eye pairs are usually false detections
+MAX_ALIGN_ANGLE = 20
+
+
+class FaceDetector:
+    """A cascade classifier loaded once, with its default detection parameters."""
+
+    def __init__(self, model_path, scale_factor=1.1, min_neighbors=5, min_size=(30, 30)):
+        self.classifier = cv2.CascadeClassifier(model_path)
+        if self.classifier.empty():
+            raise ValueError(f"Could not load detector model: {model_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        # A cascade classifier must not run detectMultiScale from two threads at once
+        self._lock = threading.Lock()
+
+    def detect(self, gray, scale_factor=None, min_neighbors=None, min_size=None):
+        """Return the (x, y, w, h) boxes found in a grayscale image."""
+        with self._lock:
+            boxes = self.classifier.detectMultiScale(
+                gray,
+                scaleFactor=scale_factor or self.scale_factor,
+                minNeighbors=min_neighbors or self.min_neighbors,
+                minSize=min_size or self.min_size,
+            )
+        return [tuple(int(v) for v in box) for box in boxes]
+
+
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+
+# Helper function to get a detector, loading its model only on first use
+def get_detector(name="frontalface"):
+    """Return the process-wide FaceDetector registered under ``name``."""
+    with _detectors_lock:
+        detector = _detectors.get(name)
+        if detector is None:
+            if name not in DETECTOR_MODELS:
+                raise ValueError(f"Unknown detector: {name}")
+            detector = FaceDetector(cv2.data.haarcascades + DETECTOR_MODELS[name])
+            _detectors[name] = detector
+        return detector
+
+
+# Helper function to find how far a face has to be rotated to level its eyes
+def eye_level_rotation(gray, box):
+    """Return the 2x3 matrix rotating a grayscale image about the centre of ``box`` so its eyes are level.
+
+    The eyes are searched in the upper half of the face. Returns None
+    when two plausible eyes are not found.
+    """
+    x, y, w, h = box
+    eyes = get_detector("eye").detect(gray[y:y + h // 2, x:x + w], min_size=(w // 10, h // 10))
+    if len(eyes) < 2:
+        return None
+
+    # The two largest candidates, left to right, by their centres
+    eyes = sorted(eyes, key=lambda eye: eye[2] * eye[3], reverse=True)[:2]
+    (lx, ly), (rx, ry) = sorted((ex + ew / 2, ey + eh / 2) for ex, ey, ew, eh in eyes)
+    if rx - lx < w / 5:
+        return None
+    angle = math.degrees(math.atan2(ry - ly, rx - lx))
+    if abs(angle) > MAX_ALIGN_ANGLE:
+        return None
+    return cv2.getRotationMatrix2D((x + w / 2, y + h / 2), angle, 1.0)
+
+
+# Helper function to cut a face out of an image, levelled
+def crop_aligned(image, box, rotation=None):
+    """Return the ``box`` region of ``image`` after applying ``rotation`` (see eye_level_rotation).
+
+    Only the box is warped, not the whole image.
+    """
+    x, y, w, h = box
+    if rotation is None:
+        return image[y:y + h, x:x + w]
+    shifted = rotation.copy()
+    shifted[:, 2] -= (x, y)
+    return cv2.warpAffine(image, shifted, (w, h), borderMode=cv2.BORDER_REPLICATE)
@@ -0,0 +1,91 @@
+import cv2
+import face_recognition
+import numpy as np
+
+import config
+from utils.embedding_store import EmbeddingStore
+from utils.face_gallery import FaceGallery, is_normalized
+from utils.face_matcher import BruteForceMatcher
+
+# Size of a face_recognition (dlib) face encoding
+ENCODING_DIM = 128
+
+
+# Helper function to compute the face_recognition encoding of a captured image
+def encode_face(bgr_image, box=None):
+    """Return the float32 encoding of the first face in a BGR image, or None if there is no face.
+
+    ``box`` (x, y, w, h) encodes that face instead of searching the image for one.
+    """
+    rgb_image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2RGB)
+    locations = None
+    if box is not None:
+        x, y, w, h = box
+        locations = [(y, x + w, y + h, x)]
+    encodings = face_recognition.face_encodings(rgb_image, known_face_locations=locations)
+    return encodings[0].astype(np.float32) if encodings else None
+
+
+_encoding_store = None
+
+
+# Helper function to get the persistent store of face encodings
+def get_encoding_store():
+    """Return the shared EmbeddingStore holding one face_recognition encoding per reg_no."""
+    global _encoding_store
+    if _encoding_store is None:
+        _encoding_store = EmbeddingStore("encodings", ENCODING_DIM)
+    return _encoding_store
+
+
+class EncodingGallery(FaceGallery):
+    """Cached matrix of every user's face encoding, used for the duplicate check at enrollment.
+
+    A new capture is encoded once and compared against all stored
+    encodings in one vectorized distance computation. Search is always
+    exact (brute force): even at tens of thousands of users that is a
+    few milliseconds.
+    """
+
+    def __init__(self):
+        super().__init__(BruteForceMatcher())
+
+    def store(self):
+        return get_encoding_store()
+
+    def sample_store(self):
+        return None  # one (centroid) encoding per user is enough for the duplicate check
+
+    def vector_from_image(self, face_path):
+        image = cv2.imread(face_path)
+        if image is None:
+            return None
+        # A normalized face image is the face box itself
+        return encode_face(image, box=(0, 0, image.shape[1], image.shape[0]) if is_normalized(image) else None)
+
+    def closest(self, encoding):
+        """Return (reg_no, distance) of the closest enrolled face, or (None, None) if nobody is enrolled."""
+        if not self.ensure_loaded():
+            raise RuntimeError("Could not load the stored face encodings.")
+        results = self.search(encoding)
+        return results[0] if results else (None, None)
+
+    def find_duplicate(self, encoding, tolerance=None):
+        """Return (reg_no, distance) if an enrolled face is within ``tolerance`` of ``encoding``, else None."""
+        tolerance = config.DUPLICATE_FACE_TOLERANCE if tolerance is None else tolerance
+        reg_no, distance = self.closest(encoding)
+        if reg_no is not None and distance <= tolerance:
+            return reg_no, distance
+        return None
+
+
+_encoding_gallery = None
+
+
+# Helper function to get the process-wide encoding gallery
+def get_encoding_gallery():
+    """Return the shared EncodingGallery, created on first use."""
+    global _encoding_gallery
+    if _encoding_gallery is None:
+        _encoding_gallery = EncodingGallery()
+    return _encoding_gallery
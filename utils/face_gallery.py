@@ -0,0 +1,337 @@
+import hashlib
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+import config
+from utils.embedding_store import EmbeddingStore
+from utils.face_detector import crop_aligned, eye_level_rotation, get_detector
+from utils.face_matcher import create_matcher
+from utils.storage import StorageError, get_backend
+
+FACE_DIM = config.FACE_SIZE[0] * config.FACE_SIZE[1]
+
+
+# Helper function to turn a grayscale face image into a matching template
+def preprocess_face(gray_face):
+    """Resize a grayscale face to FACE_SIZE and flatten it to a float32 vector."""
+    resized = cv2.resize(gray_face, config.FACE_SIZE, interpolation=cv2.INTER_AREA)
+    return resized.astype(np.float32).ravel()
+
+
+# Helper function to build the template of a detected face the way enrollment does
+def face_template(gray, box):
+    """Level the eyes, crop ``box`` from a grayscale image and turn it into a template.
+
+    Probes must go through the same alignment and resize as the enrolled
+    faces (see utils.face_normalizer.normalize_face), or their distances
+    to the enrolled templates grow for reasons unrelated to identity.
+    """
+    return preprocess_face(crop_aligned(gray, box, eye_level_rotation(gray, box)))
+
+
+# Helper function to tell enrollment crops (see utils.face_normalizer) from legacy full captures
+def is_normalized(image):
+    """True if a stored face image is already a FACE_SIZE face crop."""
+    return (image.shape[1], image.shape[0]) == tuple(config.FACE_SIZE)
+
+
+_template_store = None
+
+
+# Helper function to get the persistent store of face templates
+def get_template_store():
+    """Return the shared EmbeddingStore holding one template per reg_no."""
+    global _template_store
+    if _template_store is None:
+        _template_store = EmbeddingStore("templates", FACE_DIM)
+    return _template_store
+
+
+_sample_store = None
+
+
+# Helper function to get the persistent store of per-user enrollment samples
+def get_sample_store():
+    """Return the shared EmbeddingStore holding the individual templates of multi-sample enrollments.
+
+    Keys are ``<reg_no>/<n>``; the main template store holds their centroid.
+    """
+    global _sample_store
+    if _sample_store is None:
+        _sample_store = EmbeddingStore("samples", FACE_DIM)
+    return _sample_store
+
+
+def _sample_owner(key):
+    return key.rpartition("/")[0]
+
+
+_spread_store = None
+
+
+# Helper function to get the persistent store of per-user sample spreads
+def get_spread_store():
+    """Return the shared EmbeddingStore holding, per reg_no, how far its samples lie from their centroid."""
+    global _spread_store
+    if _spread_store is None:
+        _spread_store = EmbeddingStore("spreads", 1)
+    return _spread_store
+
+
+# Helper function to calibrate a user's match threshold from their enrollment samples
+def sample_spread(templates):
+    """Largest distance from a sample to the centroid, or None for fewer than two samples."""
+    templates = np.asarray(templates, dtype=np.float32)
+    if len(templates) < 2:
+        return None
+    return float(np.sqrt(((templates - templates.mean(axis=0)) ** 2).sum(axis=1).max()))
+
+
+def calibrated_threshold(spread):
+    """Match threshold, in template distance units, of a user whose samples lie up to ``spread`` from their centroid."""
+    return config.IDENTITY_SPREAD_SCALE * spread + config.MATCH_NOISE_FLOOR
+
+
+class FaceGallery:
+    """In-memory cache of the face templates of every enrolled user.
+
+    The templates are read once from the persistent template store and
+    kept in the matcher selected by config.MATCHER. Enrollment and
+    deletion can either update the cache in place with ``add``/``remove``
+    or call ``invalidate()`` so the next ``ensure_loaded()`` reloads it.
+    Subclasses can cache a different kind of vector by overriding
+    ``store()`` and ``vector_from_image()``.
+
+    Users enrolled from several captures (``add_samples``) are matched by
+    the centroid of their templates; the individual samples stay
+    memory-mapped and are only compared for close calls, through
+    ``sample_distances()``. Their spread around the centroid also sets
+    a per-user match threshold, see ``threshold()``.
+    """
+
+    def __init__(self, matcher=None):
+        self.matcher = matcher if matcher is not None else create_matcher()  # empty matchers are falsy
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._samples = np.empty((0, 0), dtype=np.float32)
+        self._sample_rows = {}  # reg_no -> row numbers in self._samples
+        self._thresholds = {}   # reg_no -> threshold calibrated from the sample spread
+        self._typical_threshold = None  # median of self._thresholds
+
+    def __len__(self):
+        return len(self.matcher)
+
+    def store(self):
+        """The persistent store backing this cache."""
+        return get_template_store()
+
+    def sample_store(self):
+        """The persistent store of enrollment samples, or None if this kind of gallery keeps none."""
+        return get_sample_store()
+
+    def vector_from_image(self, face_path):
+        """Vector for a user enrolled before the store existed, or None if the image is unreadable."""
+        stored_face = cv2.imread(face_path, cv2.IMREAD_GRAYSCALE)
+        if stored_face is None:
+            return None
+        if not is_normalized(stored_face):
+            # Users enrolled before faces were normalized have the whole frame on disk
+            boxes = get_detector().detect(stored_face)
+            if boxes:
+                return face_template(stored_face, max(boxes, key=lambda box: box[2] * box[3]))
+        return preprocess_face(stored_face)
+
+    def load(self):
+        """Sync the template store with the users table and rebuild the cache."""
+        try:
+            users = get_backend().list_user_faces()
+        except StorageError as e:
+            print(f"Error loading face gallery: {e}")
+            return False
+
+        store = self.store()
+        enrolled = set(store.keys())
+
+        # Users enrolled before the store existed are decoded from their JPEG once
+        missing = []
+        for reg_no, face_path in users:
+            if reg_no in enrolled or not face_path:
+                continue
+            vector = self.vector_from_image(face_path)
+            if vector is not None:
+                missing.append((reg_no, vector))
+        store.add_many(missing)
+
+        # Drop templates of users that no longer exist
+        known = {reg_no for reg_no, _ in users}
+        store.remove_many(set(store.keys()) - known)
+        sample_store = self.sample_store()
+        if sample_store is not None:
+            sample_store.remove_many(key for key in sample_store.keys() if _sample_owner(key) not in known)
+            get_spread_store().remove_many(set(get_spread_store().keys()) - known)
+
+        # Re-enrollment and deletion leave dead rows behind; rewrite a store once they pile up
+        for vector_store in (store, sample_store):
+            if vector_store is not None and vector_store.dead_fraction() > config.EMBEDDINGS_MAX_DEAD_FRACTION:
+                vector_store.compact()
+
+        self.load_stores()
+        return True
+
+    def load_stores(self, center=True):
+        """Build the cache from the persistent stores alone, without syncing them with the database.
+
+        Worker processes use this with ``center=False`` so the memory-mapped
+        templates are shared instead of copied (see utils.recognition).
+        """
+        # Dead rows stay in the matcher as tombstones, so the memory map is used as is
+        reg_nos, templates = self.store().load_rows()
+        with self._lock:
+            self._build_matcher(reg_nos, templates, center)
+            self._load_samples()
+            self.loaded = True
+
+    def _build_matcher(self, reg_nos, templates, center):
+        """Build the matcher, reusing a clustering saved by another process for exactly these rows."""
+        if not hasattr(self.matcher, "trained_state"):
+            self.matcher.build(reg_nos, templates, center=center)
+            return
+
+        store = self.store()
+        path = os.path.join(store.directory, f"{store.name}.ivf.npz")
+        fingerprint = hashlib.sha1(json.dumps([reg_nos, self.matcher.nlist]).encode("utf-8")).hexdigest()
+        trained = None
+        try:
+            with np.load(path) as saved:
+                if str(saved["fingerprint"]) == fingerprint:
+                    trained = {"centroids": saved["centroids"], "assignments": saved["assignments"]}
+        except (OSError, KeyError, ValueError):
+            pass  # missing or unreadable: train and save a new one
+
+        self.matcher.build(reg_nos, templates, center=center, trained=trained)
+        state = self.matcher.trained_state()
+        if trained is None and state is not None:
+            tmp_path = path + ".tmp.npz"
+            np.savez(tmp_path, fingerprint=fingerprint, **state)
+            os.replace(tmp_path, path)
+
+    def _load_samples(self):
+        sample_store = self.sample_store()
+        if sample_store is None:
+            return
+        keys, self._samples = sample_store.load_rows()
+        self._sample_rows = {}
+        for row, key in enumerate(keys):
+            if key is not None:
+                self._sample_rows.setdefault(_sample_owner(key), []).append(row)
+        reg_nos, spreads = get_spread_store().load()
+        self._thresholds = {reg_no: calibrated_threshold(float(spread[0])) for reg_no, spread in zip(reg_nos, spreads)}
+        self._typical_threshold = float(np.median(list(self._thresholds.values()))) if self._thresholds else None
+
+    def ensure_loaded(self):
+        """Load the cache if it has not been loaded yet or was invalidated."""
+        with self._lock:
+            if self.loaded:
+                return True
+            return self.load()
+
+    def invalidate(self):
+        """Mark the cache as stale so the next access reloads it."""
+        with self._lock:
+            self.loaded = False
+
+    def add(self, reg_no, template):
+        """Persist a newly enrolled template and add it to the loaded cache."""
+        self.store().add(reg_no, template)
+        with self._lock:
+            if self.loaded:
+                self.matcher.add(reg_no, template)
+
+    def add_many(self, items):
+        """Persist (reg_no, template) pairs with one index write and add them to the loaded cache."""
+        self.store().add_many(items)
+        with self._lock:
+            if self.loaded:
+                for reg_no, template in items:
+                    self.matcher.add(reg_no, template)
+
+    def add_samples(self, reg_no, templates):
+        """Persist the templates of several captures of one user and cache their centroid."""
+        templates = np.stack([np.asarray(template, dtype=np.float32).ravel() for template in templates])
+        sample_store = self.sample_store()
+        spread = sample_spread(templates)
+        with self._lock:
+            sample_store.remove_many(key for key in sample_store.keys() if _sample_owner(key) == reg_no)
+            sample_store.add_many((f"{reg_no}/{n}", template) for n, template in enumerate(templates))
+            if spread is None:
+                get_spread_store().remove(reg_no)
+            else:
+                get_spread_store().add(reg_no, [spread])
+            if self.loaded:
+                self._load_samples()
+        self.add(reg_no, templates.mean(axis=0))
+
+    def remove(self, reg_no):
+        """Forget the templates of a deleted user."""
+        self.store().remove(reg_no)
+        sample_store = self.sample_store()
+        if sample_store is not None:
+            sample_store.remove_many(key for key in sample_store.keys() if _sample_owner(key) == reg_no)
+            get_spread_store().remove(reg_no)
+        with self._lock:
+            if self.loaded:
+                self.matcher.remove(reg_no)
+                self._load_samples()
+
+    def search(self, template, k=1):
+        """Return the ``k`` closest (reg_no, distance) pairs for a template."""
+        with self._lock:
+            return self.matcher.search(template, k)
+
+    def search_many(self, templates, k=1):
+        """Return the ``k`` closest (reg_no, distance) pairs for each row of ``templates``."""
+        with self._lock:
+            return self.matcher.search_many(templates, k)
+
+    def threshold(self, reg_no, base):
+        """Match threshold of one user, calibrated from their enrollment samples (see calibrated_threshold).
+
+        Users enrolled from a single capture get the median threshold of
+        the calibrated users, or ``base`` while there are none. Every
+        threshold is kept within IDENTITY_THRESHOLD_RANGE times ``base``.
+        """
+        calibrated = self._thresholds.get(reg_no, self._typical_threshold)
+        if calibrated is None:
+            return base
+        low, high = config.IDENTITY_THRESHOLD_RANGE
+        return min(max(calibrated, base * low), base * high)
+
+    def sample_distances(self, template, reg_nos):
+        """Distance from ``template`` to the closest enrollment sample of each reg_no (None if it has none)."""
+        template = np.asarray(template, dtype=np.float32).ravel()
+        with self._lock:
+            rows = [self._sample_rows.get(reg_no) for reg_no in reg_nos]
+            samples = self._samples
+        return [
+            None if not user_rows else float(np.sqrt(((samples[user_rows] - template) ** 2).sum(axis=1).min()))
+            for user_rows in rows
+        ]
+
+
+_gallery = FaceGallery()
+
+
+# Helper function to get the process-wide face gallery
+def get_gallery():
+    """Return the shared FaceGallery instance."""
+    return _gallery
+
+
+# Helper function to drop the cached gallery after enrollment or deletion
+def invalidate_gallery():
+    """Invalidate the shared gallery so it is reloaded on next use."""
+    _gallery.invalidate()
@@ -0,0 +1,318 @@
+import numpy as np
+
+import config
+
+
+class _VectorIndex:
+    """Row storage shared by the matchers: keys, centred float32 vectors and their norms.
+
+    Vectors are centred on the mean of the gallery they were built from,
+    which keeps the norms small and the float32 cancellation error low for
+    near-identical faces. Rows live in a buffer that grows geometrically,
+    so ``add`` is amortised O(D); ``remove`` only tombstones the row by
+    giving it an infinite norm, which keeps it out of every result.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.positions = {}
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.norms = np.empty(0, dtype=np.float32)
+        self.mean = None
+        self.size = 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def build(self, keys, vectors, center=True):
+        """Index ``vectors`` (N, D), whose rows belong to ``keys``.
+
+        With ``center=False`` a contiguous float32 input (such as a
+        memory-mapped store) is used in place instead of being copied, so
+        several processes can share one read-only gallery. A key of None
+        marks a deleted row, which is kept in place but never returned.
+        """
+        keys = list(keys)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dead = np.array([key is None for key in keys], dtype=bool)
+        self.mean = np.zeros(vectors.shape[-1], dtype=np.float32)
+        if center and len(keys) > dead.sum():
+            self.mean = vectors[~dead].mean(axis=0) if dead.any() else vectors.mean(axis=0)
+            vectors = vectors - self.mean
+        self.vectors = np.ascontiguousarray(vectors)
+        self.norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        self.norms[dead] = np.inf
+        self.keys = keys
+        self.positions = {key: i for i, key in enumerate(keys) if key is not None}
+        self.size = len(keys)
+        self._on_build()
+
+    def add(self, key, vector):
+        """Insert (or replace) the vector stored for ``key``."""
+        self.remove(key)
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        if self.mean is None:
+            self.mean = np.zeros_like(vector)
+        vector = vector - self.mean
+
+        if self.size == len(self.vectors):
+            capacity = max(16, 2 * len(self.vectors))
+            vectors = np.empty((capacity, len(vector)), dtype=np.float32)
+            vectors[:self.size] = self.vectors[:self.size]
+            norms = np.full(capacity, np.inf, dtype=np.float32)
+            norms[:self.size] = self.norms[:self.size]
+            self.vectors, self.norms = vectors, norms
+
+        row = self.size
+        self.vectors[row] = vector
+        self.norms[row] = np.dot(vector, vector)
+        self.keys.append(key)
+        self.positions[key] = row
+        self.size += 1
+        self._on_add(row)
+
+    def remove(self, key):
+        """Drop ``key`` from the index if present."""
+        row = self.positions.pop(key, None)
+        if row is None:
+            return
+        self.keys[row] = None
+        self.norms[row] = np.inf
+        self._on_remove(row)
+
+    def _center(self, probe):
+        return np.asarray(probe, dtype=np.float32).ravel() - self.mean
+
+    def _top_k(self, squared, rows, k):
+        """Turn squared distances of ``rows`` into the k best (key, distance) pairs."""
+        k = min(k, len(squared))
+        if k <= 0:
+            return []
+        nearest = np.argpartition(squared, k - 1)[:k]
+        nearest = nearest[np.argsort(squared[nearest])]
+        return [
+            (self.keys[rows[i]], float(np.sqrt(max(squared[i], 0.0))))
+            for i in nearest
+            if np.isfinite(squared[i])
+        ]
+
+    def search_many(self, probes, k=1):
+        """Search several probes at once; returns one result list per probe."""
+        return [self.search(probe, k) for probe in probes]
+
+    def _on_build(self):
+        pass
+
+    def _on_add(self, row):
+        pass
+
+    def _on_remove(self, row):
+        pass
+
+
+class BruteForceMatcher(_VectorIndex):
+    """Exact nearest-neighbour search over the whole gallery in one batch.
+
+    Squared distances are computed as ||a||^2 + ||b||^2 - 2a.b with the
+    gallery norms precomputed, so a query costs a single float32
+    matrix-vector product instead of one Python iteration per user.
+    """
+
+    def search(self, probe, k=1):
+        """Return up to ``k`` (key, distance) pairs, closest first."""
+        if not self.positions:
+            return []
+        probe = self._center(probe)
+        vectors = self.vectors[:self.size]
+        squared = self.norms[:self.size] + np.dot(probe, probe) - 2.0 * (vectors @ probe)
+        return self._top_k(squared, np.arange(self.size), k)
+
+    def search_many(self, probes, k=1):
+        """Search a (M, D) batch of probes with a single matrix-matrix product."""
+        probes = np.asarray(probes, dtype=np.float32)
+        if not self.positions or not len(probes):
+            return [[] for _ in range(len(probes))]
+        probes = probes.reshape(len(probes), -1) - self.mean
+        vectors = self.vectors[:self.size]
+        squared = (
+            self.norms[:self.size][None, :]
+            + np.einsum("ij,ij->i", probes, probes)[:, None]
+            - 2.0 * (probes @ vectors.T)
+        )
+        rows = np.arange(self.size)
+        return [self._top_k(row, rows, k) for row in squared]
+
+
+class IVFMatcher(_VectorIndex):
+    """Approximate search with an inverted file over k-means clusters (CPU, NumPy only).
+
+    ``build`` clusters the gallery into ``nlist`` cells and files every row
+    under its nearest centroid. A query is compared with the centroids
+    first and then exactly with the rows of the ``nprobe`` closest cells,
+    so raising ``nprobe`` trades latency for recall. New rows are filed
+    under the existing centroids; call ``build`` again to re-cluster once
+    the gallery has changed a lot. Until the first non-empty build the
+    matcher falls back to an exact scan.
+
+    k-means is trained on at most ``max_training_points`` rows (default
+    64 per cell), read straight from the indexed vectors, so building on
+    a memory-mapped gallery never copies it. ``trained_state()`` and the
+    ``trained`` argument of ``build`` let other processes reuse the
+    clustering instead of training again (see FaceGallery.load_stores).
+    """
+
+    # Fewer training points per cell than this gives unstable centroids
+    MIN_POINTS_PER_LIST = 39
+
+    def __init__(self, nlist=256, nprobe=8, iterations=10, max_training_points=None, seed=0):
+        super().__init__()
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.max_training_points = max_training_points or 64 * nlist
+        self.seed = seed
+        self._trained = None
+        self.centroids = None
+        self.centroid_norms = None
+        self.assignments = np.empty(0, dtype=np.int64)
+        self.lists = []
+        self._list_arrays = {}
+
+    def _nearest_centroids(self, data, centroids, centroid_norms, rows=None, chunk=4096):
+        """Index of the closest centroid for every row of ``data`` (or only ``rows`` of it, read a chunk at a time)."""
+        count = len(data) if rows is None else len(rows)
+        nearest = np.empty(count, dtype=np.int64)
+        for start in range(0, count, chunk):
+            block = data[start:start + chunk] if rows is None else data[rows[start:start + chunk]]
+            nearest[start:start + chunk] = np.argmin(centroid_norms - 2.0 * (block @ centroids.T), axis=1)
+        return nearest
+
+    def _train(self, data):
+        """Plain Lloyd's k-means on ``data`` (an in-memory sample of the gallery)."""
+        rng = np.random.default_rng(self.seed)
+        nlist = max(1, min(self.nlist, len(data) // self.MIN_POINTS_PER_LIST))
+        centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+
+        for _ in range(self.iterations):
+            norms = np.einsum("ij,ij->i", centroids, centroids)
+            assign = self._nearest_centroids(data, centroids, norms)
+            order = np.argsort(assign, kind="stable")
+            counts = np.bincount(assign, minlength=nlist)
+            filled = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+            centroids[filled] = np.add.reduceat(data[order], starts, axis=0) / counts[filled, None]
+
+            # Re-seed empty cells with random points so every list stays useful
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+        return centroids
+
+    def _on_build(self):
+        self._list_arrays = {}
+        live = np.flatnonzero(np.isfinite(self.norms[:self.size]))
+        if not len(live):
+            self.centroids = None
+            self.lists = []
+            self.assignments = np.empty(0, dtype=np.int64)
+            return
+
+        self.assignments = np.full(len(self.vectors), -1, dtype=np.int64)
+        trained = self._trained
+        if trained is not None and len(trained["assignments"]) == self.size:
+            # Stored uncentred, so they fit whichever mean this build used
+            self.centroids = np.asarray(trained["centroids"], dtype=np.float32) - self.mean
+            self.centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+            self.assignments[live] = np.asarray(trained["assignments"])[live]
+        else:
+            rng = np.random.default_rng(self.seed)
+            sample = live
+            if len(live) > self.max_training_points:
+                sample = np.sort(rng.choice(live, self.max_training_points, replace=False))
+            self.centroids = self._train(np.asarray(self.vectors[sample]))
+            self.centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+            self.assignments[live] = self._nearest_centroids(
+                self.vectors, self.centroids, self.centroid_norms, rows=live
+            )
+        self.lists = [[] for _ in range(len(self.centroids))]
+        for row in live:
+            self.lists[self.assignments[row]].append(row)
+
+    def build(self, keys, vectors, center=True, trained=None):
+        """Index ``vectors`` (N, D), whose rows belong to ``keys``.
+
+        ``trained`` is the ``trained_state()`` of a matcher built on the
+        same rows; its clustering is reused instead of running k-means.
+        """
+        self._trained = trained
+        try:
+            super().build(keys, vectors, center)
+        finally:
+            self._trained = None
+
+    def trained_state(self):
+        """The clustering of the last build (uncentred centroids and per-row cells), or None."""
+        if self.centroids is None:
+            return None
+        return {"centroids": self.centroids + self.mean, "assignments": self.assignments[:self.size]}
+
+    def _on_add(self, row):
+        if self.centroids is None:
+            return
+        if len(self.assignments) < len(self.vectors):
+            assignments = np.full(len(self.vectors), -1, dtype=np.int64)
+            assignments[:len(self.assignments)] = self.assignments
+            self.assignments = assignments
+        vector = self.vectors[row]
+        cell = int(np.argmin(self.centroid_norms - 2.0 * (self.centroids @ vector)))
+        self.assignments[row] = cell
+        self.lists[cell].append(row)
+        self._list_arrays.pop(cell, None)
+
+    def _on_remove(self, row):
+        if self.centroids is None or row >= len(self.assignments) or self.assignments[row] < 0:
+            return
+        cell = self.assignments[row]
+        self.lists[cell].remove(row)
+        self.assignments[row] = -1
+        self._list_arrays.pop(cell, None)
+
+    def _list_array(self, cell):
+        rows = self._list_arrays.get(cell)
+        if rows is None:
+            rows = np.asarray(self.lists[cell], dtype=np.int64)
+            self._list_arrays[cell] = rows
+        return rows
+
+    def search(self, probe, k=1):
+        """Return up to ``k`` approximate (key, distance) pairs, closest first."""
+        if not self.positions:
+            return []
+        probe = self._center(probe)
+
+        if self.centroids is None:
+            rows = np.arange(self.size)
+        else:
+            nprobe = min(self.nprobe, len(self.centroids))
+            cell_distances = self.centroid_norms - 2.0 * (self.centroids @ probe)
+            cells = np.argpartition(cell_distances, nprobe - 1)[:nprobe]
+            rows = np.concatenate([self._list_array(cell) for cell in cells])
+            if not len(rows):
+                return []
+
+        squared = self.norms[rows] + np.dot(probe, probe) - 2.0 * (self.vectors[rows] @ probe)
+        return self._top_k(squared, rows, k)
+
+
+# Helper function to build the matcher selected in config.py
+def create_matcher(kind=None):
+    """Return an empty matcher of the given kind (default: config.MATCHER)."""
+    kind = kind or config.MATCHER
+    if kind == "brute_force":
+        return BruteForceMatcher()
+    if kind == "ivf":
+        return IVFMatcher(nlist=config.IVF_NLIST, nprobe=config.IVF_NPROBE)
+    raise ValueError(f"Unknown matcher type: {kind}")
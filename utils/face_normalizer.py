@@ -0,0 +1,138 @@
+import heapq
+import itertools
+import os
+
+import cv2
+import numpy as np
+
+import config
+from utils.face_detector import crop_aligned, eye_level_rotation, get_detector
+from utils.face_encodings import encode_face
+from utils.face_gallery import preprocess_face
+
+# Frame quality targets: the score component saturates at these values
+SHARP_LAPLACIAN_VARIANCE = 300.0  # of the face resized to FACE_SIZE
+FACE_WIDTH_FRACTION = 0.25        # face width relative to the frame width
+
+
+class NormalizedFace:
+    """The enrollment artifact of one face: the aligned crop and the vectors computed from it."""
+
+    def __init__(self, image, template, encoding):
+        self.image = image        # BGR crop of FACE_SIZE, saved as the user's face image
+        self.template = template  # grayscale matching template (see face_template)
+        self.encoding = encoding  # face_recognition encoding, or None if dlib found no face
+
+
+# Helper function to pick the face to enroll from a capture
+def largest_face(gray):
+    """Return the largest (x, y, w, h) face box in a grayscale image, or None."""
+    boxes = get_detector().detect(gray)
+    return max(boxes, key=lambda box: box[2] * box[3]) if boxes else None
+
+
+# Helper function to turn a captured image into the stored enrollment artifact
+def normalize_face(image, box=None):
+    """Detect, align, crop and resize the face in a BGR image and compute its vectors.
+
+    ``box`` skips detection when the caller already knows where the face
+    is; otherwise the largest detected face is used. Returns a
+    NormalizedFace, or None if there is no face.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if box is None:
+        box = largest_face(gray)
+        if box is None:
+            return None
+
+    # The template is cut from the grayscale frame exactly as live probes are (see face_template)
+    rotation = eye_level_rotation(gray, box)
+    face = cv2.resize(crop_aligned(image, box, rotation), config.FACE_SIZE, interpolation=cv2.INTER_AREA)
+    template = preprocess_face(crop_aligned(gray, box, rotation))
+    # The crop is the face box, so dlib does not have to search for it again
+    encoding = encode_face(face, box=(0, 0, face.shape[1], face.shape[0]))
+    return NormalizedFace(face, template, encoding)
+
+
+# Helper function to rate how usable a capture is for enrollment
+def face_quality(gray, box):
+    """Score a face box of a grayscale frame from 0 (unusable) to 1.
+
+    The score multiplies four components, so one bad aspect sinks the
+    frame: sharpness (variance of the Laplacian), brightness (closeness of
+    the mean to mid-grey), size (face width relative to the frame) and
+    pose (left/right symmetry, which drops as the head turns).
+    """
+    x, y, w, h = box
+    face = cv2.resize(gray[y:y + h, x:x + w], config.FACE_SIZE).astype(np.float32)
+    sharpness = min(cv2.Laplacian(face, cv2.CV_32F).var() / SHARP_LAPLACIAN_VARIANCE, 1.0)
+    brightness = max(1.0 - abs(face.mean() - 128.0) / 128.0, 0.0)
+    size = min(w / (FACE_WIDTH_FRACTION * gray.shape[1]), 1.0)
+    pose = max(1.0 - 4.0 * np.abs(face - face[:, ::-1]).mean() / 255.0, 0.0)
+    return float(sharpness * brightness * size * pose)
+
+
+class BurstSelector:
+    """Keeps the ``k`` best-scoring frames of a burst capture.
+
+    ``offer(frame)`` detects the largest face, scores it with
+    ``face_quality`` and keeps the frame if it is among the best so far.
+    Only the kept frames are normalized, by ``normalized()``.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self._best = []  # min-heap of (score, sequence, frame, box)
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return len(self._best)
+
+    def offer(self, frame):
+        """Score one BGR frame; returns the score, or None if it has no face."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        box = largest_face(gray)
+        if box is None:
+            return None
+        score = face_quality(gray, box)
+        entry = (score, next(self._sequence), frame, box)
+        if len(self._best) < self.k:
+            heapq.heappush(self._best, entry)
+        elif score > self._best[0][0]:
+            heapq.heapreplace(self._best, entry)
+        return score
+
+    def best_frame(self):
+        """The best-scoring frame, or None if no frame had a face."""
+        return max(self._best)[2] if self._best else None
+
+    def normalized(self):
+        """NormalizedFace of every kept frame that could be encoded, best first."""
+        faces = (normalize_face(frame, box) for _, _, frame, box in sorted(self._best, reverse=True))
+        return [face for face in faces if face.encoding is not None]
+
+
+# Helper function to name a user's face image
+def face_image_path(reg_no, directory=None):
+    """Path the normalized face of ``reg_no`` is saved to by ``save_face``."""
+    return os.path.join(directory or config.FACES_PATH, f"{reg_no}.jpg")
+
+
+# Helper function to write an enrollment artifact next to the other faces
+def save_face(reg_no, face, original=None, directory=None):
+    """Save the normalized face (and optionally the original capture) and return the face path.
+
+    Originals are only kept when config.KEEP_ORIGINAL_CAPTURES is set,
+    under ``<directory>/originals``.
+    """
+    directory = directory or config.FACES_PATH
+    os.makedirs(directory, exist_ok=True)
+    face_path = face_image_path(reg_no, directory)
+    if not cv2.imwrite(face_path, face.image):
+        raise OSError(f"Could not write {face_path}")
+
+    if original is not None and config.KEEP_ORIGINAL_CAPTURES:
+        originals_dir = os.path.join(directory, "originals")
+        os.makedirs(originals_dir, exist_ok=True)
+        cv2.imwrite(os.path.join(originals_dir, f"{reg_no}.jpg"), original)
+    return face_path
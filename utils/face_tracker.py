@@ -0,0 +1,147 @@
+import itertools
+import threading
+
+import cv2
+
+
+# Helper function to measure how much two boxes overlap
+def iou(box_a, box_b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    inter_w = min(ax + aw, bx + bw) - max(ax, bx)
+    inter_h = min(ay + ah, by + bh) - max(ay, by)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+class Track:
+    """One face followed across consecutive frames."""
+
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = box
+        self.template = None   # grayscale patch used to follow the face between detections
+        self.confidence = 1.0  # template-matching score of the last followed frame
+        self.hits = 1          # consecutive frames the face was seen in
+        self.misses = 0        # consecutive frames it was missing from
+        self.reg_no = None     # set once the face has been recognized
+        self.pending = False   # True while a recognition request is in flight
+
+
+class FaceTracker:
+    """Follows faces across frames so stability is judged by tracking, not sleeping.
+
+    ``track(gray, detector)`` only runs the full detector every
+    ``detect_interval`` frames, or sooner when a track's template-matching
+    confidence drops below ``min_confidence``. In between, each face box
+    is followed by matching its last detected patch inside a small search
+    window. A track keeps its reg_no across detections, so a recognized
+    face is not recognized again on every frame.
+
+    A track becomes stable after ``stable_frames`` consecutive sightings.
+    Tracks not seen for more than ``max_misses`` detections are dropped.
+    """
+
+    def __init__(self, stable_frames=5, iou_threshold=0.3, max_misses=5,
+                 detect_interval=1, min_confidence=0.6, search_margin=0.5):
+        self.stable_frames = stable_frames
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.detect_interval = max(1, detect_interval)
+        self.min_confidence = min_confidence
+        self.search_margin = search_margin
+        self.tracks = {}
+        self.frame_index = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def track(self, gray, detector):
+        """Advance one frame, detecting or following faces as needed, and return the live tracks."""
+        self.frame_index += 1
+        if self.tracks and self.frame_index % self.detect_interval:
+            if self.follow(gray):
+                with self._lock:
+                    return [track for track in self.tracks.values() if track.misses == 0]
+        return self.update(detector.detect(gray), gray)
+
+    def follow(self, gray):
+        """Move every track by template matching; False if any of them lost confidence."""
+        height, width = gray.shape[:2]
+        with self._lock:
+            confident = True
+            followed = []
+            for track in self.tracks.values():
+                if track.template is None or track.misses:
+                    continue
+                x, y, w, h = track.box
+                margin = int(self.search_margin * max(w, h))
+                x0, y0 = max(0, x - margin), max(0, y - margin)
+                x1, y1 = min(width, x + w + margin), min(height, y + h + margin)
+                window = gray[y0:y1, x0:x1]
+                template_h, template_w = track.template.shape[:2]
+                if window.shape[0] < template_h or window.shape[1] < template_w:
+                    track.confidence = 0.0
+                else:
+                    scores = cv2.matchTemplate(window, track.template, cv2.TM_CCOEFF_NORMED)
+                    _, track.confidence, _, (best_x, best_y) = cv2.minMaxLoc(scores)
+                    track.box = (x0 + best_x, y0 + best_y, template_w, template_h)
+
+                if track.confidence < self.min_confidence:
+                    confident = False
+                followed.append(track)
+
+            # On low confidence the caller re-detects this frame, which counts the hit instead
+            if confident:
+                for track in followed:
+                    track.hits += 1
+            return confident
+
+    def update(self, boxes, gray=None):
+        """Match freshly detected boxes to existing tracks and return the live tracks."""
+        with self._lock:
+            unmatched = list(self.tracks.values())
+            for box in boxes:
+                best, best_iou = None, self.iou_threshold
+                for track in unmatched:
+                    overlap = iou(track.box, box)
+                    if overlap >= best_iou:
+                        best, best_iou = track, overlap
+                if best is None:
+                    best = Track(next(self._ids), box)
+                    self.tracks[best.track_id] = best
+                else:
+                    unmatched.remove(best)
+                    best.box = box
+                    best.hits += 1
+                    best.misses = 0
+
+                if gray is not None:
+                    x, y, w, h = box
+                    best.template = gray[y:y + h, x:x + w].copy()
+                    best.confidence = 1.0
+
+            for track in unmatched:
+                track.hits = 0
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    del self.tracks[track.track_id]
+
+            return [track for track in self.tracks.values() if track.misses == 0]
+
+    def ready_for_recognition(self, track):
+        """True if the track is stable, not yet recognized and not already queued."""
+        return track.reg_no is None and not track.pending and track.hits >= self.stable_frames
+
+    def label(self, track_id, reg_no):
+        """Record the recognition result of a track; ``None`` means try again later."""
+        with self._lock:
+            track = self.tracks.get(track_id)
+            if track is None:
+                return
+            track.pending = False
+            track.reg_no = reg_no
+            if reg_no is None:
+                track.hits = 0
@@ -0,0 +1,122 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+from utils.db_async import run_async
+
+
+class PagedTableModel(QAbstractTableModel):
+    """Table model that loads rows one page at a time as the view scrolls.
+
+    ``fetch_page(last_row, limit)`` returns up to ``limit`` rows that come
+    after ``last_row`` (None for the first page). It should use keyset
+    pagination, i.e. ``WHERE key < last key ORDER BY key DESC LIMIT n``,
+    so every page costs the same however much data sits behind it.
+    Pages are fetched on the database thread pool (see utils.db_async)
+    and appended when they arrive. Views call ``canFetchMore`` and
+    ``fetchMore`` when the user scrolls near the end of the loaded rows.
+    Subclasses override ``display()`` to format cells.
+    """
+
+    loading_changed = pyqtSignal(bool)
+    load_failed = pyqtSignal(object)
+
+    def __init__(self, headers, fetch_page, page_size=100, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self._rows = []
+        self._exhausted = False
+        self._loading = False
+        self._failed = False  # stop fetching after an error until reset(), so the view does not retry in a loop
+        self._generation = 0  # bumped by reset() so late pages of the old data are dropped
+
+    # Qt model interface
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self.display(self._rows[index.row()], index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not (parent.isValid() or self._exhausted or self._loading or self._failed)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._set_loading(True)
+        generation = self._generation
+        last_row = self._rows[-1] if self._rows else None
+        run_async(
+            self.fetch_page, last_row, self.page_size,
+            on_result=lambda rows: self._append_page(generation, rows),
+            on_error=lambda error: self._page_failed(generation, error),
+            owner=self,
+        )
+
+    # Helpers for subclasses and screens
+    def display(self, row, column):
+        """Text shown in a cell; rows are tuples by default."""
+        value = row[column]
+        return "" if value is None else str(value)
+
+    def row(self, index):
+        return self._rows[index]
+
+    def is_loading(self):
+        return self._loading
+
+    def is_empty(self):
+        """True once everything is loaded and there are no rows."""
+        return self._exhausted and not self._rows
+
+    def reset(self):
+        """Drop the loaded rows and load the first page again."""
+        self._generation += 1
+        self.beginResetModel()
+        self._rows = []
+        self._exhausted = False
+        self._loading = False
+        self._failed = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def remove_rows(self, predicate):
+        """Remove loaded rows for which ``predicate(row)`` is true, in place."""
+        for i in reversed(range(len(self._rows))):
+            if predicate(self._rows[i]):
+                self.beginRemoveRows(QModelIndex(), i, i)
+                del self._rows[i]
+                self.endRemoveRows()
+
+    def _set_loading(self, loading):
+        self._loading = loading
+        self.loading_changed.emit(loading)
+
+    def _append_page(self, generation, rows):
+        if generation != self._generation:
+            return
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+        self._set_loading(False)
+
+    def _page_failed(self, generation, error):
+        if generation != self._generation:
+            return
+        self._failed = True
+        self._set_loading(False)
+        self.load_failed.emit(error)
@@ -0,0 +1,123 @@
+import math
+
+import cv2
+import numpy as np
+
+import config
+from utils.face_detector import get_detector
+from utils.face_gallery import FACE_DIM, FaceGallery, face_template, get_template_store
+
+_shared_gallery = None
+
+
+# Helper function to turn every detected face of a frame into one template batch
+def crop_faces(gray, boxes):
+    """Align and crop each (x, y, w, h) box of a grayscale frame into a (N, FACE_DIM) template matrix."""
+    if not boxes:
+        return np.empty((0, FACE_DIM), dtype=np.float32)
+    return np.stack([face_template(gray, box) for box in boxes])
+
+
+# Helper function to turn a match distance into a confidence
+def match_score(distance, threshold):
+    """Confidence in (0, 1) that ``distance`` is a genuine match; exactly 0.5 at the user's threshold."""
+    z = config.MATCH_SCORE_SLOPE * (distance / threshold - 1.0)
+    return 1.0 / (1.0 + math.exp(min(z, 50.0)))
+
+
+# Helper function to pick the match of one template from its nearest centroids
+def decide_match(gallery, template, matches, threshold):
+    """Return (reg_no, score) for one template, or (None, 0.0) if nobody matches unambiguously.
+
+    ``matches`` are (reg_no, centroid distance) pairs, closest first. Each
+    user is judged against their own threshold (see FaceGallery.threshold).
+    Centroids settle clear cases; only when the best one is within
+    CLOSE_CALL_MARGIN of its threshold, or a second user is also that
+    close, are the candidates' individual enrollment samples compared.
+    Candidates are ranked by distance relative to their own threshold,
+    and a match also has to pass the ratio test against the runner-up in
+    that same measure.
+    """
+    margin = config.CLOSE_CALL_MARGIN
+    candidates = [(reg_no, distance, gallery.threshold(reg_no, threshold)) for reg_no, distance in matches]
+    close = [candidate for candidate in candidates if candidate[1] < candidate[2] * (1 + margin)]
+    if not close:
+        return None, 0.0
+    clear = len(close) == 1 and close[0][1] < close[0][2] * (1 - margin)
+    if not clear:
+        close = [reg_no for reg_no, _, _ in close]
+        sample_distances = dict(zip(close, gallery.sample_distances(template, close)))
+        refined = []
+        for reg_no, distance, limit in candidates:
+            if sample_distances.get(reg_no) is not None:
+                distance = min(distance, sample_distances[reg_no])
+            refined.append((reg_no, distance, limit))
+        candidates = refined
+
+    best = min(candidates, key=lambda candidate: candidate[1] / candidate[2])
+    reg_no, distance, limit = best
+    if distance >= limit:
+        return None, 0.0
+    runner_up = min((other / other_limit for other_reg_no, other, other_limit in candidates
+                     if other_reg_no != reg_no), default=None)
+    if runner_up is not None and distance / limit >= config.MATCH_RATIO * runner_up:
+        return None, 0.0  # a second user is nearly as close
+    return reg_no, match_score(distance, limit)
+
+
+# Helper function to match a batch of templates against the gallery
+def match_faces(gallery, templates, threshold=None, with_scores=False):
+    """Return the matched reg_no (or None) for every template.
+
+    With ``with_scores`` every entry is a (reg_no, score) pair instead,
+    see ``match_score``. All templates are searched in one batch; the
+    candidates farther than the largest per-user threshold (widened for
+    close calls and the ratio test) could not decide the match and are
+    dropped before ``decide_match``.
+
+    The search does not stop at the first user under the threshold: the
+    ratio test needs the runner-up, raw pixel templates give no cheap
+    bound to skip users by, and one matrix product over the whole gallery
+    costs less than a per-template loop that could stop early. An IVF
+    matcher (config.MATCHER) is the way to scan less of a large gallery.
+    """
+    threshold = config.MATCH_THRESHOLD if threshold is None else threshold
+    cutoff = threshold * config.IDENTITY_THRESHOLD_RANGE[1] * max(1 + config.CLOSE_CALL_MARGIN, 1 / config.MATCH_RATIO)
+    k = max(2, config.CLOSE_CALL_CANDIDATES)  # the ratio test needs the runner-up
+    results = [
+        decide_match(gallery, template, [match for match in matches if match[1] < cutoff], threshold)
+        for template, matches in zip(templates, gallery.search_many(templates, k))
+    ]
+    return results if with_scores else [reg_no for reg_no, _ in results]
+
+
+# Helper function for the recognition CLIs: get the template stores ready before the worker processes start
+def prepare_shared_matcher():
+    """Check that there are templates to match against; returns False (after saying so) if there are none.
+
+    An approximate matcher is also trained here, and its clustering saved,
+    so the ``init_shared_matcher`` workers load it instead of each
+    training their own.
+    """
+    if not len(get_template_store()):
+        print(f"No face templates found in {config.EMBEDDINGS_PATH}; open the attendance screen once to build them.")
+        return False
+    if config.MATCHER != "brute_force":
+        FaceGallery().load_stores(center=False)
+    return True
+
+
+# Helper function for worker processes: match against the memory-mapped template stores
+def init_shared_matcher():
+    """Build this process's gallery in place on the template stores (pool initializer)."""
+    global _shared_gallery
+    cv2.setNumThreads(1)  # parallelism comes from the process pool
+    _shared_gallery = FaceGallery()
+    _shared_gallery.load_stores(center=False)
+
+
+# Helper function to detect and recognize every face in one frame
+def recognize_frame(gray, with_scores=False):
+    """Return the matched reg_no (or None) of every face detected in a grayscale frame."""
+    boxes = get_detector().detect(gray)
+    return match_faces(_shared_gallery, crop_faces(gray, boxes), with_scores=with_scores)
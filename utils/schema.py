@@ -0,0 +1,99 @@
+from mysql.connector import Error
+
+from utils.db_connection import db_cursor
+
+
+# Helper function to check whether an index already exists on a table
+def index_exists(cursor, table, index):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+        (table, index),
+    )
+    return cursor.fetchone() is not None
+
+
+# Helper function to add an index only if it is missing
+def add_index(cursor, table, index, definition):
+    if not index_exists(cursor, table, index):
+        cursor.execute(f"ALTER TABLE {table} ADD {definition}")
+
+
+def _attendance_unique_day(cursor):
+    """One attendance row per student per day, plus indexes for the review queue."""
+    # Remove existing duplicates first, keeping a 'Present' row where there is one
+    cursor.execute(
+        "SELECT reg_no, date, COUNT(*) FROM attendance GROUP BY reg_no, date HAVING COUNT(*) > 1"
+    )
+    for reg_no, day, count in cursor.fetchall():
+        cursor.execute(
+            "DELETE FROM attendance WHERE reg_no = %s AND date = %s ORDER BY status = 'Present' LIMIT %s",
+            (reg_no, day, count - 1),
+        )
+
+    add_index(cursor, "attendance", "uq_attendance_reg_no_date",
+              "UNIQUE KEY uq_attendance_reg_no_date (reg_no, date)")
+    add_index(cursor, "attendance", "idx_attendance_date", "KEY idx_attendance_date (date)")
+    add_index(cursor, "admin_review", "idx_admin_review_status",
+              "KEY idx_admin_review_status (status, review_id)")
+    add_index(cursor, "admin_review", "idx_admin_review_reg_no_date",
+              "KEY idx_admin_review_reg_no_date (reg_no, date)")
+
+
+def _attendance_summaries(cursor):
+    """Summary tables kept current by triggers, backfilled from the existing attendance rows."""
+    from utils.storage import MySQLBackend
+
+    backend = MySQLBackend()
+    for name, _ in backend.summary_triggers():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for statement in backend.summary_schema() + backend.summary_rebuild():
+        cursor.execute(statement)
+
+
+def _admins_unique_email(cursor):
+    """Let the unique key, not a prior SELECT, reject a second admin with the same email."""
+    add_index(cursor, "admins", "uq_admins_email", "UNIQUE KEY uq_admins_email (email)")
+
+
+# Ordered list of (version, description, function); never renumber applied entries
+MIGRATIONS = [
+    (1, "unique attendance per student and day, review indexes", _attendance_unique_day),
+    (2, "attendance summary tables and triggers", _attendance_summaries),
+    (3, "unique admin email", _admins_unique_email),
+    # Adds the users triggers and recomputes the class counts left wrong by class changes
+    (4, "class summaries follow user changes", _attendance_summaries),
+]
+
+
+# Bring the database schema up to date
+def apply_migrations():
+    """Apply every migration not yet recorded in schema_migrations. Returns True on success."""
+    try:
+        with db_cursor(commit=True) as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version INT PRIMARY KEY, description VARCHAR(255), "
+                "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+            )
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {version for (version,) in cursor.fetchall()}
+
+        for version, description, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            with db_cursor(commit=True) as cursor:
+                migrate(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (version, description),
+                )
+            print(f"Applied schema migration {version}: {description}")
+        return True
+    except Error as e:
+        print(f"Error applying schema migrations: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    apply_migrations()
@@ -0,0 +1,691 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+import config
+
+
+class StorageError(Exception):
+    """Raised by every backend when the underlying database operation fails."""
+
+
+class StorageBackend:
+    """Every database operation the application performs.
+
+    Screens and tools talk to this interface only; ``get_backend()``
+    returns the implementation selected by ``config.DB_BACKEND``. All
+    methods raise StorageError on failure. ``day`` arguments are
+    'YYYY-MM-DD' strings or dates and default to today.
+    """
+
+    def __init__(self):
+        self._prepared = False
+        self._preparing = False
+        self._prepare_lock = threading.RLock()
+
+    def prepare(self):
+        """Create or migrate the schema so the other operations can run."""
+        raise NotImplementedError
+
+    def ensure_prepared(self):
+        """Run ``prepare()`` once per process.
+
+        Backends call this before every query, so no screen or tool can
+        run against a missing or unmigrated schema. A failure is raised as
+        StorageError and retried by the next query.
+        """
+        if self._prepared:
+            return
+        with self._prepare_lock:
+            if self._prepared or self._preparing:
+                return  # prepare() itself is running queries on this thread
+            self._preparing = True
+            try:
+                self.prepare()
+                self._prepared = True
+            finally:
+                self._preparing = False
+
+    # Users and admins
+    def get_user_by_email(self, email):
+        """Return the users row for ``email`` as a dict, or None."""
+        raise NotImplementedError
+
+    def list_user_faces(self):
+        """Return (reg_no, face_path) for every user."""
+        raise NotImplementedError
+
+    def create_user(self, user):
+        """Insert a user; ``user`` maps users column names to values."""
+        raise NotImplementedError
+
+    def create_users(self, users):
+        """Insert many users (dicts with the same columns) in one transaction."""
+        raise NotImplementedError
+
+    def get_admin_by_email(self, email):
+        """Return (admin_id, admin_name, password_hash) for ``email``, or None."""
+        raise NotImplementedError
+
+    def create_admin(self, name, email, password_hash):
+        """Insert an admin; returns False if the email is already registered."""
+        raise NotImplementedError
+
+    # Attendance
+    def get_attendance(self, reg_no):
+        """Return a student's attendance rows ({'date', 'status', 'remarks'}), newest first."""
+        raise NotImplementedError
+
+    def get_attendance_page(self, reg_no, before=None, limit=100):
+        """Return up to ``limit`` attendance rows of a student dated before ``before`` (all if None), newest first."""
+        raise NotImplementedError
+
+    def get_marked(self, reg_nos, day=None):
+        """Return the subset of reg_nos that already have an attendance row on ``day``."""
+        raise NotImplementedError
+
+    def marked_on(self, day=None):
+        """Return the reg_nos of every student with an attendance row on ``day``."""
+        raise NotImplementedError
+
+    def mark_present(self, reg_nos, day=None):
+        """Mark reg_nos present on ``day`` idempotently; returns the ones newly marked."""
+        raise NotImplementedError
+
+    def upsert_attendance(self, rows):
+        """Insert (reg_no, day, status) rows in one batch, leaving existing rows untouched."""
+        raise NotImplementedError
+
+    def is_marked(self, reg_no, day=None):
+        """Return True if ``reg_no`` has an attendance row on ``day``."""
+        raise NotImplementedError
+
+    def mark_many(self, day, marks):
+        """Set the status of every (reg_no, status) in ``marks`` on ``day``, inserting or updating, in one transaction."""
+        raise NotImplementedError
+
+    def close_day(self, day=None, member_type=None):
+        """Mark everyone without a row on ``day`` absent; returns how many rows were added."""
+        raise NotImplementedError
+
+    def update_attendance(self, reg_no, day, status):
+        """Change the status of an existing attendance row."""
+        raise NotImplementedError
+
+    def delete_attendance(self, reg_no, day):
+        """Delete the attendance row of ``reg_no`` on ``day``."""
+        raise NotImplementedError
+
+    # Attendance summaries (kept up to date by triggers on the attendance table)
+    def attendance_summary(self, reg_no):
+        """Return a student's all-time {'present', 'absent', 'total', 'percentage'}."""
+        raise NotImplementedError
+
+    def monthly_attendance(self, reg_no, limit=12):
+        """Return a student's per-month counts, newest month first."""
+        raise NotImplementedError
+
+    def class_attendance(self, class_name, month=None):
+        """Return per-month counts of a class, newest first, or only ``month`` (any day in it)."""
+        raise NotImplementedError
+
+    def rebuild_attendance_summary(self):
+        """Recompute every summary from the attendance table (backfill or repair)."""
+        raise NotImplementedError
+
+    # Admin review queue
+    def add_review(self, staff_id):
+        """Queue today's attendance of ``staff_id`` for admin review."""
+        raise NotImplementedError
+
+    def pending_reviews(self):
+        """Return (review_id, reg_no, date, status) for every pending review."""
+        raise NotImplementedError
+
+    def pending_reviews_page(self, after_review_id=None, limit=100):
+        """Return up to ``limit`` pending reviews with review_id > ``after_review_id``, oldest first."""
+        raise NotImplementedError
+
+    def decide_review(self, review_id, decision):
+        """Record the admin's decision on a review."""
+        raise NotImplementedError
+
+    def decide_reviews(self, review_ids, decision):
+        """Record one decision on many pending reviews in one transaction; returns how many were still pending."""
+        raise NotImplementedError
+
+
+def _today(day):
+    return str(day) if day else date.today().isoformat()
+
+
+def _month_start(day):
+    return str(day)[:8] + "01"
+
+
+def _with_percentage(counts):
+    counts["percentage"] = round(100.0 * counts["present"] / counts["total"], 1) if counts["total"] else None
+    return counts
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+# Store dates as ISO text and read DATE columns back as datetime.date, like MySQL returns them
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+
+
+class SQLBackend(StorageBackend):
+    """Queries shared by the SQL engines, written with ``{p}`` for the engine's placeholder.
+
+    Subclasses set ``param`` and provide ``_cursor()``, ``_upsert_suffix()``
+    (keep the existing row) and ``_update_status_suffix()`` (overwrite its status).
+    """
+
+    param = "%s"
+
+    def _sql(self, query):
+        return query.replace("{p}", self.param)
+
+    def get_user_by_email(self, email):
+        with self._cursor(dictionary=True) as cursor:
+            cursor.execute(self._sql("SELECT * FROM users WHERE email = {p}"), (email,))
+            return cursor.fetchone()
+
+    def list_user_faces(self):
+        with self._cursor() as cursor:
+            cursor.execute("SELECT reg_no, face_path FROM users")
+            return cursor.fetchall()
+
+    def create_user(self, user):
+        self.create_users([user])
+
+    def create_users(self, users):
+        if not users:
+            return
+        columns = list(users[0])
+        with self._cursor(commit=True) as cursor:
+            cursor.executemany(
+                f"INSERT INTO users ({', '.join(columns)}) VALUES ({', '.join([self.param] * len(columns))})",
+                [tuple(user[column] for column in columns) for user in users],
+            )
+
+    def get_admin_by_email(self, email):
+        with self._cursor() as cursor:
+            cursor.execute(self._sql("SELECT admin_id, admin_name, password FROM admins WHERE email = {p}"), (email,))
+            return cursor.fetchone()
+
+    def get_attendance(self, reg_no):
+        with self._cursor(dictionary=True) as cursor:
+            cursor.execute(
+                self._sql("SELECT date, status, remarks FROM attendance WHERE reg_no = {p} ORDER BY date DESC"),
+                (reg_no,),
+            )
+            return cursor.fetchall()
+
+    def get_attendance_page(self, reg_no, before=None, limit=100):
+        # Keyset pagination on the unique (reg_no, date) index: every page is an index range scan
+        query = "SELECT date, status, remarks FROM attendance WHERE reg_no = {p}"
+        params = [reg_no]
+        if before is not None:
+            query += " AND date < {p}"
+            params.append(str(before))
+        with self._cursor(dictionary=True) as cursor:
+            cursor.execute(self._sql(query + " ORDER BY date DESC LIMIT {p}"), (*params, limit))
+            return cursor.fetchall()
+
+    def get_marked(self, reg_nos, day=None):
+        if not reg_nos:
+            return set()
+        with self._cursor() as cursor:
+            placeholders = ", ".join([self.param] * len(reg_nos))
+            cursor.execute(
+                self._sql(f"SELECT reg_no FROM attendance WHERE date = {{p}} AND reg_no IN ({placeholders})"),
+                (_today(day), *reg_nos),
+            )
+            return {str(reg_no) for (reg_no,) in cursor.fetchall()}
+
+    def marked_on(self, day=None):
+        with self._cursor() as cursor:
+            cursor.execute(self._sql("SELECT reg_no FROM attendance WHERE date = {p}"), (_today(day),))
+            return {str(reg_no) for (reg_no,) in cursor.fetchall()}
+
+    def mark_present(self, reg_nos, day=None):
+        if not reg_nos:
+            return []
+        query = self._sql(
+            "INSERT INTO attendance (reg_no, date, status) VALUES ({p}, {p}, 'Present') " + self._upsert_suffix()
+        )
+        newly_marked = []
+        with self._cursor(commit=True) as cursor:
+            for reg_no in reg_nos:
+                cursor.execute(query, (reg_no, _today(day)))
+                # 1 row affected = inserted, 0 = the row already existed
+                if cursor.rowcount == 1:
+                    newly_marked.append(reg_no)
+        return newly_marked
+
+    def upsert_attendance(self, rows):
+        if not rows:
+            return
+        query = self._sql(
+            "INSERT INTO attendance (reg_no, date, status) VALUES ({p}, {p}, {p}) " + self._upsert_suffix()
+        )
+        with self._cursor(commit=True) as cursor:
+            cursor.executemany(query, [(reg_no, str(day), status) for reg_no, day, status in rows])
+
+    def is_marked(self, reg_no, day=None):
+        with self._cursor() as cursor:
+            cursor.execute(
+                self._sql("SELECT 1 FROM attendance WHERE reg_no = {p} AND date = {p} LIMIT 1"), (reg_no, _today(day))
+            )
+            return cursor.fetchone() is not None
+
+    def mark_many(self, day, marks):
+        if not marks:
+            return
+        query = self._sql(
+            "INSERT INTO attendance (reg_no, date, status) VALUES ({p}, {p}, {p}) " + self._update_status_suffix()
+        )
+        with self._cursor(commit=True) as cursor:
+            cursor.executemany(query, [(reg_no, _today(day), status) for reg_no, status in marks])
+
+    def close_day(self, day=None, member_type=None):
+        # Anti-join against the day's rows (idx_attendance_date); the upsert suffix covers
+        # rows written concurrently by a kiosk between the SELECT and the INSERT
+        query = (
+            "INSERT INTO attendance (reg_no, date, status) "
+            "SELECT u.reg_no, {p}, 'Absent' FROM users u "
+            "LEFT JOIN attendance a ON a.reg_no = u.reg_no AND a.date = {p} "
+            "WHERE a.reg_no IS NULL"
+        )
+        params = [_today(day), _today(day)]
+        if member_type is not None:
+            query += " AND u.member_type = {p}"
+            params.append(member_type)
+        with self._cursor(commit=True) as cursor:
+            cursor.execute(self._sql(query + " " + self._upsert_suffix()), params)
+            return cursor.rowcount
+
+    def update_attendance(self, reg_no, day, status):
+        with self._cursor(commit=True) as cursor:
+            cursor.execute(
+                self._sql("UPDATE attendance SET status = {p} WHERE reg_no = {p} AND date = {p}"),
+                (status, reg_no, str(day)),
+            )
+
+    def delete_attendance(self, reg_no, day):
+        with self._cursor(commit=True) as cursor:
+            cursor.execute(self._sql("DELETE FROM attendance WHERE reg_no = {p} AND date = {p}"), (reg_no, str(day)))
+
+    # Summary tables: counts per student, per student and month, per class and month.
+    # Months are stored as their first day. Triggers apply each attendance
+    # insert, update (old row out, new row in) and delete as a +1/-1 delta,
+    # and move a student's class counts when their users row changes.
+    SUMMARY_TABLES = [
+        """CREATE TABLE IF NOT EXISTS attendance_summary_student (
+            reg_no VARCHAR(50) NOT NULL PRIMARY KEY,
+            present INT NOT NULL DEFAULT 0, absent INT NOT NULL DEFAULT 0, total INT NOT NULL DEFAULT 0)""",
+        """CREATE TABLE IF NOT EXISTS attendance_summary_student_month (
+            reg_no VARCHAR(50) NOT NULL, month DATE NOT NULL,
+            present INT NOT NULL DEFAULT 0, absent INT NOT NULL DEFAULT 0, total INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (reg_no, month))""",
+        """CREATE TABLE IF NOT EXISTS attendance_summary_class_month (
+            class VARCHAR(50) NOT NULL, month DATE NOT NULL,
+            present INT NOT NULL DEFAULT 0, absent INT NOT NULL DEFAULT 0, total INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (class, month))""",
+    ]
+
+    def _summary_deltas(self, row, sign):
+        """Statements adding (sign 1) or removing (sign -1) attendance row ``row`` (NEW/OLD) from the summaries."""
+        counts = (f"CASE WHEN {row}.status = 'Present' THEN {sign} ELSE 0 END, "
+                  f"CASE WHEN {row}.status = 'Absent' THEN {sign} ELSE 0 END, {sign}")
+        month = self._month_of(f"{row}.date")
+        user_class = f"COALESCE((SELECT class FROM users WHERE reg_no = {row}.reg_no), '')"
+        statements = [
+            self._add_counts("attendance_summary_student", "reg_no", f"{row}.reg_no", counts),
+            self._add_counts("attendance_summary_student_month", "reg_no, month", f"{row}.reg_no, {month}", counts),
+            self._add_counts("attendance_summary_class_month", "class, month", f"{user_class}, {month}", counts),
+        ]
+        if sign < 0:
+            # Drop rows that reached zero, so the tables match a rebuild
+            statements += [
+                f"DELETE FROM attendance_summary_student WHERE reg_no = {row}.reg_no AND total = 0",
+                f"DELETE FROM attendance_summary_student_month WHERE reg_no = {row}.reg_no AND month = {month} AND total = 0",
+                f"DELETE FROM attendance_summary_class_month WHERE class = {user_class} AND month = {month} AND total = 0",
+            ]
+        return statements
+
+    def _add_counts(self, table, keys, values, counts):
+        return (f"INSERT INTO {table} ({keys}, present, absent, total) VALUES ({values}, {counts}) "
+                + self._add_counts_suffix(keys))
+
+    def _class_moves(self, reg_no, from_class, to_class, condition):
+        """Statements moving the class/month counts of ``reg_no``'s attendance rows to another class.
+
+        Rows are counted under the class their user has now ('' without a
+        user), so a class change or a deleted user has to carry the counts
+        already made along. ``condition`` skips the move when it is false.
+        """
+        month = self._month_of("a.date")
+        statements = []
+        for user_class, sign in ((from_class, -1), (to_class, 1)):
+            counts = (f"SUM(CASE WHEN a.status = 'Present' THEN {sign} ELSE 0 END), "
+                      f"SUM(CASE WHEN a.status = 'Absent' THEN {sign} ELSE 0 END), {sign} * COUNT(*)")
+            statements.append(
+                f"INSERT INTO attendance_summary_class_month (class, month, present, absent, total) "
+                f"SELECT {user_class}, {month}, {counts} FROM attendance a "
+                f"WHERE a.reg_no = {reg_no} AND {condition} GROUP BY {month} "
+                + self._add_counts_suffix("class, month")
+            )
+        statements.append(f"DELETE FROM attendance_summary_class_month WHERE class = {from_class} AND total = 0")
+        return statements
+
+    def summary_triggers(self):
+        """(name, DDL) of every trigger that maintains the summary tables."""
+        old_class, new_class = "COALESCE(OLD.class, '')", "COALESCE(NEW.class, '')"
+        triggers = [
+            ("trg_attendance_summary_insert", "INSERT", "attendance", self._summary_deltas("NEW", 1)),
+            ("trg_attendance_summary_update", "UPDATE", "attendance",
+             self._summary_deltas("OLD", -1) + self._summary_deltas("NEW", 1)),
+            ("trg_attendance_summary_delete", "DELETE", "attendance", self._summary_deltas("OLD", -1)),
+            ("trg_users_summary_insert", "INSERT", "users",
+             self._class_moves("NEW.reg_no", "''", new_class, f"{new_class} <> ''")),
+            ("trg_users_summary_update", "UPDATE", "users",
+             self._class_moves("OLD.reg_no", old_class, "''", f"(OLD.reg_no <> NEW.reg_no OR {old_class} <> {new_class})")
+             + self._class_moves("NEW.reg_no", "''", new_class, f"(OLD.reg_no <> NEW.reg_no OR {old_class} <> {new_class})")),
+            ("trg_users_summary_delete", "DELETE", "users",
+             self._class_moves("OLD.reg_no", old_class, "''", f"{old_class} <> ''")),
+        ]
+        return [
+            (name, f"CREATE TRIGGER {self._if_not_exists()}{name} AFTER {event} ON {table} FOR EACH ROW "
+                   f"BEGIN {'; '.join(statements)}; END")
+            for name, event, table, statements in triggers
+        ]
+
+    def summary_schema(self):
+        """DDL for the summary tables and the triggers that maintain them."""
+        return self.SUMMARY_TABLES + [ddl for _, ddl in self.summary_triggers()]
+
+    def summary_rebuild(self):
+        """Statements recomputing every summary table from scratch."""
+        counts = ("SUM(CASE WHEN a.status = 'Present' THEN 1 ELSE 0 END), "
+                  "SUM(CASE WHEN a.status = 'Absent' THEN 1 ELSE 0 END), COUNT(*)")
+        month = self._month_of("a.date")
+        return [
+            "DELETE FROM attendance_summary_student",
+            "DELETE FROM attendance_summary_student_month",
+            "DELETE FROM attendance_summary_class_month",
+            f"INSERT INTO attendance_summary_student (reg_no, present, absent, total) "
+            f"SELECT a.reg_no, {counts} FROM attendance a GROUP BY a.reg_no",
+            f"INSERT INTO attendance_summary_student_month (reg_no, month, present, absent, total) "
+            f"SELECT a.reg_no, {month}, {counts} FROM attendance a GROUP BY a.reg_no, {month}",
+            f"INSERT INTO attendance_summary_class_month (class, month, present, absent, total) "
+            f"SELECT COALESCE(u.class, ''), {month}, {counts} FROM attendance a "
+            f"LEFT JOIN users u ON u.reg_no = a.reg_no GROUP BY COALESCE(u.class, ''), {month}",
+        ]
+
+    def rebuild_attendance_summary(self):
+        with self._cursor(commit=True) as cursor:
+            for statement in self.summary_rebuild():
+                cursor.execute(statement)
+
+    def attendance_summary(self, reg_no):
+        with self._cursor(dictionary=True) as cursor:
+            cursor.execute(
+                self._sql("SELECT present, absent, total FROM attendance_summary_student WHERE reg_no = {p}"),
+                (reg_no,),
+            )
+            row = cursor.fetchone() or {"present": 0, "absent": 0, "total": 0}
+        return _with_percentage(row)
+
+    def monthly_attendance(self, reg_no, limit=12):
+        with self._cursor(dictionary=True) as cursor:
+            cursor.execute(
+                self._sql("SELECT month, present, absent, total FROM attendance_summary_student_month "
+                          "WHERE reg_no = {p} ORDER BY month DESC LIMIT {p}"),
+                (reg_no, limit),
+            )
+            return [_with_percentage(row) for row in cursor.fetchall()]
+
+    def class_attendance(self, class_name, month=None):
+        query = "SELECT month, present, absent, total FROM attendance_summary_class_month WHERE class = {p}"
+        params = [class_name or ""]
+        if month is not None:
+            query += " AND month = {p}"
+            params.append(_month_start(month))
+        with self._cursor(dictionary=True) as cursor:
+            cursor.execute(self._sql(query + " ORDER BY month DESC"), params)
+            return [_with_percentage(row) for row in cursor.fetchall()]
+
+    def add_review(self, staff_id):
+        with self._cursor(commit=True) as cursor:
+            cursor.execute(
+                self._sql("INSERT INTO admin_review (staff_id, date, status, reviewed) VALUES ({p}, {p}, 'Pending', 0)"),
+                (staff_id, _today(None)),
+            )
+
+    def pending_reviews(self):
+        with self._cursor() as cursor:
+            cursor.execute("SELECT review_id, reg_no, date, status FROM admin_review WHERE status = 'Pending'")
+            return cursor.fetchall()
+
+    def pending_reviews_page(self, after_review_id=None, limit=100):
+        # Keyset pagination on idx_admin_review_status (status, review_id)
+        query = "SELECT review_id, reg_no, date, status FROM admin_review WHERE status = 'Pending'"
+        params = []
+        if after_review_id is not None:
+            query += " AND review_id > {p}"
+            params.append(after_review_id)
+        with self._cursor() as cursor:
+            cursor.execute(self._sql(query + " ORDER BY review_id LIMIT {p}"), (*params, limit))
+            return cursor.fetchall()
+
+    def decide_reviews(self, review_ids, decision):
+        if not review_ids:
+            return 0
+        # Only pending reviews are updated, so a second admin cannot overwrite a decision
+        query = self._sql(
+            "UPDATE admin_review SET status = 'Reviewed', decision = {p} WHERE review_id = {p} AND status = 'Pending'"
+        )
+        with self._cursor(commit=True) as cursor:
+            # Both drivers sum rowcount over an executemany
+            cursor.executemany(query, [(decision, review_id) for review_id in review_ids])
+            return cursor.rowcount
+
+    def decide_review(self, review_id, decision):
+        with self._cursor(commit=True) as cursor:
+            cursor.execute(
+                self._sql("UPDATE admin_review SET status = 'Reviewed', decision = {p} WHERE review_id = {p}"),
+                (decision, review_id),
+            )
+
+
+class MySQLBackend(SQLBackend):
+    """The MySQL server configured in config.py, through the shared connection pool."""
+
+    @contextmanager
+    def _cursor(self, dictionary=False, commit=False):
+        # Imported here so the SQLite backend works without the MySQL driver installed
+        import mysql.connector
+        from utils.db_connection import db_cursor
+
+        self.ensure_prepared()
+        try:
+            with db_cursor(dictionary=dictionary, commit=commit) as cursor:
+                yield cursor
+        except mysql.connector.Error as e:
+            raise StorageError(str(e)) from e
+
+    def prepare(self):
+        from utils.schema import apply_migrations
+        if not apply_migrations():
+            raise StorageError("Could not apply the schema migrations.")
+
+    def _upsert_suffix(self):
+        return "ON DUPLICATE KEY UPDATE attendance.reg_no = attendance.reg_no"
+
+    def _update_status_suffix(self):
+        return "ON DUPLICATE KEY UPDATE status = VALUES(status)"
+
+    def _add_counts_suffix(self, keys):
+        return ("ON DUPLICATE KEY UPDATE present = present + VALUES(present), "
+                "absent = absent + VALUES(absent), total = total + VALUES(total)")
+
+    def _month_of(self, column):
+        return f"DATE_FORMAT({column}, '%Y-%m-01')"
+
+    def _if_not_exists(self):
+        # Triggers are created by a schema migration, which runs once
+        return ""
+
+    def create_admin(self, name, email, password_hash):
+        import mysql.connector
+        from mysql.connector import errorcode
+
+        # One statement on the unique email key, so two signups cannot both get past a check
+        with self._cursor(commit=True) as cursor:
+            try:
+                cursor.execute(
+                    "INSERT INTO admins (admin_name, email, password) VALUES (%s, %s, %s)",
+                    (name, email, password_hash),
+                )
+            except mysql.connector.IntegrityError as e:
+                if e.errno != errorcode.ER_DUP_ENTRY:
+                    raise
+                return False
+            return True
+
+
+class SQLiteBackend(SQLBackend):
+    """An embedded SQLite file: no server and no network, one connection per thread (WAL mode)."""
+
+    param = "?"
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name TEXT, last_name TEXT, reg_no TEXT NOT NULL UNIQUE, email TEXT UNIQUE,
+            password TEXT, class TEXT, gender TEXT, dob DATE, parent_contact TEXT,
+            member_type TEXT, face_path TEXT)""",
+        """CREATE TABLE IF NOT EXISTS admins (
+            admin_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            admin_name TEXT, email TEXT UNIQUE, password TEXT)""",
+        """CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            reg_no TEXT NOT NULL, date DATE NOT NULL, status TEXT, remarks TEXT,
+            UNIQUE (reg_no, date))""",
+        "CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date)",
+        """CREATE TABLE IF NOT EXISTS admin_review (
+            review_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            staff_id TEXT, reg_no TEXT, date DATE, status TEXT, reviewed INTEGER DEFAULT 0, decision TEXT)""",
+        "CREATE INDEX IF NOT EXISTS idx_admin_review_status ON admin_review (status, review_id)",
+        "CREATE INDEX IF NOT EXISTS idx_admin_review_reg_no_date ON admin_review (reg_no, date)",
+    ]
+
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path or config.SQLITE_PATH
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # PARSE_DECLTYPES returns DATE columns as datetime.date (see the converter above)
+            connection = sqlite3.connect(self.path, timeout=30, detect_types=sqlite3.PARSE_DECLTYPES)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _cursor(self, dictionary=False, commit=False):
+        self.ensure_prepared()
+        connection = self._connection()
+        cursor = connection.cursor()
+        # Rows as dicts, like a MySQL dictionary cursor
+        cursor.row_factory = _dict_row if dictionary else None
+        try:
+            yield cursor
+            if commit:
+                connection.commit()
+        except sqlite3.Error as e:
+            connection.rollback()
+            raise StorageError(str(e)) from e
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def prepare(self):
+        with self._cursor(commit=True) as cursor:
+            names = [name for name, _ in self.summary_triggers()]
+            cursor.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' "
+                           f"AND name IN ({', '.join('?' * len(names))})", names)
+            backfill = cursor.fetchone()[0] < len(names)
+            for statement in self.SCHEMA + self.summary_schema():
+                cursor.execute(statement)
+            # First run with these triggers: (re)compute the summaries from the existing rows
+            if backfill:
+                for statement in self.summary_rebuild():
+                    cursor.execute(statement)
+
+    def _upsert_suffix(self):
+        return "ON CONFLICT (reg_no, date) DO NOTHING"
+
+    def _update_status_suffix(self):
+        return "ON CONFLICT (reg_no, date) DO UPDATE SET status = excluded.status"
+
+    def _add_counts_suffix(self, keys):
+        return (f"ON CONFLICT ({keys}) DO UPDATE SET present = present + excluded.present, "
+                "absent = absent + excluded.absent, total = total + excluded.total")
+
+    def _month_of(self, column):
+        return f"strftime('%Y-%m-01', {column})"
+
+    def _if_not_exists(self):
+        return "IF NOT EXISTS "
+
+    def create_users(self, users):
+        # bcrypt hashes are bytes; store them as text so they read back like MySQL VARCHARs
+        users = [dict(user) for user in users]
+        for user in users:
+            if isinstance(user.get("password"), bytes):
+                user["password"] = user["password"].decode("utf-8")
+        super().create_users(users)
+
+    def create_admin(self, name, email, password_hash):
+        if isinstance(password_hash, bytes):
+            password_hash = password_hash.decode("utf-8")
+        with self._cursor(commit=True) as cursor:
+            cursor.execute("INSERT INTO admins (admin_name, email, password) VALUES (?, ?, ?) "
+                           "ON CONFLICT (email) DO NOTHING", (name, email, password_hash))
+            return cursor.rowcount == 1
+
+
+BACKENDS = {
+    "mysql": MySQLBackend,
+    "sqlite": SQLiteBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+# Helper function to get the storage backend selected in config.py
+def get_backend():
+    """Return the shared StorageBackend for ``config.DB_BACKEND``, creating it on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            try:
+                _backend = BACKENDS[config.DB_BACKEND]()
+            except KeyError:
+                raise ValueError(f"Unknown storage backend: {config.DB_BACKEND}") from None
+        return _backend